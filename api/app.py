@@ -1,9 +1,11 @@
 import logging
 import sys
+import threading
 from pathlib import Path
 
 from flask import Flask
 from flask_restx import Api
+from flask_restx.representations import output_json
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
@@ -13,6 +15,14 @@ from api.resources.documents import ns as documents_ns
 from api.resources.search import ns as search_ns
 from api.resources.rag import ns as rag_ns
 from api.resources.system import ns as system_ns
+from api.services import (
+    metrics,
+    ollama_client,
+    rag_jobs,
+    vector_index,
+    vectorizer_service,
+)
+from api.services.rag_service import SYSTEM_PROMPT
 
 logging.basicConfig(
     level=logging.INFO,
@@ -40,6 +50,15 @@ def create_app() -> Flask:
         doc="/docs",
     )
 
+    @api.representation("application/json")
+    def _output_json(data, code, headers=None):
+        # Só a serialização para JSON: o marshal_with dos recursos roda
+        # dentro do handler e entra no tempo da rota.
+        with metrics.stage("serialize"):
+            return output_json(data, code, headers)
+
+    metrics.init_app(app)
+
     api.add_namespace(documents_ns, path="/api/documents")
     api.add_namespace(search_ns, path="/api/search")
     api.add_namespace(rag_ns, path="/api/rag")
@@ -48,6 +67,18 @@ def create_app() -> Flask:
     with app.app_context():
         try:
             init_pool()
+            if Config.OLLAMA_WARMUP:
+                # Em segundo plano: o Ollama pode levar minutos para carregar
+                # o modelo e a API não deve esperar por isso para subir.
+                threading.Thread(
+                    target=ollama_client.warm_up,
+                    args=(Config.LLM_MODEL, Config.EMBEDDING_MODEL, SYSTEM_PROMPT),
+                    name="ollama-warmup",
+                    daemon=True,
+                ).start()
+            rag_jobs.start_workers()
+            vector_index.start()
+            vectorizer_service.start()
             logger.info("Aplicação iniciada com sucesso")
             logger.info("Swagger UI disponível em: http://localhost:5000/docs")
         except Exception as e:
@@ -7,6 +7,10 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(ROOT_DIR / ".env")
 
 
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
     DB_PORT: str = os.getenv("DB_PORT", "5432")
@@ -14,13 +18,147 @@ class Config:
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "postgres")
 
+    DB_POOL_MIN: int = int(os.getenv("DB_POOL_MIN", "2"))
+    DB_POOL_MAX: int = int(os.getenv("DB_POOL_MAX", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+    DB_POOL_MAX_IDLE: float = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+    DB_POOL_HEALTH_CHECK_AFTER: float = float(
+        os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")
+    )
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 
+    OLLAMA_POOL_SIZE: int = int(os.getenv("OLLAMA_POOL_SIZE", "20"))
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3"))
+    OLLAMA_EMBED_TIMEOUT: float = float(os.getenv("OLLAMA_EMBED_TIMEOUT", "30"))
+    OLLAMA_GENERATE_TIMEOUT: float = float(os.getenv("OLLAMA_GENERATE_TIMEOUT", "120"))
+    OLLAMA_HEALTH_TIMEOUT: float = float(os.getenv("OLLAMA_HEALTH_TIMEOUT", "5"))
+    OLLAMA_EMBED_RETRIES: int = int(os.getenv("OLLAMA_EMBED_RETRIES", "2"))
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_WARMUP: bool = _env_bool("OLLAMA_WARMUP", "true")
+    OLLAMA_RETRY_BACKOFF: float = float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.2"))
+
     OLLAMA_HOST_SQL: str = os.getenv("OLLAMA_HOST_SQL", "http://ollama:11434")
 
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
     EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
     LLM_MODEL: str = os.getenv("LLM_MODEL", "llama3.2")
+    LLM_NUM_CTX: int = int(os.getenv("LLM_NUM_CTX", "2048"))
+
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "512"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "50"))
+    # 0 = padrão do pgai (ai.processing_default).
+    VECTORIZER_BATCH_SIZE: int = int(os.getenv("VECTORIZER_BATCH_SIZE", "0"))
+    VECTORIZER_CONCURRENCY: int = int(os.getenv("VECTORIZER_CONCURRENCY", "0"))
+    VECTORIZER_POLL_INTERVAL: str = os.getenv("VECTORIZER_POLL_INTERVAL", "5s")
+    VECTORIZER_THROUGHPUT_WINDOW: float = float(
+        os.getenv("VECTORIZER_THROUGHPUT_WINDOW", "300")
+    )
+    # Intervalo das contagens da fila para a vazão do backfill (0 desliga).
+    VECTORIZER_SAMPLE_INTERVAL: float = float(
+        os.getenv("VECTORIZER_SAMPLE_INTERVAL", "15")
+    )
+
+    RAG_CONTEXT_TOKENS: int = int(os.getenv("RAG_CONTEXT_TOKENS", "0"))
+    RAG_ANSWER_TOKENS: int = int(os.getenv("RAG_ANSWER_TOKENS", "512"))
+    RAG_DEDUP_THRESHOLD: float = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.85"))
+
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "5000"))
+    EMBEDDING_CACHE_TTL: float = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+    EMBEDDING_CACHE_SHARED: bool = _env_bool("EMBEDDING_CACHE_SHARED")
+
+    RAG_ANSWER_CACHE_ENABLED: bool = _env_bool("RAG_ANSWER_CACHE_ENABLED")
+    RAG_ANSWER_CACHE_MAX_DISTANCE: float = float(
+        os.getenv("RAG_ANSWER_CACHE_MAX_DISTANCE", "0.05")
+    )
+    RAG_ANSWER_CACHE_TTL: float = float(os.getenv("RAG_ANSWER_CACHE_TTL", "86400"))
+
+    ANN_INDEX_METHOD: str = os.getenv("ANN_INDEX_METHOD", "hnsw")
+    HNSW_M: int = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
+    IVFFLAT_LISTS: int = int(os.getenv("IVFFLAT_LISTS", "0"))
+    IVFFLAT_PROBES: int = int(os.getenv("IVFFLAT_PROBES", "10"))
+    ANN_ITERATIVE_SCAN: str = os.getenv("ANN_ITERATIVE_SCAN", "relaxed_order")
+    ANN_MAINTENANCE_WORK_MEM: str = os.getenv("ANN_MAINTENANCE_WORK_MEM", "")
+
+    COMPACT_VECTORS: str = os.getenv("COMPACT_VECTORS", "")
+    COMPACT_SEARCH: str = os.getenv("COMPACT_SEARCH", "")
+    MATRYOSHKA_DIMENSIONS: int = int(os.getenv("MATRYOSHKA_DIMENSIONS", "256"))
+    COMPACT_CANDIDATE_FACTOR: int = int(os.getenv("COMPACT_CANDIDATE_FACTOR", "10"))
+    COMPACT_MAX_CANDIDATES: int = int(os.getenv("COMPACT_MAX_CANDIDATES", "400"))
+
+    DOCUMENTS_PAGE_MAX: int = int(os.getenv("DOCUMENTS_PAGE_MAX", "1000"))
+    DOCUMENTS_EXPORT_BATCH_SIZE: int = int(
+        os.getenv("DOCUMENTS_EXPORT_BATCH_SIZE", "500")
+    )
+
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+    BULK_BATCH_SIZE_MAX: int = int(os.getenv("BULK_BATCH_SIZE_MAX", "10000"))
+
+    SEED_DIR: str = os.getenv("SEED_DIR", str(ROOT_DIR / "api" / "seeds"))
+
+    HYBRID_TS_CONFIG: str = os.getenv("HYBRID_TS_CONFIG", "simple")
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "40"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_VECTOR_WEIGHT: float = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+    HYBRID_LEXICAL_WEIGHT: float = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+    RAG_SEARCH_MODE: str = os.getenv("RAG_SEARCH_MODE", "vector")
+
+    RERANK_CANDIDATE_FACTOR: int = int(os.getenv("RERANK_CANDIDATE_FACTOR", "10"))
+    RERANK_MAX_CANDIDATES: int = int(os.getenv("RERANK_MAX_CANDIDATES", "200"))
+    RERANK_MMR_LAMBDA: float = float(os.getenv("RERANK_MMR_LAMBDA", "0.7"))
+    RERANK_LEXICAL_WEIGHT: float = float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.0"))
+    RAG_RERANK: bool = _env_bool("RAG_RERANK")
+
+    VECTOR_INDEX_ENABLED: bool = _env_bool("VECTOR_INDEX_ENABLED")
+    VECTOR_INDEX_DIR: str = os.getenv(
+        "VECTOR_INDEX_DIR", str(ROOT_DIR / "data" / "vector_index")
+    )
+    VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+    VECTOR_INDEX_MAX_LAG: float = float(os.getenv("VECTOR_INDEX_MAX_LAG", "10"))
+    VECTOR_INDEX_REFRESH_INTERVAL: float = float(
+        os.getenv("VECTOR_INDEX_REFRESH_INTERVAL", "1")
+    )
+    VECTOR_INDEX_REFRESH_BATCH: int = int(
+        os.getenv("VECTOR_INDEX_REFRESH_BATCH", "5000")
+    )
+    VECTOR_INDEX_BLOCK_ROWS: int = int(os.getenv("VECTOR_INDEX_BLOCK_ROWS", "16384"))
+    VECTOR_INDEX_GAP_WAIT: float = float(os.getenv("VECTOR_INDEX_GAP_WAIT", "30"))
+    VECTOR_INDEX_CHANGELOG_TTL: float = float(
+        os.getenv("VECTOR_INDEX_CHANGELOG_TTL", "86400")
+    )
+
+    METADATA_INDEXED_KEYS: str = os.getenv("METADATA_INDEXED_KEYS", "project,date")
+
+    SEARCH_BATCH_MAX_QUERIES: int = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "256"))
+
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+    LLM_QUEUE_MAX: int = int(os.getenv("LLM_QUEUE_MAX", "32"))
+    LLM_QUEUE_MAX_BATCH: int = int(os.getenv("LLM_QUEUE_MAX_BATCH", "16"))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+
+    RAG_JOB_WORKERS: int = int(os.getenv("RAG_JOB_WORKERS", "2"))
+    RAG_JOB_POLL_INTERVAL: float = float(os.getenv("RAG_JOB_POLL_INTERVAL", "1"))
+    RAG_JOB_TIMEOUT: float = float(os.getenv("RAG_JOB_TIMEOUT", "300"))
+    RAG_JOB_MAX_ATTEMPTS: int = int(os.getenv("RAG_JOB_MAX_ATTEMPTS", "3"))
+    RAG_JOB_TTL: float = float(os.getenv("RAG_JOB_TTL", "86400"))
+    RAG_JOB_WEBHOOK_TIMEOUT: float = float(os.getenv("RAG_JOB_WEBHOOK_TIMEOUT", "5"))
+    # Hosts aceitos em webhook_url, separados por vírgula. Vazio: qualquer
+    # host cujos endereços não sejam privados, loopback ou link-local.
+    RAG_JOB_WEBHOOK_ALLOWED_HOSTS: str = os.getenv("RAG_JOB_WEBHOOK_ALLOWED_HOSTS", "")
+
+    SINGLE_FLIGHT_ENABLED: bool = _env_bool("SINGLE_FLIGHT_ENABLED", "true")
+    SINGLE_FLIGHT_SEARCH_WAIT: float = float(
+        os.getenv("SINGLE_FLIGHT_SEARCH_WAIT", "30")
+    )
+    # 0 = derivado de LLM_QUEUE_TIMEOUT + OLLAMA_GENERATE_TIMEOUT (+ conexão e
+    # busca): a seguidora espera tanto quanto a líder pode levar.
+    SINGLE_FLIGHT_RAG_WAIT: float = float(os.getenv("SINGLE_FLIGHT_RAG_WAIT", "0"))
+
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
 
     @classmethod
     def get_db_dsn(cls) -> str:
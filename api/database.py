@@ -1,27 +1,67 @@
 import logging
 from contextlib import contextmanager
-from typing import Generator
+from functools import lru_cache
+from typing import Any, Generator, Sequence
 
 import psycopg2
-from psycopg2 import pool
+from psycopg2.extensions import AsIs, register_adapter
 from psycopg2.extras import RealDictCursor
 
 from api.config import Config
+from api.pool import ConnectionPool
 
 logger = logging.getLogger(__name__)
 
-_connection_pool: pool.SimpleConnectionPool | None = None
+_connection_pool: ConnectionPool | None = None
 
 
-def init_pool(min_conn: int = 2, max_conn: int = 10) -> None:
+@lru_cache(maxsize=8)
+def _vector_template(dimensions: int) -> str:
+    return "'[" + ",".join(["%.8f"] * dimensions) + "]'::vector"
+
+
+class Vector:
+    # psycopg2 interpola os parâmetros no texto da query (não há bind
+    # binário), então o literal do pgvector é formatado uma única vez, com
+    # um template por dimensão, e reaproveitado em todas as adaptações.
+    __slots__ = ("values", "_literal")
+
+    def __init__(self, values: Sequence[float]):
+        self.values = values
+        self._literal: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def literal(self) -> str:
+        if self._literal is None:
+            self._literal = _vector_template(len(self.values)) % tuple(self.values)
+        return self._literal
+
+
+register_adapter(Vector, lambda vector: AsIs(vector.literal()))
+
+
+def init_pool(min_conn: int | None = None, max_conn: int | None = None) -> None:
     global _connection_pool
     try:
-        _connection_pool = pool.SimpleConnectionPool(
-            min_conn,
-            max_conn,
+        connection_pool = ConnectionPool(
             Config.get_db_dsn(),
+            min_size=Config.DB_POOL_MIN if min_conn is None else min_conn,
+            max_size=Config.DB_POOL_MAX if max_conn is None else max_conn,
+            timeout=Config.DB_POOL_TIMEOUT,
+            max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+            max_idle=Config.DB_POOL_MAX_IDLE,
+            health_check_after=Config.DB_POOL_HEALTH_CHECK_AFTER,
+            connect_timeout=Config.DB_CONNECT_TIMEOUT,
+        )
+        connection_pool.open()
+        _connection_pool = connection_pool
+        logger.info(
+            "Pool de conexões inicializado com sucesso (%d-%d conexões)",
+            connection_pool.min_size,
+            connection_pool.max_size,
         )
-        logger.info("Pool de conexões inicializado com sucesso")
     except psycopg2.Error as e:
         logger.error("Erro ao inicializar pool de conexões: %s", e)
         raise
@@ -43,14 +83,24 @@ def get_connection() -> Generator:
         )
 
     conn = _connection_pool.getconn()
+    broken = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
         raise
     finally:
-        _connection_pool.putconn(conn)
+        _connection_pool.putconn(conn, discard=broken)
+
+
+def pool_stats() -> dict[str, Any]:
+    if _connection_pool is None:
+        return {}
+    return _connection_pool.stats()
 
 
 @contextmanager
@@ -59,3 +109,15 @@ def get_cursor(dict_cursor: bool = True) -> Generator:
     with get_connection() as conn:
         with conn.cursor(cursor_factory=cursor_factory) as cur:
             yield cur
+
+
+@contextmanager
+def get_autocommit_cursor(dict_cursor: bool = True) -> Generator:
+    cursor_factory = RealDictCursor if dict_cursor else None
+    with get_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor(cursor_factory=cursor_factory) as cur:
+                yield cur
+        finally:
+            conn.autocommit = False
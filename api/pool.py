@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class PoolClosed(RuntimeError):
+    pass
+
+
+@dataclass
+class _Slot:
+    conn: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ConnectionPool:
+    # Pool thread-safe para psycopg2: acquire bloqueante com timeout,
+    # verificação de conexões ociosas, reciclagem por tempo de vida e
+    # estatísticas. Não guarda estado de sessão nas conexões, então funciona
+    # atrás do PgBouncer em modo transaction.
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: float = 3600.0,
+        max_idle: float = 600.0,
+        health_check_after: float = 30.0,
+        connect_timeout: int = 5,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamanhos de pool inválidos")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.connect_timeout = connect_timeout
+
+        self._cond = threading.Condition()
+        self._idle: deque[_Slot] = deque()
+        self._in_use: dict[int, _Slot] = {}
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "acquired": 0,
+            "timeouts": 0,
+            "opened": 0,
+            "closed": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+        }
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_sum_ms = 0.0
+
+    def open(self) -> None:
+        # Warm-up: as conexões mínimas são abertas já na inicialização, e uma
+        # falha aqui impede a aplicação de subir com o banco inacessível.
+        slots: list[_Slot] = []
+        try:
+            for _ in range(self.min_size):
+                slots.append(_Slot(self._connect()))
+        except psycopg2.Error:
+            for slot in slots:
+                self._close(slot.conn)
+            raise
+        with self._cond:
+            self._idle.extend(slots)
+            self._cond.notify_all()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout)
+        with self._cond:
+            self._stats["opened"] += 1
+        return conn
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._stats["closed"] += 1
+
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _record_wait(self, waited_ms: float) -> None:
+        self._wait_buckets[bisect_left(WAIT_BUCKETS_MS, waited_ms)] += 1
+        self._wait_sum_ms += waited_ms
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        return self.max_lifetime > 0 and now - slot.created_at > self.max_lifetime
+
+    def _healthy(self, slot: _Slot, now: float) -> bool:
+        conn = slot.conn
+        if conn.closed:
+            return False
+        if now - slot.last_used < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _trim_idle(self, now: float) -> list[_Slot]:
+        # Chamado com o lock: devolve as conexões ociosas há tempo demais
+        # além do mínimo, para serem fechadas fora do lock.
+        stale = []
+        while (
+            self.max_idle > 0
+            and len(self._idle) > 0
+            and self._total() > self.min_size
+            and now - self._idle[0].last_used > self.max_idle
+        ):
+            stale.append(self._idle.popleft())
+        return stale
+
+    def getconn(self, timeout: float | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            slot = None
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise PoolClosed("Pool de conexões fechado")
+                        if self._idle:
+                            # LIFO: a conexão usada mais recentemente é a
+                            # mais provável de estar viva e aquecida.
+                            slot = self._idle.pop()
+                            break
+                        if self._total() < self.max_size:
+                            self._opening += 1
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeout(
+                                f"Nenhuma conexão livre após {timeout:.1f}s "
+                                f"({self.max_size} em uso)"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            # Conexões novas continuam contadas em _opening até entrarem em
+            # _in_use, para que o total nunca passe de max_size.
+            opened = False
+            now = time.monotonic()
+            if slot is not None:
+                replace = False
+                if self._expired(slot, now):
+                    with self._cond:
+                        self._stats["recycled"] += 1
+                    replace = True
+                elif not self._healthy(slot, now):
+                    with self._cond:
+                        self._stats["health_check_failures"] += 1
+                    logger.warning("Conexão ociosa quebrada descartada do pool")
+                    replace = True
+                if replace:
+                    self._close(slot.conn)
+                    with self._cond:
+                        if self._total() >= self.max_size:
+                            # Outra thread ocupou a vaga; volta para a fila.
+                            continue
+                        self._opening += 1
+                    slot = self._open_slot()
+                    opened = True
+            else:
+                slot = self._open_slot()
+                opened = True
+
+            waited_ms = (time.monotonic() - started) * 1000
+            with self._cond:
+                if opened:
+                    self._opening -= 1
+                self._in_use[id(slot.conn)] = slot
+                self._stats["acquired"] += 1
+                self._record_wait(waited_ms)
+            return slot.conn
+
+    def _open_slot(self) -> _Slot:
+        # Chamado com uma vaga já reservada em _opening.
+        try:
+            return _Slot(self._connect())
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        with self._cond:
+            slot = self._in_use.pop(id(conn), None)
+        if slot is None:
+            raise ValueError("Conexão não pertence a este pool")
+
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        now = time.monotonic()
+        if discard or conn.closed or self._closed or self._expired(slot, now):
+            with self._cond:
+                if discard:
+                    self._stats["discarded"] += 1
+                elif not self._closed and not conn.closed:
+                    self._stats["recycled"] += 1
+                self._cond.notify()
+            self._close(conn)
+            return
+
+        slot.last_used = now
+        with self._cond:
+            self._idle.append(slot)
+            stale = self._trim_idle(now)
+            self._cond.notify()
+        for old in stale:
+            self._close(old.conn)
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for slot in idle:
+            self._close(slot.conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._wait_buckets):
+                cumulative += count
+                histogram[f"le_{bound}ms"] = cumulative
+            histogram["le_inf"] = cumulative + self._wait_buckets[-1]
+
+            return {
+                **self._stats,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "waiting": self._waiting,
+                "wait_ms_sum": round(self._wait_sum_ms, 3),
+                "wait_ms_histogram": histogram,
+            }
@@ -1,10 +1,17 @@
-from flask_restx import Namespace, Resource, fields
+import json
 
+from flask import Response, request
+from flask_restx import Namespace, Resource, fields, reqparse
+
+from api.config import Config
 from api.services.document_service import (
+    BulkIngestError,
+    bulk_insert_documents,
     create_document,
     delete_document,
-    get_all_documents,
     get_document_by_id,
+    iter_documents,
+    list_documents,
 )
 
 ns = Namespace("documents", description="Gestão de documentos")
@@ -43,12 +50,92 @@ document_output = ns.model(
     },
 )
 
+bulk_document_input = ns.inherit(
+    "BulkDocumentInput",
+    document_input,
+    {
+        "idempotency_key": fields.String(
+            description=(
+                "Chave única opcional: reenviar o mesmo documento com a mesma "
+                "chave não cria duplicata"
+            ),
+            example="wiki:PostgreSQL",
+        ),
+    },
+)
+
+bulk_result = ns.model(
+    "BulkDocumentResult",
+    {
+        "id": fields.Integer(description="ID do documento"),
+        "created": fields.Boolean(
+            description="False quando a idempotency_key já existia"
+        ),
+    },
+)
+
+bulk_response = ns.model(
+    "BulkDocumentResponse",
+    {
+        "inserted": fields.Integer(description="Documentos criados"),
+        "existing": fields.Integer(
+            description="Documentos já existentes (mesma chave)"
+        ),
+        "results": fields.List(
+            fields.Nested(bulk_result),
+            description="Um resultado por registro, na ordem de envio",
+        ),
+    },
+)
+
+bulk_parser = reqparse.RequestParser()
+bulk_parser.add_argument(
+    "batch_size",
+    type=int,
+    location="args",
+    help="Registros por transação (padrão: BULK_BATCH_SIZE).",
+)
+
+list_parser = reqparse.RequestParser()
+list_parser.add_argument(
+    "after_id",
+    type=int,
+    default=0,
+    location="args",
+    help="Retorna documentos com id maior que este (cursor da página anterior).",
+)
+list_parser.add_argument(
+    "limit",
+    type=int,
+    default=100,
+    location="args",
+    help="Tamanho da página.",
+)
+
+export_parser = reqparse.RequestParser()
+export_parser.add_argument(
+    "after_id",
+    type=int,
+    default=0,
+    location="args",
+    help="Exporta documentos com id maior que este.",
+)
+
 
 @ns.route("/")
 class DocumentList(Resource):
+    @ns.expect(list_parser)
     @ns.marshal_list_with(document_output)
+    @ns.header("X-Next-After-Id", "after_id da próxima página (ausente na última)")
     def get(self):
-        return get_all_documents()
+        args = list_parser.parse_args()
+        limit = min(max(args["limit"], 1), Config.DOCUMENTS_PAGE_MAX)
+        docs = list_documents(after_id=max(args["after_id"], 0), limit=limit)
+
+        headers = {}
+        if len(docs) == limit:
+            headers["X-Next-After-Id"] = str(docs[-1]["id"])
+        return docs, 200, headers
 
     @ns.expect(document_input, validate=True)
     @ns.marshal_with(document_output, code=201)
@@ -62,6 +149,61 @@ class DocumentList(Resource):
         return doc, 201
 
 
+def _ndjson_records(stream):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Linha {line_no}: JSON inválido ({e.msg})") from e
+
+
+def _bulk_summary(results):
+    inserted = sum(1 for r in results if r["created"])
+    return {
+        "inserted": inserted,
+        "existing": len(results) - inserted,
+        "results": results,
+    }
+
+
+@ns.route("/bulk")
+class DocumentBulk(Resource):
+    @ns.expect(bulk_parser, [bulk_document_input])
+    @ns.marshal_with(bulk_response, code=201)
+    @ns.response(400, "Registro inválido (lotes anteriores já foram gravados)")
+    def post(self):
+        args = bulk_parser.parse_args()
+        batch_size = min(
+            max(args["batch_size"] or Config.BULK_BATCH_SIZE, 1),
+            Config.BULK_BATCH_SIZE_MAX,
+        )
+
+        if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+            records = _ndjson_records(request.stream)
+        else:
+            records = request.get_json(silent=True)
+            if not isinstance(records, list):
+                ns.abort(
+                    400,
+                    "Envie um array JSON ou NDJSON (Content-Type: "
+                    "application/x-ndjson)",
+                )
+
+        try:
+            results = bulk_insert_documents(records, batch_size=batch_size)
+        except BulkIngestError as e:
+            summary = _bulk_summary(e.results)
+            ns.abort(
+                400,
+                f"{e} ({summary['inserted']} documentos já gravados)",
+                **summary,
+            )
+        return _bulk_summary(results), 201
+
+
 @ns.route("/<int:doc_id>")
 @ns.param("doc_id", "ID do documento")
 class DocumentDetail(Resource):
@@ -80,3 +222,22 @@ class DocumentDetail(Resource):
         if not deleted:
             ns.abort(404, "Documento não encontrado")
         return "", 204
+
+
+@ns.route("/export")
+class DocumentExport(Resource):
+    @ns.expect(export_parser)
+    @ns.produces(["application/x-ndjson"])
+    @ns.response(200, "Um documento JSON por linha, em ordem de id")
+    def get(self):
+        args = export_parser.parse_args()
+        rows = iter_documents(after_id=max(args["after_id"], 0))
+
+        def ndjson():
+            try:
+                for row in rows:
+                    yield json.dumps(row, ensure_ascii=False) + "\n"
+            finally:
+                rows.close()
+
+        return Response(ndjson(), mimetype="application/x-ndjson")
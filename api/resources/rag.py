@@ -1,6 +1,18 @@
-from flask_restx import Namespace, Resource, fields
+import json
 
-from api.services.rag_service import generate_rag_response
+from flask import Response, request
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
+
+from api.config import Config
+from api.services import (
+    llm_scheduler,
+    metadata_filter,
+    profiling,
+    rag_jobs,
+    single_flight,
+)
+from api.services.rag_service import generate_rag_response, stream_rag_response
+from api.services.search_service import SEARCH_MODES
 
 ns = Namespace("rag", description="RAG - Perguntas e respostas com IA")
 
@@ -22,6 +34,32 @@ rag_input = ns.model(
             description="Modelo LLM do Ollama para gerar a resposta",
             example="llama3.2",
         ),
+        "mode": fields.String(
+            description="Recuperação: vector ou hybrid (full-text + vetor com RRF)",
+            enum=list(SEARCH_MODES),
+            example="hybrid",
+        ),
+        "filters": fields.Raw(
+            description=(
+                "Filtro de metadados: igualdade, lista (IN) ou intervalo de "
+                "datas (gt/gte/lt/lte)"
+            ),
+            example={"source": "wikipedia"},
+        ),
+        "rerank": fields.Boolean(
+            description=(
+                "Escolhe os trechos por MMR entre mais candidatos, evitando "
+                "trechos quase iguais no contexto (padrão: RAG_RERANK)"
+            ),
+        ),
+        "priority": fields.String(
+            description=(
+                "Classe na fila de geração: interactive (padrão) é atendida "
+                "antes de batch"
+            ),
+            enum=list(llm_scheduler.PRIORITIES),
+            example="interactive",
+        ),
     },
 )
 
@@ -45,31 +83,222 @@ rag_output = ns.model(
             description="Documentos usados como contexto",
         ),
         "model": fields.String(description="Modelo LLM utilizado"),
+        "cached": fields.Boolean(
+            description="Resposta reaproveitada de uma pergunta equivalente"
+        ),
+    },
+)
+
+rag_debug_output = ns.inherit(
+    "RAGDebugOutput",
+    rag_output,
+    {
+        "timings": fields.Raw(
+            description=(
+                "Com ?debug_timings=1: embed, SQL + EXPLAIN, montagem do "
+                "prompt, LLM e os contadores do próprio Ollama (ms)"
+            )
+        ),
+        "profile": fields.Raw(
+            description="Com ?profile=1: pilhas do cProfile no formato folded"
+        ),
     },
 )
 
 
+rag_job_input = ns.inherit(
+    "RAGJobInput",
+    rag_input,
+    {
+        "webhook_url": fields.String(
+            description="URL chamada com POST (JSON do job) quando ele terminar",
+            example="https://example.com/hooks/rag",
+        ),
+    },
+)
+
+rag_job = ns.model(
+    "RAGJob",
+    {
+        "id": fields.String(description="ID do job"),
+        "status": fields.String(
+            description="Situação do job", enum=list(rag_jobs.STATUSES)
+        ),
+        "result": fields.Nested(
+            rag_output,
+            allow_null=True,
+            description="Resposta (quando status = succeeded)",
+        ),
+        "error": fields.String(description="Motivo da falha (status = failed)"),
+        "webhook_status": fields.String(
+            description="Status HTTP (ou erro) da chamada ao webhook"
+        ),
+        "attempts": fields.Integer(description="Execuções iniciadas"),
+        "created_at": fields.DateTime(),
+        "started_at": fields.DateTime(),
+        "finished_at": fields.DateTime(),
+    },
+)
+
+
+@ns.errorhandler(llm_scheduler.Overloaded)
+def _overloaded(error):
+    return (
+        {"message": str(error), "retry_after": error.retry_after},
+        429,
+        {"Retry-After": str(error.retry_after)},
+    )
+
+
+debug_parser = reqparse.RequestParser()
+debug_parser.add_argument(
+    "debug_timings",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help="Inclui 'timings' por estágio na resposta.",
+)
+debug_parser.add_argument(
+    "profile",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help="Inclui o cProfile da requisição (exige o header X-Profile-Token).",
+)
+
+
 @ns.route("/")
 class RAGQuery(Resource):
-    @ns.expect(rag_input, validate=True)
-    @ns.marshal_with(rag_output)
+    @ns.expect(rag_input, debug_parser, validate=True)
+    @ns.marshal_with(rag_debug_output, skip_none=True)
+    @ns.response(403, "profile=1 sem X-Profile-Token válido")
+    @ns.response(429, "Fila de geração cheia (ver header Retry-After)")
     def post(self):
+        args = debug_parser.parse_args()
+        if args["profile"] and not profiling.profile_allowed(request.headers):
+            ns.abort(403, "Profiling exige o header X-Profile-Token válido")
+
         data = ns.payload
         question = data["question"]
         max_chunks = min(max(data.get("max_chunks", 5), 1), 10)
         model = data.get("model")
+        mode = data.get("mode") or Config.RAG_SEARCH_MODE
+        priority = data.get("priority") or "interactive"
 
         try:
-            result = generate_rag_response(
-                question=question,
-                max_chunks=max_chunks,
-                model=model,
+            filters = metadata_filter.parse(data.get("filters"))
+            result, extras = profiling.run(
+                lambda: generate_rag_response(
+                    question=question,
+                    max_chunks=max_chunks,
+                    model=model,
+                    mode=mode,
+                    filters=filters,
+                    priority=priority,
+                    rerank=data.get("rerank"),
+                ),
+                debug_timings=args["debug_timings"],
+                profile=args["profile"],
             )
-        except ConnectionError as e:
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except (ConnectionError, single_flight.WaitTimeout) as e:
             ns.abort(503, str(e))
+        except llm_scheduler.Overloaded:
+            raise
         except RuntimeError as e:
             ns.abort(500, str(e))
         except Exception as e:
             ns.abort(500, f"Erro inesperado: {str(e)}")
 
-        return result
+        return {**result, **extras}
+
+
+def _sse(events):
+    for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@ns.route("/stream")
+class RAGStream(Resource):
+    @ns.expect(rag_input, validate=True)
+    @ns.produces(["text/event-stream"])
+    @ns.response(
+        200,
+        "Eventos SSE: 'sources', vários 'token', e por fim 'done' (ou 'error')",
+    )
+    @ns.response(429, "Fila de geração cheia (ver header Retry-After)")
+    def post(self):
+        data = ns.payload
+        question = data["question"]
+        max_chunks = min(max(data.get("max_chunks", 5), 1), 10)
+        model = data.get("model")
+        mode = data.get("mode") or Config.RAG_SEARCH_MODE
+        priority = data.get("priority") or "interactive"
+        try:
+            filters = metadata_filter.parse(data.get("filters"))
+        except ValueError as e:
+            ns.abort(400, str(e))
+
+        # Depois do 200 não dá mais para responder 429: a fila é conferida
+        # antes de abrir o stream.
+        llm_scheduler.check(priority)
+
+        events = stream_rag_response(
+            question=question,
+            max_chunks=max_chunks,
+            model=model,
+            mode=mode,
+            filters=filters,
+            priority=priority,
+            rerank=data.get("rerank"),
+        )
+        return Response(
+            _sse(events),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+@ns.route("/jobs")
+class RAGJobs(Resource):
+    @ns.expect(rag_job_input, validate=True)
+    @ns.marshal_with(rag_job, code=202)
+    @ns.response(400, "Filtro ou webhook_url inválido")
+    def post(self):
+        data = ns.payload
+        webhook_url = data.get("webhook_url")
+        try:
+            if webhook_url:
+                rag_jobs.check_webhook_url(webhook_url)
+            filters = metadata_filter.parse(data.get("filters"))
+        except ValueError as e:
+            ns.abort(400, str(e))
+
+        # Só grava o job: a geração roda nos workers (rag_jobs), então a
+        # requisição termina sem esperar o LLM. Por padrão o job entra na
+        # fila de geração como batch.
+        job = rag_jobs.submit(
+            {
+                "question": data["question"],
+                "max_chunks": min(max(data.get("max_chunks", 5), 1), 10),
+                "model": data.get("model"),
+                "mode": data.get("mode") or Config.RAG_SEARCH_MODE,
+                "filters": filters,
+                "priority": data.get("priority") or "batch",
+                "rerank": data.get("rerank"),
+            },
+            webhook_url=webhook_url,
+        )
+        return job, 202, {"Location": f"{request.path.rstrip('/')}/{job['id']}"}
+
+
+@ns.route("/jobs/<uuid:job_id>")
+@ns.response(404, "Job não encontrado")
+class RAGJob(Resource):
+    @ns.marshal_with(rag_job)
+    def get(self, job_id):
+        job = rag_jobs.get(str(job_id))
+        if job is None:
+            ns.abort(404, f"Job {job_id} não encontrado")
+        return job
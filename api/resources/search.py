@@ -1,6 +1,14 @@
-from flask_restx import Namespace, Resource, fields, reqparse
+from flask import request
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
 
-from api.services.search_service import semantic_search
+from api.config import Config
+from api.services import compact_vectors, metadata_filter, profiling, single_flight
+from api.services.index_service import EF_SEARCH_RANGE, PROBES_RANGE
+from api.services.search_service import (
+    SEARCH_MODES,
+    batch_semantic_search,
+    semantic_search,
+)
 
 ns = Namespace("search", description="Busca semântica nos documentos")
 
@@ -11,6 +19,9 @@ search_result = ns.model(
         "title": fields.String(description="Título do documento"),
         "chunk": fields.String(description="Trecho relevante encontrado"),
         "distance": fields.Float(description="Distância (menor = mais similar)"),
+        "score": fields.Float(
+            description="Score RRF da busca híbrida (maior = mais relevante)"
+        ),
     },
 )
 
@@ -18,11 +29,68 @@ search_response = ns.model(
     "SearchResponse",
     {
         "query": fields.String(description="Texto da busca original"),
-        "results": fields.List(fields.Nested(search_result)),
+        # score só existe na busca híbrida: omitido (não null) na vetorial.
+        "results": fields.List(fields.Nested(search_result, skip_none=True)),
         "total": fields.Integer(description="Total de resultados retornados"),
     },
 )
 
+search_debug_response = ns.inherit(
+    "SearchDebugResponse",
+    search_response,
+    {
+        "timings": fields.Raw(
+            description="Com ?debug_timings=1: ms por estágio e resumo do plano SQL"
+        ),
+        "profile": fields.Raw(
+            description="Com ?profile=1: pilhas do cProfile no formato folded"
+        ),
+    },
+)
+
+batch_search_input = ns.model(
+    "BatchSearchInput",
+    {
+        "queries": fields.List(
+            fields.String,
+            required=True,
+            description="Lista de textos de busca",
+            example=["O que é pgai?", "Como funciona RAG?"],
+        ),
+        "limit": fields.Integer(
+            default=5,
+            description="Máximo de resultados por consulta (1-20)",
+            example=5,
+        ),
+        "max_distance": fields.Float(
+            default=1.5,
+            description="Distância máxima para resultados (menor = mais restritivo)",
+            example=1.5,
+        ),
+        "ef_search": fields.Integer(
+            min=EF_SEARCH_RANGE[0],
+            max=EF_SEARCH_RANGE[1],
+            description="hnsw.ef_search para esta busca (maior = mais recall)",
+        ),
+        "probes": fields.Integer(
+            min=PROBES_RANGE[0],
+            max=PROBES_RANGE[1],
+            description="ivfflat.probes para esta busca (maior = mais recall)",
+        ),
+    },
+)
+
+batch_search_response = ns.model(
+    "BatchSearchResponse",
+    {
+        "results": fields.List(
+            fields.Nested(search_response),
+            description="Resultados na mesma ordem das consultas enviadas",
+        ),
+        "total_queries": fields.Integer(description="Total de consultas processadas"),
+    },
+)
+
 search_parser = reqparse.RequestParser()
 search_parser.add_argument("q", type=str, required=True, location="args")
 search_parser.add_argument("limit", type=int, default=5, location="args")
@@ -33,21 +101,174 @@ search_parser.add_argument(
     location="args",
     help="Distância máxima para resultados (menor = mais restritivo).",
 )
+search_parser.add_argument(
+    "mode",
+    type=str,
+    default="vector",
+    choices=SEARCH_MODES,
+    location="args",
+    help="vector (só embeddings) ou hybrid (full-text + vetor com RRF).",
+)
+search_parser.add_argument(
+    "vector_weight",
+    type=float,
+    location="args",
+    help="Peso da lista vetorial na fusão (modo hybrid).",
+)
+search_parser.add_argument(
+    "lexical_weight",
+    type=float,
+    location="args",
+    help="Peso da lista full-text na fusão (modo hybrid).",
+)
+search_parser.add_argument(
+    "filter",
+    type=str,
+    location="args",
+    help=(
+        'Filtro de metadados em JSON: {"source": "wikipedia"}, '
+        '{"project": ["a", "b"]}, {"date": {"gte": "2024-01-01"}}.'
+    ),
+)
+search_parser.add_argument(
+    "rerank",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help=(
+        "Busca mais candidatos e escolhe os finais por MMR (relevância e "
+        "diversidade), evitando trechos quase iguais."
+    ),
+)
+search_parser.add_argument(
+    "mmr_lambda",
+    type=float,
+    location="args",
+    help="Com rerank: 1 = só relevância, 0 = só diversidade (padrão 0.7).",
+)
+search_parser.add_argument(
+    "compact",
+    type=str,
+    choices=("none",) + compact_vectors.MODES,
+    location="args",
+    help=(
+        "Primeira fase na cópia compacta (halfvec, binary ou matryoshka) e "
+        "distância exata no vetor completo; none força uma fase só. "
+        "Padrão: COMPACT_SEARCH."
+    ),
+)
+search_parser.add_argument(
+    "debug_timings",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help="Inclui 'timings' (embed, SQL + EXPLAIN) na resposta.",
+)
+search_parser.add_argument(
+    "profile",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help="Inclui o cProfile da requisição (exige o header X-Profile-Token).",
+)
+search_parser.add_argument(
+    "ef_search",
+    type=int,
+    location="args",
+    help="hnsw.ef_search para esta busca, 1-1000 (maior = mais recall, mais lento).",
+)
+search_parser.add_argument(
+    "probes",
+    type=int,
+    location="args",
+    help="ivfflat.probes para esta busca, 1-32768 (maior = mais recall, mais lento).",
+)
 
 
 @ns.route("/")
 class SemanticSearch(Resource):
     @ns.expect(search_parser)
-    @ns.marshal_with(search_response)
+    @ns.marshal_with(search_debug_response, skip_none=True)
+    @ns.response(403, "profile=1 sem X-Profile-Token válido")
     def get(self):
         args = search_parser.parse_args()
         query = args["q"]
         limit = min(max(args["limit"], 1), 20)
         max_distance = args["max_distance"]
 
+        if args["profile"] and not profiling.profile_allowed(request.headers):
+            ns.abort(403, "Profiling exige o header X-Profile-Token válido")
+
         try:
-            results = semantic_search(query, limit=limit, max_distance=max_distance)
+            filters = metadata_filter.parse(args["filter"])
+            results, extras = profiling.run(
+                lambda: semantic_search(
+                    query,
+                    limit=limit,
+                    max_distance=max_distance,
+                    ef_search=args["ef_search"],
+                    probes=args["probes"],
+                    mode=args["mode"],
+                    vector_weight=args["vector_weight"],
+                    lexical_weight=args["lexical_weight"],
+                    filters=filters,
+                    rerank=args["rerank"],
+                    mmr_lambda=args["mmr_lambda"],
+                    compact=args["compact"],
+                ),
+                debug_timings=args["debug_timings"],
+                profile=args["profile"],
+            )
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except single_flight.WaitTimeout as e:
+            ns.abort(503, str(e))
         except Exception as e:
             ns.abort(500, f"Erro na busca: {str(e)}")
 
-        return {"query": query, "results": results, "total": len(results)}
+        return {
+            "query": query,
+            "results": results,
+            "total": len(results),
+            **extras,
+        }
+
+
+@ns.route("/batch")
+class BatchSemanticSearch(Resource):
+    @ns.expect(batch_search_input, validate=True)
+    @ns.marshal_with(batch_search_response)
+    def post(self):
+        data = ns.payload
+        queries = data["queries"]
+        limit = min(max(data.get("limit", 5), 1), 20)
+        max_distance = data.get("max_distance", 1.5)
+
+        if not queries:
+            ns.abort(400, "Informe ao menos uma consulta em 'queries'")
+        if len(queries) > Config.SEARCH_BATCH_MAX_QUERIES:
+            ns.abort(
+                400,
+                f"Máximo de {Config.SEARCH_BATCH_MAX_QUERIES} consultas por lote",
+            )
+
+        try:
+            batches = batch_semantic_search(
+                queries,
+                limit=limit,
+                max_distance=max_distance,
+                ef_search=data.get("ef_search"),
+                probes=data.get("probes"),
+            )
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except Exception as e:
+            ns.abort(500, f"Erro na busca em lote: {str(e)}")
+
+        return {
+            "results": [
+                {"query": query, "results": results, "total": len(results)}
+                for query, results in zip(queries, batches)
+            ],
+            "total_queries": len(queries),
+        }
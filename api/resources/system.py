@@ -1,10 +1,26 @@
 import logging
 
-import requests as req
-from flask_restx import Namespace, Resource, fields
+from flask import Response
+from flask_restx import Namespace, Resource, fields, reqparse
 
 from api.config import Config
-from api.database import get_cursor
+from api.database import get_cursor, pool_stats
+from api.services import (
+    answer_cache,
+    compact_vectors,
+    embedding_cache,
+    index_service,
+    llm_scheduler,
+    metadata_filter,
+    metrics,
+    ollama_client,
+    rag_jobs,
+    seed_service,
+    single_flight,
+    vector_index,
+    vectorizer_service,
+)
+from api.services.document_service import BulkIngestError
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +42,21 @@ seed_response = ns.model(
     {
         "message": fields.String(description="Resultado da carga"),
         "articles_inserted": fields.Integer(description="Número de artigos inseridos"),
+        "articles_existing": fields.Integer(
+            description="Artigos ignorados por já existirem (mesmo título)"
+        ),
     },
 )
 
+seed_parser = reqparse.RequestParser()
+seed_parser.add_argument(
+    "corpus",
+    type=str,
+    default="wikipedia",
+    location="args",
+    help="Nome do arquivo de corpus (.json/.ndjson) em SEED_DIR.",
+)
+
 vectorizer_status_model = ns.model(
     "VectorizerStatus",
     {
@@ -39,329 +67,167 @@ vectorizer_status_model = ns.model(
     },
 )
 
-health_model = ns.model(
-    "Health",
+vectorizer_config_model = ns.model(
+    "VectorizerConfig",
     {
-        "database": fields.String(description="Status do banco de dados"),
-        "ollama": fields.String(description="Status do Ollama"),
+        "id": fields.Integer(description="ID do vectorizer"),
+        "chunking": fields.Raw(description="Splitter, chunk_size e chunk_overlap"),
+        "processing": fields.Raw(description="batch_size e concurrency do worker"),
+        "scheduling": fields.Raw(
+            description="Agendamento no banco e --poll-interval do worker"
+        ),
+        "pending_items": fields.Integer(description="Itens aguardando embedding"),
+        "throughput": fields.Raw(
+            description="Itens/s processados na janela, ETA e backfill em andamento"
+        ),
+        "enqueued": fields.Integer(
+            description="Documentos re-enfileirados por esta alteração"
+        ),
+        "chunking_changed": fields.Boolean(description="O chunking mudou"),
     },
 )
 
-
-WIKI_ARTICLES = [
+vectorizer_update_input = ns.model(
+    "VectorizerUpdateInput",
     {
-        "url": "https://en.wikipedia.org/wiki/PostgreSQL",
-        "title": "PostgreSQL",
-        "content": (
-            "PostgreSQL, also known as Postgres, is a free and open-source "
-            "relational database management system (RDBMS) emphasizing "
-            "extensibility and SQL compliance. PostgreSQL features transactions "
-            "with atomicity, consistency, isolation, durability (ACID) "
-            "properties, automatically updatable views, materialized views, "
-            "triggers, foreign keys, and stored procedures. It is designed to "
-            "handle a range of workloads, from single machines to data "
-            "warehouses or web services with many concurrent users. It is the "
-            "default database for macOS Server and is also available for "
-            "Linux, FreeBSD, OpenBSD, and Windows."
+        "chunk_size": fields.Integer(description="Tamanho do chunk", example=512),
+        "chunk_overlap": fields.Integer(description="Sobreposição", example=50),
+        "batch_size": fields.Integer(description="Itens por lote do worker"),
+        "concurrency": fields.Integer(description="Lotes em paralelo no worker"),
+        "schedule_interval": fields.String(
+            description="Intervalo do job (só com agendamento timescaledb)",
+            example="5 minutes",
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Artificial_intelligence",
-        "title": "Artificial intelligence",
-        "content": (
-            "Artificial intelligence (AI) is the intelligence of machines or "
-            "software, as opposed to the intelligence of humans or animals. "
-            "It is a field of study in computer science that develops and "
-            "studies intelligent machines. Such machines may be called AIs. "
-            "AI technology is widely used throughout industry, government, "
-            "and science. Some high-profile applications are advanced web "
-            "search engines, recommendation systems, interacting via human "
-            "speech, self-driving cars, generative and creative tools, and "
-            "superhuman play and analysis in strategy games."
+        "revectorize": fields.Boolean(
+            default=True,
+            description="Se o chunking mudar, re-enfileira todos os documentos",
         ),
     },
+)
+
+revectorize_input = ns.model(
+    "RevectorizeInput",
     {
-        "url": "https://en.wikipedia.org/wiki/Machine_learning",
-        "title": "Machine learning",
-        "content": (
-            "Machine learning (ML) is a field of study in artificial "
-            "intelligence concerned with the development and study of "
-            "statistical algorithms that can learn from data and generalize "
-            "to unseen data, and thus perform tasks without explicit "
-            "instructions. Recently, generative artificial neural networks "
-            "have been able to surpass many previous approaches in performance. "
-            "Machine learning approaches have been applied to many fields "
-            "including natural language processing, computer vision, speech "
-            "recognition, email filtering, agriculture, and medicine."
+        "after_id": fields.Integer(
+            default=0, description="Enfileira documentos com id maior que este"
         ),
+        "limit": fields.Integer(description="Máximo de documentos neste lote"),
     },
+)
+
+revectorize_response = ns.model(
+    "RevectorizeResponse",
     {
-        "url": "https://en.wikipedia.org/wiki/Natural_language_processing",
-        "title": "Natural language processing",
-        "content": (
-            "Natural language processing (NLP) is an interdisciplinary "
-            "subfield of computer science and artificial intelligence. It is "
-            "primarily concerned with providing computers with the ability to "
-            "process data encoded in natural language and is thus closely "
-            "related to information retrieval, knowledge representation, and "
-            "computational linguistics. Typical NLP tasks include text "
-            "classification, named entity recognition, sentiment analysis, "
-            "machine translation, question answering, and summarization."
+        "enqueued": fields.Integer(description="Documentos enfileirados"),
+        "last_id": fields.Integer(
+            description="Último id enfileirado (after_id do próximo lote)"
         ),
+        "pending_items": fields.Integer(description="Itens aguardando embedding"),
     },
+)
+
+health_model = ns.model(
+    "Health",
     {
-        "url": "https://en.wikipedia.org/wiki/Vector_database",
-        "title": "Vector database",
-        "content": (
-            "A vector database is a type of database that stores data as "
-            "high-dimensional vectors, which are mathematical representations "
-            "of features or attributes. Each vector has a certain number of "
-            "dimensions, which can range from tens to thousands, depending on "
-            "the complexity of the data being represented. Vector databases "
-            "are used in similarity search, recommendation systems, and "
-            "anomaly detection. They use distance metrics like cosine "
-            "similarity, Euclidean distance, or dot product to find the most "
-            "similar vectors to a given query vector."
-        ),
+        "database": fields.String(description="Status do banco de dados"),
+        "ollama": fields.String(description="Status do Ollama"),
     },
+)
+
+index_input = ns.model(
+    "IndexInput",
     {
-        "url": "https://en.wikipedia.org/wiki/Transformer_(deep_learning_architecture)",
-        "title": "Transformer (deep learning)",
-        "content": (
-            "A transformer is a deep learning architecture developed by "
-            "researchers at Google and based on the multi-head attention "
-            "mechanism, proposed in the 2017 paper 'Attention Is All You "
-            "Need'. Text is converted to numerical representations called "
-            "tokens, and each token is converted into a vector via looking up "
-            "from a word embedding table. At each layer, each token is then "
-            "contextualized within the scope of the context window with other "
-            "tokens via a parallel multi-head attention mechanism. "
-            "Transformers have the advantage of having no recurrent units, "
-            "and therefore require less training time than earlier recurrent "
-            "neural architectures."
+        "method": fields.String(
+            description="Tipo de índice ANN",
+            enum=list(index_service.INDEX_METHODS),
+            example="hnsw",
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Large_language_model",
-        "title": "Large language model",
-        "content": (
-            "A large language model (LLM) is a computational model notable "
-            "for its ability to achieve general-purpose language generation "
-            "and other natural language processing tasks such as "
-            "classification. LLMs acquire these abilities by learning "
-            "statistical relationships from vast amounts of text during a "
-            "computationally intensive self-supervised and semi-supervised "
-            "training process. LLMs can be used for text generation, a form "
-            "of generative AI, by taking an input text and repeatedly "
-            "predicting the next token or word. Notable examples include "
-            "OpenAI's GPT models, Meta's LLaMA models, and Google's Gemini."
+        "m": fields.Integer(description="HNSW: conexões por nó", example=16),
+        "ef_construction": fields.Integer(
+            description="HNSW: tamanho da lista de candidatos na construção",
+            example=64,
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Retrieval-augmented_generation",
-        "title": "Retrieval-augmented generation",
-        "content": (
-            "Retrieval-augmented generation (RAG) is a technique that "
-            "combines information retrieval with text generation models to "
-            "produce more accurate and contextually relevant responses. In "
-            "RAG, when a query is received, the system first retrieves "
-            "relevant documents or passages from a knowledge base, then uses "
-            "these retrieved texts as additional context for the language "
-            "model to generate its response. This approach helps reduce "
-            "hallucinations, keeps responses grounded in factual information, "
-            "and allows the model to access knowledge beyond its training "
-            "data without expensive retraining."
+        "lists": fields.Integer(
+            description="IVFFlat: número de listas (padrão: calculado pelo volume)",
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Semantic_search",
-        "title": "Semantic search",
-        "content": (
-            "Semantic search denotes search with meaning, as distinguished "
-            "from lexical search where the search engine looks for literal "
-            "matches of the query words. Semantic search seeks to improve "
-            "search accuracy by understanding the searcher's intent and the "
-            "contextual meaning of terms as they appear in the searchable "
-            "dataspace. Semantic search uses vector embeddings to represent "
-            "both queries and documents in a high-dimensional space where "
-            "semantically similar items are positioned close together. "
-            "Technologies like pgvector enable semantic search directly "
-            "within PostgreSQL databases."
+        "concurrently": fields.Boolean(
+            default=False,
+            description="Construir sem bloquear escritas (CONCURRENTLY)",
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Word_embedding",
-        "title": "Word embedding",
-        "content": (
-            "In natural language processing, a word embedding is a "
-            "representation of a word. The embedding is used in text analysis. "
-            "Typically, the representation is a real-valued vector that "
-            "encodes the meaning of the word in such a way that the words "
-            "that are closer in the vector space are expected to be similar "
-            "in meaning. Word embeddings can be obtained using language "
-            "modeling and feature learning techniques, where words or phrases "
-            "from the vocabulary are mapped to vectors of real numbers. "
-            "Methods to generate this mapping include neural networks, "
-            "dimensionality reduction, and probabilistic models."
+        "replace": fields.Boolean(
+            default=False,
+            description="Remover o índice atual antes de criar o novo",
         ),
     },
+)
+
+index_rebuild_input = ns.model(
+    "IndexRebuildInput",
     {
-        "url": "https://en.wikipedia.org/wiki/Deep_learning",
-        "title": "Deep learning",
-        "content": (
-            "Deep learning is a subset of machine learning that uses "
-            "artificial neural networks with multiple layers to model and "
-            "understand complex patterns in data. Deep learning architectures "
-            "such as deep neural networks, recurrent neural networks, "
-            "convolutional neural networks, and transformers have been applied "
-            "to fields including computer vision, speech recognition, natural "
-            "language processing, machine translation, bioinformatics, drug "
-            "design, medical image analysis, and board game programs, where "
-            "they have produced results comparable to and sometimes surpassing "
-            "human expert performance."
+        "concurrently": fields.Boolean(
+            default=True,
+            description="Reconstruir sem bloquear escritas (CONCURRENTLY)",
         ),
     },
+)
+
+index_model = ns.model(
+    "Index",
     {
-        "url": "https://en.wikipedia.org/wiki/Neural_network_(machine_learning)",
-        "title": "Neural network",
-        "content": (
-            "In machine learning, a neural network is a model inspired by "
-            "the structure and function of biological neural networks in "
-            "animal brains. A neural network consists of connected units or "
-            "nodes called artificial neurons, which loosely model the neurons "
-            "in the brain. These are connected by edges, which model the "
-            "synapses. Each artificial neuron receives signals from connected "
-            "neurons, then processes them and sends a signal to other "
-            "connected neurons. The signal at each connection is a real "
-            "number, and the output of each neuron is computed by some "
-            "non-linear function of the sum of its inputs."
-        ),
+        "name": fields.String(description="Nome do índice"),
+        "method": fields.String(description="hnsw ou ivfflat"),
+        "definition": fields.String(description="Definição SQL"),
+        "size_bytes": fields.Integer(description="Tamanho em disco"),
+        "valid": fields.Boolean(description="Índice válido para consultas"),
+        "parameters": fields.Raw(description="Parâmetros de construção"),
     },
+)
+
+compact_storage_model = ns.model(
+    "CompactStorage",
     {
-        "url": "https://en.wikipedia.org/wiki/Computer_vision",
-        "title": "Computer vision",
-        "content": (
-            "Computer vision is an interdisciplinary scientific field that "
-            "deals with how computers can gain high-level understanding from "
-            "digital images or videos. From the perspective of engineering, "
-            "it seeks to understand and automate tasks that the human visual "
-            "system can do. Computer vision tasks include methods for "
-            "acquiring, processing, analyzing and understanding digital "
-            "images, and extraction of high-dimensional data from the real "
-            "world in order to produce numerical or symbolic information. "
-            "Applications include autonomous vehicles, medical imaging, "
-            "surveillance, and augmented reality."
-        ),
+        "mode": fields.String(description="full, halfvec, binary ou matryoshka"),
+        "column": fields.String(description="Coluna na tabela de embeddings"),
+        "rows": fields.Integer(description="Linhas na tabela"),
+        "avg_bytes": fields.Float(description="Bytes médios por valor"),
+        "column_bytes": fields.Integer(description="Bytes da coluna somados"),
+        "index": fields.String(description="Índice ANN da coluna"),
+        "index_bytes": fields.Integer(description="Tamanho do índice em disco"),
     },
+)
+
+stats_model = ns.model(
+    "Stats",
     {
-        "url": "https://en.wikipedia.org/wiki/Chatbot",
-        "title": "Chatbot",
-        "content": (
-            "A chatbot is a software application or web interface that is "
-            "designed to mimic human conversation through text or voice "
-            "interactions. Modern chatbots are typically online and use "
-            "generative artificial intelligence systems that are capable of "
-            "maintaining a conversation with a user in natural language and "
-            "simulating the way a human would behave as a conversational "
-            "partner. Chatbots are used in customer service, information "
-            "acquisition, education, healthcare, and entertainment. Recent "
-            "advances in large language models have significantly improved "
-            "chatbot capabilities."
+        "embedding_cache": fields.Raw(
+            description="Contadores do cache de embeddings de consulta"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Data_science",
-        "title": "Data science",
-        "content": (
-            "Data science is an interdisciplinary academic field that uses "
-            "statistics, scientific computing, scientific methods, processes, "
-            "algorithms and systems to extract or extrapolate knowledge and "
-            "insights from potentially noisy, structured, or unstructured "
-            "data. Data science also integrates domain knowledge from the "
-            "underlying application domain. Data science is multifaceted and "
-            "can be described as a science, a research paradigm, a research "
-            "method, a discipline, a workflow, and a profession. It employs "
-            "techniques from mathematics, statistics, computer science, and "
-            "information science."
+        "answer_cache": fields.Raw(
+            description="Acertos e segundos de LLM poupados pelo cache de respostas"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Python_(programming_language)",
-        "title": "Python (programming language)",
-        "content": (
-            "Python is a high-level, general-purpose programming language. "
-            "Its design philosophy emphasizes code readability with the use "
-            "of significant indentation. Python is dynamically typed and "
-            "garbage-collected. It supports multiple programming paradigms, "
-            "including structured, object-oriented and functional programming. "
-            "Python is commonly used for web development, data analysis, "
-            "artificial intelligence, machine learning, automation, and "
-            "scientific computing. Popular frameworks include Django, Flask, "
-            "NumPy, pandas, TensorFlow, and PyTorch."
+        "pool": fields.Raw(
+            description="Conexões em uso/ociosas, espera e histograma de espera"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/API",
-        "title": "API",
-        "content": (
-            "An application programming interface (API) is a way for two or "
-            "more computer programs or components to communicate with each "
-            "other. It is a type of software interface, offering a service to "
-            "other pieces of software. An API specification describes how to "
-            "build or use such a connection or interface. APIs are used to "
-            "integrate different software systems, enable communication "
-            "between services in microservice architectures, and provide "
-            "access to web services. REST APIs use HTTP requests to perform "
-            "CRUD operations and are widely used in modern web development."
+        "ollama": fields.Raw(
+            description="Requisições, erros, retries e latência por endpoint do Ollama"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Cloud_computing",
-        "title": "Cloud computing",
-        "content": (
-            "Cloud computing is the on-demand availability of computer system "
-            "resources, especially data storage and computing power, without "
-            "direct active management by the user. Large clouds often have "
-            "functions distributed over multiple locations, each of which is "
-            "a data center. Cloud computing relies on sharing of resources to "
-            "achieve coherence and typically uses a pay-as-you-go model, "
-            "which can help in reducing capital expenses. Major cloud "
-            "providers include Amazon Web Services (AWS), Microsoft Azure, "
-            "and Google Cloud Platform (GCP)."
+        "warmup": fields.Raw(
+            description="Resultado do pré-carregamento dos modelos na inicialização"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Docker_(software)",
-        "title": "Docker (software)",
-        "content": (
-            "Docker is a set of platform as a service (PaaS) products that "
-            "use OS-level virtualization to deliver software in packages "
-            "called containers. Containers are isolated from one another and "
-            "bundle their own software, libraries and configuration files; "
-            "they can communicate with each other through well-defined "
-            "channels. Docker containers are lightweight compared to virtual "
-            "machines because they share the host OS kernel. Docker is used "
-            "for deploying applications, microservices architecture, CI/CD "
-            "pipelines, and development environments."
+        "single_flight": fields.Raw(
+            description="Execuções líderes, seguidoras, erros e timeouts por grupo"
         ),
-    },
-    {
-        "url": "https://en.wikipedia.org/wiki/Prompt_engineering",
-        "title": "Prompt engineering",
-        "content": (
-            "Prompt engineering is the process of structuring an instruction "
-            "that can be interpreted and understood by a generative AI model. "
-            "A prompt is natural language text describing the task that an AI "
-            "should perform. In the context of large language models, prompt "
-            "engineering involves crafting inputs that guide the model to "
-            "produce desired outputs. Techniques include zero-shot prompting, "
-            "few-shot prompting, chain-of-thought prompting, and retrieval-"
-            "augmented generation. Effective prompt engineering can "
-            "significantly improve the quality of AI-generated responses "
-            "without modifying the underlying model."
+        "llm_scheduler": fields.Raw(
+            description="Gerações em andamento, fila por prioridade e recusas"
+        ),
+        "rag_jobs": fields.Raw(
+            description="Jobs RAG executados pelos workers desta instância"
+        ),
+        "vector_index": fields.Raw(
+            description="Snapshot vetorial local: geração, linhas, atraso e fallbacks"
         ),
     },
-]
+)
 
 
 @ns.route("/setup")
@@ -378,13 +244,65 @@ class Setup(Resource):
                     id SERIAL PRIMARY KEY,
                     title TEXT NOT NULL,
                     content TEXT NOT NULL,
-                    metadata JSONB DEFAULT '{}'::jsonb
+                    metadata JSONB DEFAULT '{}'::jsonb,
+                    idempotency_key TEXT
                 )
             """
             )
+            cur.execute(
+                """
+                ALTER TABLE documents
+                ADD COLUMN IF NOT EXISTS idempotency_key TEXT
+            """
+            )
+            cur.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS documents_idempotency_key_idx
+                ON documents (idempotency_key)
+            """
+            )
+            cur.execute(
+                """
+                ALTER TABLE documents
+                ADD COLUMN IF NOT EXISTS search_tsv tsvector
+                GENERATED ALWAYS AS (
+                    to_tsvector(%s::regconfig, title || ' ' || content)
+                ) STORED
+            """,
+                (Config.HYBRID_TS_CONFIG,),
+            )
+            cur.execute(
+                """
+                CREATE INDEX IF NOT EXISTS documents_search_tsv_idx
+                ON documents USING gin (search_tsv)
+            """
+            )
+            metadata_filter.create_indexes(cur)
+            backfilled = seed_service.backfill_seed_keys(cur)
+            if backfilled:
+                logger.info("%d documentos semeados receberam chave", backfilled)
             table_created = True
             logger.info("Tabela 'documents' verificada/criada")
 
+            cur.execute(
+                f"""
+                CREATE UNLOGGED TABLE IF NOT EXISTS {embedding_cache.SHARED_TABLE} (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    embedding REAL[] NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    PRIMARY KEY (model, text_hash)
+                )
+            """
+            )
+            logger.info("Tabela de cache de embeddings verificada/criada")
+
+            rag_jobs.create_table(cur)
+            logger.info("Tabela de jobs RAG verificada/criada")
+
+            # Savepoint: se create_vectorizer falhar, a transação continua
+            # válida para as etapas seguintes e para o que já foi criado.
+            cur.execute("SAVEPOINT create_vectorizer")
             try:
                 cur.execute(
                     """
@@ -397,19 +315,31 @@ class Setup(Resource):
                         ),
                         embedding => ai.embedding_ollama(%s, %s),
                         chunking => ai.chunking_recursive_character_text_splitter(
-                            chunk_size => 512,
-                            chunk_overlap => 50
+                            chunk_size => %s,
+                            chunk_overlap => %s
                         ),
                         formatting => ai.formatting_python_template(
                             '$title: $chunk'
+                        ),
+                        processing => ai.processing_default(
+                            batch_size => %s,
+                            concurrency => %s
                         )
                     )
                     """,
-                    (Config.EMBEDDING_MODEL, Config.EMBEDDING_DIMENSIONS),
+                    (
+                        Config.EMBEDDING_MODEL,
+                        Config.EMBEDDING_DIMENSIONS,
+                        Config.CHUNK_SIZE,
+                        Config.CHUNK_OVERLAP,
+                        Config.VECTORIZER_BATCH_SIZE or None,
+                        Config.VECTORIZER_CONCURRENCY or None,
+                    ),
                 )
                 vectorizer_created = True
                 logger.info("Vectorizer criado/verificado com sucesso")
             except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT create_vectorizer")
                 error_msg = str(e)
                 if "already exists" in error_msg.lower():
                     vectorizer_created = True
@@ -417,6 +347,36 @@ class Setup(Resource):
                 else:
                     logger.error("Erro ao criar vectorizer: %s", e)
                     ns.abort(500, f"Erro ao criar vectorizer: {error_msg}")
+            cur.execute("RELEASE SAVEPOINT create_vectorizer")
+
+            try:
+                index_service.create_index_in_transaction(cur)
+                logger.info("Índice ANN verificado/criado")
+            except Exception as e:
+                logger.error("Erro ao criar índice ANN: %s", e)
+                ns.abort(500, f"Erro ao criar índice ANN: {str(e)}")
+
+            try:
+                if compact_vectors.create_in_transaction(cur):
+                    logger.info("Cópias compactas dos embeddings verificadas/criadas")
+            except Exception as e:
+                logger.error("Erro ao criar cópias compactas: %s", e)
+                ns.abort(500, f"Erro ao criar cópias compactas: {str(e)}")
+
+            if Config.VECTOR_INDEX_ENABLED:
+                try:
+                    vector_index.create_change_log(cur)
+                    logger.info("Log de mudanças do índice vetorial local criado")
+                except Exception as e:
+                    logger.error("Erro ao criar log de mudanças: %s", e)
+                    ns.abort(500, f"Erro ao criar log de mudanças: {str(e)}")
+
+            try:
+                answer_cache.create_table(cur)
+                logger.info("Tabela de cache de respostas verificada/criada")
+            except Exception as e:
+                logger.error("Erro ao criar cache de respostas: %s", e)
+                ns.abort(500, f"Erro ao criar cache de respostas: {str(e)}")
 
         return {
             "message": "Setup concluído com sucesso",
@@ -427,9 +387,10 @@ class Setup(Resource):
 
 @ns.route("/seed")
 class Seed(Resource):
+    @ns.expect(seed_parser)
     @ns.marshal_with(seed_response)
     def post(self):
-        inserted = 0
+        args = seed_parser.parse_args()
 
         with get_cursor() as cur:
             cur.execute(
@@ -447,39 +408,26 @@ class Seed(Resource):
                     "Execute POST /api/system/setup primeiro.",
                 )
 
-            for article in WIKI_ARTICLES:
-                cur.execute(
-                    "SELECT id FROM documents WHERE title = %s",
-                    (article["title"],),
-                )
-                if cur.fetchone():
-                    logger.info(
-                        "Artigo '%s' já existe, pulando",
-                        article["title"],
-                    )
-                    continue
-
-                cur.execute(
-                    """
-                    INSERT INTO documents (title, content, metadata)
-                    VALUES (%s, %s, %s)
-                    """,
-                    (
-                        article["title"],
-                        article["content"],
-                        '{"source": "wikipedia", "url": "' + article["url"] + '"}',
-                    ),
-                )
-                inserted += 1
-                logger.info("Artigo inserido: %s", article["title"])
+        try:
+            result = seed_service.seed_corpus(args["corpus"])
+        except FileNotFoundError as e:
+            ns.abort(
+                404,
+                f"{e}. Disponíveis: {', '.join(seed_service.list_corpora())}",
+            )
+        except BulkIngestError as e:
+            ns.abort(400, f"Corpus inválido: {e}")
+        except ValueError as e:
+            ns.abort(400, str(e))
 
         return {
             "message": (
-                f"{inserted} artigos inseridos com sucesso. "
+                f"{result['inserted']} artigos inseridos com sucesso. "
                 "O vectorizer worker gerará os embeddings automaticamente. "
                 "Verifique o status em GET /api/system/vectorizer/status."
             ),
-            "articles_inserted": inserted,
+            "articles_inserted": result["inserted"],
+            "articles_existing": result["existing"],
         }
 
 
@@ -509,6 +457,59 @@ class VectorizerStatus(Resource):
             )
 
 
+@ns.route("/vectorizer")
+class Vectorizer(Resource):
+    @ns.marshal_with(vectorizer_config_model, skip_none=True)
+    @ns.response(404, "Vectorizer não existe")
+    def get(self):
+        try:
+            return vectorizer_service.get()
+        except LookupError as e:
+            ns.abort(404, str(e))
+
+    @ns.expect(vectorizer_update_input, validate=True)
+    @ns.marshal_with(vectorizer_config_model, skip_none=True)
+    @ns.response(404, "Vectorizer não existe")
+    def patch(self):
+        data = ns.payload or {}
+        try:
+            return vectorizer_service.update(
+                chunk_size=data.get("chunk_size"),
+                chunk_overlap=data.get("chunk_overlap"),
+                batch_size=data.get("batch_size"),
+                concurrency=data.get("concurrency"),
+                schedule_interval=data.get("schedule_interval"),
+                revectorize=data.get("revectorize", True),
+            )
+        except LookupError as e:
+            ns.abort(404, str(e))
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except Exception as e:
+            logger.error("Erro ao atualizar vectorizer: %s", e)
+            ns.abort(500, f"Erro ao atualizar vectorizer: {str(e)}")
+
+
+@ns.route("/vectorizer/revectorize")
+class Revectorize(Resource):
+    @ns.expect(revectorize_input, validate=True)
+    @ns.marshal_with(revectorize_response)
+    @ns.response(404, "Vectorizer não existe")
+    def post(self):
+        data = ns.payload or {}
+        try:
+            return vectorizer_service.revectorize(
+                after_id=data.get("after_id") or 0, limit=data.get("limit")
+            )
+        except LookupError as e:
+            ns.abort(404, str(e))
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except Exception as e:
+            logger.error("Erro ao re-enfileirar documentos: %s", e)
+            ns.abort(500, f"Erro ao re-enfileirar documentos: {str(e)}")
+
+
 @ns.route("/health")
 class Health(Resource):
     @ns.marshal_with(health_model)
@@ -523,10 +524,276 @@ class Health(Resource):
             result["database"] = "erro"
 
         try:
-            resp = req.get(f"{Config.OLLAMA_HOST}/api/tags", timeout=5)
-            resp.raise_for_status()
+            ollama_client.tags()
             result["ollama"] = "ok"
         except Exception:
             result["ollama"] = "erro"
 
         return result
+
+
+@ns.route("/index")
+class AnnIndex(Resource):
+    @ns.marshal_with(index_model)
+    @ns.response(404, "Índice ANN não existe")
+    def get(self):
+        info = index_service.get_index()
+        if not info:
+            ns.abort(404, "Índice ANN não existe")
+        return info
+
+    @ns.expect(index_input)
+    @ns.marshal_with(index_model, code=201)
+    @ns.response(409, "Índice ANN já existe com outra definição")
+    def post(self):
+        data = ns.payload or {}
+        try:
+            info = index_service.create_index(
+                method=data.get("method"),
+                m=data.get("m"),
+                ef_construction=data.get("ef_construction"),
+                lists=data.get("lists"),
+                concurrently=data.get("concurrently", False),
+                replace=data.get("replace", False),
+            )
+        except ValueError as e:
+            ns.abort(400, str(e))
+        except index_service.IndexConflict as e:
+            ns.abort(409, str(e))
+        except Exception as e:
+            logger.error("Erro ao criar índice ANN: %s", e)
+            ns.abort(500, f"Erro ao criar índice ANN: {str(e)}")
+        return info, 201
+
+    @ns.response(204, "Índice ANN removido")
+    @ns.response(404, "Índice ANN não existe")
+    def delete(self):
+        if not index_service.drop_index():
+            ns.abort(404, "Índice ANN não existe")
+        return "", 204
+
+
+@ns.route("/index/compact")
+class CompactIndex(Resource):
+    @ns.marshal_list_with(compact_storage_model)
+    def get(self):
+        # Lê a tabela inteira (pg_column_size por linha): uso administrativo.
+        return compact_vectors.storage()
+
+
+@ns.route("/index/rebuild")
+class AnnIndexRebuild(Resource):
+    @ns.expect(index_rebuild_input)
+    @ns.marshal_with(index_model)
+    @ns.response(404, "Índice ANN não existe")
+    def post(self):
+        data = ns.payload or {}
+        if not index_service.get_index():
+            ns.abort(404, "Índice ANN não existe")
+        try:
+            return index_service.rebuild_index(
+                concurrently=data.get("concurrently", True)
+            )
+        except Exception as e:
+            logger.error("Erro ao reconstruir índice ANN: %s", e)
+            ns.abort(500, f"Erro ao reconstruir índice ANN: {str(e)}")
+
+
+@ns.route("/stats")
+class Stats(Resource):
+    @ns.marshal_with(stats_model)
+    def get(self):
+        return {
+            "embedding_cache": embedding_cache.stats(),
+            "answer_cache": answer_cache.stats(),
+            "pool": pool_stats(),
+            "ollama": ollama_client.stats(),
+            "warmup": ollama_client.warmup_status(),
+            "single_flight": single_flight.stats(),
+            "llm_scheduler": llm_scheduler.stats(),
+            "rag_jobs": rag_jobs.stats(),
+            "vector_index": vector_index.stats(),
+        }
+
+
+@ns.route("/cache")
+class Cache(Resource):
+    @ns.response(204, "Cache de embeddings limpo")
+    def delete(self):
+        embedding_cache.clear()
+        return "", 204
+
+
+@metrics.collector
+def _pool_metrics():
+    stats = pool_stats()
+    lines = metrics.family(
+        "db_pool_connections",
+        "Conexões do pool por estado.",
+        [
+            ({"state": state}, stats.get(state))
+            for state in ("in_use", "idle", "opening")
+        ],
+    )
+    lines += metrics.family(
+        "db_pool_max_connections",
+        "Tamanho máximo do pool.",
+        [({}, stats.get("max_size"))],
+    )
+    lines += metrics.family(
+        "db_pool_waiting",
+        "Threads esperando uma conexão.",
+        [({}, stats.get("waiting"))],
+    )
+    lines += metrics.family(
+        "db_pool_timeouts_total",
+        "Esperas por conexão que estouraram o timeout.",
+        [({}, stats.get("timeouts"))],
+        kind="counter",
+    )
+    return lines
+
+
+@metrics.collector
+def _cache_metrics():
+    embedding = embedding_cache.stats()
+    answers = answer_cache.stats()
+    return metrics.family(
+        "cache_hit_ratio",
+        "Taxa de acerto dos caches deste processo.",
+        [
+            ({"cache": "embedding"}, embedding["hit_rate"]),
+            ({"cache": "answer"}, answers["hit_rate"]),
+        ],
+    ) + metrics.family(
+        "cache_entries",
+        "Entradas em cache (embedding: memória local; answer: tabela).",
+        [
+            ({"cache": "embedding"}, embedding["size"]),
+            ({"cache": "answer"}, answers.get("global", {}).get("entries")),
+        ],
+    )
+
+
+@metrics.collector
+def _ollama_metrics():
+    stats = ollama_client.stats()
+    lines = metrics.family(
+        "ollama_requests_total",
+        "Chamadas ao Ollama por endpoint.",
+        [({"endpoint": e}, s["requests"]) for e, s in stats.items()],
+        kind="counter",
+    )
+    lines += metrics.family(
+        "ollama_errors_total",
+        "Chamadas ao Ollama que falharam (após retries).",
+        [({"endpoint": e}, s["errors"]) for e, s in stats.items()],
+        kind="counter",
+    )
+    lines += metrics.family(
+        "ollama_retries_total",
+        "Novas tentativas de chamadas ao Ollama.",
+        [({"endpoint": e}, s["retries"]) for e, s in stats.items()],
+        kind="counter",
+    )
+    return lines
+
+
+@metrics.collector
+def _single_flight_metrics():
+    stats = single_flight.stats()
+    return metrics.family(
+        "single_flight_calls_total",
+        "Chamadas por grupo: leader executa, follower reaproveita a execução.",
+        [
+            ({"group": name, "role": role}, s[f"{role}s"])
+            for name, s in stats.items()
+            for role in ("leader", "follower")
+        ],
+        kind="counter",
+    ) + metrics.family(
+        "single_flight_timeouts_total",
+        "Seguidoras que desistiram de esperar a execução em andamento.",
+        [({"group": name}, s["timeouts"]) for name, s in stats.items()],
+        kind="counter",
+    )
+
+
+@metrics.collector
+def _llm_scheduler_metrics():
+    stats = llm_scheduler.stats()
+    lines = metrics.family(
+        "llm_active_generations",
+        "Gerações em andamento no Ollama.",
+        [({}, stats["active"])],
+    )
+    lines += metrics.family(
+        "llm_queue_depth",
+        "Requisições aguardando vaga para gerar, por prioridade.",
+        [({"priority": p}, depth) for p, depth in stats["queued"].items()],
+    )
+    return lines + llm_scheduler.queue_wait.render() + llm_scheduler.rejections.render()
+
+
+@metrics.collector
+def _vector_index_metrics():
+    stats = vector_index.stats()
+    if not stats["enabled"]:
+        return []
+    lines = metrics.family(
+        "vector_index_rows",
+        "Chunks no snapshot vetorial local.",
+        [
+            ({"state": "live"}, stats.get("live")),
+            ({"state": "total"}, stats.get("rows")),
+        ],
+    )
+    lines += metrics.family(
+        "vector_index_lag_seconds",
+        "Tempo desde o último refresh aplicado ao snapshot.",
+        [({}, stats.get("lag_s"))],
+    )
+    lines += metrics.family(
+        "vector_index_searches_total",
+        "Buscas respondidas pelo snapshot ou devolvidas ao SQL, por motivo.",
+        [({"result": "hit"}, stats["searches"])]
+        + [({"result": reason}, n) for reason, n in stats["fallbacks"].items()],
+        kind="counter",
+    )
+    return lines
+
+
+@metrics.collector
+def _vectorizer_metrics():
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, target_table::text AS target_table,
+                   COALESCE(pending_items, 0) AS pending_items
+            FROM ai.vectorizer_status
+        """
+        )
+        rows = cur.fetchall()
+    return metrics.family(
+        "vectorizer_pending_items",
+        "Itens aguardando embedding no vectorizer (ai.vectorizer_status).",
+        [
+            (
+                {"vectorizer": row["id"], "target": row["target_table"]},
+                row["pending_items"],
+            )
+            for row in rows
+        ],
+    ) + metrics.family(
+        "vectorizer_throughput_items_per_second",
+        "Itens/s que saíram da fila do vectorizer na janela recente.",
+        [({}, vectorizer_service.throughput()["items_per_second"])],
+    )
+
+
+@ns.route("/metrics")
+class Metrics(Resource):
+    @ns.produces([metrics.CONTENT_TYPE])
+    @ns.response(200, "Métricas no formato de texto do Prometheus")
+    def get(self):
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
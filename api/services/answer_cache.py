@@ -0,0 +1,246 @@
+import json
+import logging
+import threading
+from typing import Any
+
+import psycopg2
+
+from api.config import Config
+from api.database import Vector, get_cursor
+
+logger = logging.getLogger(__name__)
+
+TABLE = "rag_answer_cache"
+
+_PURGE_EVERY = 100
+
+_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "invalidated": 0,
+    "errors": 0,
+    "saved_llm_seconds": 0.0,
+}
+
+
+def create_table(cur) -> None:
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            model TEXT NOT NULL,
+            embedding_model TEXT NOT NULL,
+            question TEXT NOT NULL,
+            question_embedding vector({Config.EMBEDDING_DIMENSIONS}) NOT NULL,
+            source_chunk_ids UUID[] NOT NULL,
+            source_document_ids INTEGER[] NOT NULL,
+            answer TEXT NOT NULL,
+            llm_seconds REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            last_hit_at TIMESTAMPTZ
+        )
+        """)
+    cur.execute(f"""
+        ALTER TABLE {TABLE}
+        ADD COLUMN IF NOT EXISTS sources JSONB
+        """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {TABLE}_lookup_idx
+        ON {TABLE} (model, embedding_model, source_chunk_ids)
+        """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {TABLE}_documents_idx
+        ON {TABLE} USING gin (source_document_ids)
+        """)
+
+
+def _chunk_ids(chunks: list[dict[str, Any]]) -> list[str]:
+    # Os UUIDs dos chunks mudam quando o vectorizer reprocessa um documento,
+    # então uma resposta só é reaproveitada se o conjunto recuperado agora
+    # for exatamente o mesmo (e na mesma versão) de quando foi gerada.
+    return sorted(chunk["chunk_id"] for chunk in chunks)
+
+
+def _record_error(action: str, error: Exception) -> None:
+    with _lock:
+        _stats["errors"] += 1
+    logger.warning("Falha ao %s no cache de respostas: %s", action, error)
+
+
+def lookup(
+    question_embedding: list[float],
+    model: str,
+    chunks: list[dict[str, Any]],
+) -> dict[str, Any] | None:
+    if not Config.RAG_ANSWER_CACHE_ENABLED or not chunks:
+        return None
+
+    try:
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                WITH candidate AS (
+                    SELECT id, question_embedding <=> %s AS distance
+                    FROM {TABLE}
+                    WHERE model = %s
+                      AND embedding_model = %s
+                      AND source_chunk_ids = %s::uuid[]
+                      AND (%s <= 0 OR created_at > now() - make_interval(secs => %s))
+                    ORDER BY distance
+                    LIMIT 1
+                )
+                UPDATE {TABLE} c
+                SET hits = c.hits + 1, last_hit_at = now()
+                FROM candidate
+                WHERE c.id = candidate.id AND candidate.distance <= %s
+                RETURNING
+                    c.answer, c.question, c.sources, c.llm_seconds, candidate.distance
+                """,
+                (
+                    Vector(question_embedding),
+                    model,
+                    Config.EMBEDDING_MODEL,
+                    _chunk_ids(chunks),
+                    Config.RAG_ANSWER_CACHE_TTL,
+                    Config.RAG_ANSWER_CACHE_TTL,
+                    Config.RAG_ANSWER_CACHE_MAX_DISTANCE,
+                ),
+            )
+            row = cur.fetchone()
+    except (psycopg2.Error, RuntimeError) as e:
+        _record_error("consultar", e)
+        return None
+
+    with _lock:
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        _stats["saved_llm_seconds"] += row["llm_seconds"]
+
+    logger.info(
+        "Resposta reaproveitada do cache (distância %.4f de '%s')",
+        row["distance"],
+        row["question"][:50],
+    )
+    return dict(row)
+
+
+def store(
+    question: str,
+    question_embedding: list[float],
+    model: str,
+    chunks: list[dict[str, Any]],
+    answer: str,
+    llm_seconds: float,
+    sources: list[dict[str, Any]] | None = None,
+) -> None:
+    # `sources` são as fontes que entraram no contexto (após o empacotamento),
+    # devolvidas como estão num acerto futuro.
+    if not Config.RAG_ANSWER_CACHE_ENABLED or not chunks:
+        return
+
+    with _lock:
+        purge = (_stats["stores"] + 1) % _PURGE_EVERY == 0
+    try:
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {TABLE} (
+                    model, embedding_model, question, question_embedding,
+                    source_chunk_ids, source_document_ids, answer, llm_seconds,
+                    sources
+                )
+                VALUES (%s, %s, %s, %s, %s::uuid[], %s, %s, %s, %s::jsonb)
+                """,
+                (
+                    model,
+                    Config.EMBEDDING_MODEL,
+                    question,
+                    Vector(question_embedding),
+                    _chunk_ids(chunks),
+                    sorted({chunk["id"] for chunk in chunks}),
+                    answer,
+                    llm_seconds,
+                    json.dumps(sources) if sources is not None else None,
+                ),
+            )
+            # Entradas vencidas já são ignoradas na consulta; a limpeza
+            # periódica impede que a tabela cresça sem limite.
+            if purge and Config.RAG_ANSWER_CACHE_TTL > 0:
+                cur.execute(
+                    f"""
+                    DELETE FROM {TABLE}
+                    WHERE created_at < now() - make_interval(secs => %s)
+                    """,
+                    (Config.RAG_ANSWER_CACHE_TTL,),
+                )
+                if cur.rowcount:
+                    logger.info(
+                        "Cache de respostas: %d entradas vencidas removidas",
+                        cur.rowcount,
+                    )
+    except (psycopg2.Error, RuntimeError) as e:
+        _record_error("gravar", e)
+        return
+
+    with _lock:
+        _stats["stores"] += 1
+
+
+def invalidate_documents(doc_ids: list[int]) -> int:
+    if not doc_ids:
+        return 0
+
+    try:
+        with get_cursor() as cur:
+            cur.execute(
+                f"DELETE FROM {TABLE} WHERE source_document_ids && %s::int[]",
+                (list(doc_ids),),
+            )
+            removed = cur.rowcount
+    except (psycopg2.Error, RuntimeError) as e:
+        _record_error("invalidar", e)
+        return 0
+
+    if removed:
+        with _lock:
+            _stats["invalidated"] += removed
+        logger.info(
+            "Cache de respostas: %d entradas invalidadas (documentos %s)",
+            removed,
+            doc_ids,
+        )
+    return removed
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        local = dict(_stats)
+    lookups = local["hits"] + local["misses"]
+    local["hit_rate"] = round(local["hits"] / lookups, 4) if lookups else 0.0
+    local["saved_llm_seconds"] = round(local["saved_llm_seconds"], 2)
+    local["enabled"] = Config.RAG_ANSWER_CACHE_ENABLED
+
+    # Totais de todos os workers, a partir da própria tabela.
+    try:
+        with get_cursor() as cur:
+            cur.execute(f"""
+                SELECT
+                    count(*) AS entries,
+                    COALESCE(sum(hits), 0) AS hits,
+                    COALESCE(sum(hits * llm_seconds), 0) AS saved_llm_seconds
+                FROM {TABLE}
+                """)
+            row = cur.fetchone()
+        local["global"] = {
+            "entries": row["entries"],
+            "hits": int(row["hits"]),
+            "saved_llm_seconds": round(float(row["saved_llm_seconds"]), 2),
+        }
+    except (psycopg2.Error, RuntimeError) as e:
+        _record_error("ler estatísticas", e)
+
+    return local
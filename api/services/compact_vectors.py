@@ -0,0 +1,147 @@
+import logging
+from typing import Any
+
+from api.config import Config
+from api.database import get_cursor
+from api.services import index_service
+from api.services.index_service import EMBEDDINGS_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Cópias compactas do embedding, como colunas geradas na própria tabela do
+# vectorizer (o pgai só grava `embedding`; o Postgres mantém as demais):
+#   halfvec     mesmo vetor em meia precisão (metade do tamanho)
+#   binary      1 bit por dimensão (binary_quantize), comparado por Hamming
+#   matryoshka  prefixo das primeiras MATRYOSHKA_DIMENSIONS dimensões, em
+#               meia precisão; o nomic-embed-text é treinado para que o
+#               prefixo preserve a maior parte da semelhança
+# Cada uma tem seu índice ANN e serve só para a primeira fase da busca; a
+# ordem final sempre vem da distância exata no vetor completo.
+MODES = ("halfvec", "binary", "matryoshka")
+
+
+def spec(mode: str) -> dict[str, str]:
+    dimensions = Config.EMBEDDING_DIMENSIONS
+    short = Config.MATRYOSHKA_DIMENSIONS
+    if mode == "halfvec":
+        return {
+            "column": "embedding_half",
+            "type": f"halfvec({dimensions})",
+            "expression": f"embedding::halfvec({dimensions})",
+            "opclass": "halfvec_cosine_ops",
+            "distance": f"emb.embedding_half <=> %(vector)s::halfvec({dimensions})",
+        }
+    if mode == "binary":
+        return {
+            "column": "embedding_bit",
+            "type": f"bit({dimensions})",
+            "expression": f"binary_quantize(embedding)::bit({dimensions})",
+            "opclass": "bit_hamming_ops",
+            "distance": (
+                f"emb.embedding_bit <~> binary_quantize(%(vector)s)::bit({dimensions})"
+            ),
+        }
+    if mode == "matryoshka":
+        return {
+            "column": "embedding_matryoshka",
+            "type": f"halfvec({short})",
+            "expression": f"subvector(embedding, 1, {short})::halfvec({short})",
+            "opclass": "halfvec_cosine_ops",
+            "distance": (
+                f"emb.embedding_matryoshka <=> "
+                f"subvector(%(vector)s, 1, {short})::halfvec({short})"
+            ),
+        }
+    raise ValueError(f"Representação compacta inválida: {mode}")
+
+
+def enabled() -> list[str]:
+    modes = [m.strip().lower() for m in Config.COMPACT_VECTORS.split(",") if m.strip()]
+    for mode in modes:
+        spec(mode)
+    return modes
+
+
+def index_name(mode: str) -> str:
+    return f"documents_embeddings_store_{spec(mode)['column']}_idx"
+
+
+def create_in_transaction(cur, modes: list[str] | None = None) -> list[str]:
+    # ADD COLUMN ... STORED reescreve a tabela uma vez; depois o custo é
+    # calculado a cada INSERT do vectorizer. Mudar MATRYOSHKA_DIMENSIONS
+    # exige remover a coluna antes (IF NOT EXISTS mantém a antiga).
+    if Config.MATRYOSHKA_DIMENSIONS > Config.EMBEDDING_DIMENSIONS:
+        raise ValueError("MATRYOSHKA_DIMENSIONS maior que EMBEDDING_DIMENSIONS")
+
+    modes = enabled() if modes is None else modes
+    for mode in modes:
+        info = spec(mode)
+        cur.execute(f"""
+            ALTER TABLE {EMBEDDINGS_TABLE}
+            ADD COLUMN IF NOT EXISTS {info['column']} {info['type']}
+            GENERATED ALWAYS AS ({info['expression']}) STORED
+            """)
+        index_service.create_index_in_transaction(
+            cur,
+            name=index_name(mode),
+            column=info["column"],
+            opclass=info["opclass"],
+        )
+        logger.info("Representação compacta '%s' verificada/criada", mode)
+    return modes
+
+
+def candidates(limit: int) -> int:
+    return max(
+        limit,
+        min(Config.COMPACT_MAX_CANDIDATES, limit * Config.COMPACT_CANDIDATE_FACTOR),
+    )
+
+
+def storage() -> list[dict[str, Any]]:
+    with get_cursor() as cur:
+        return storage_in_transaction(cur)
+
+
+def storage_in_transaction(cur) -> list[dict[str, Any]]:
+    # Bytes por linha e totais da coluna (pg_column_size, já comprimida se
+    # for o caso) e do índice ANN de cada representação, incluindo o vetor
+    # completo como referência.
+    representations = [("full", "embedding", index_service.INDEX_NAME)]
+    representations += [(m, spec(m)["column"], index_name(m)) for m in MODES]
+    cur.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+          AND table_name = 'documents_embeddings_store'
+        """)
+    existing = {row["column_name"] for row in cur.fetchall()}
+
+    result = []
+    for mode, column, index in representations:
+        if column not in existing:
+            continue
+        cur.execute(
+            f"""
+            SELECT
+                count(*) AS rows,
+                COALESCE(avg(pg_column_size({column})), 0) AS avg_bytes,
+                COALESCE(sum(pg_column_size({column})), 0) AS column_bytes,
+                pg_relation_size(to_regclass(%s)) AS index_bytes
+            FROM {EMBEDDINGS_TABLE}
+            """,
+            (f"public.{index}",),
+        )
+        row = cur.fetchone()
+        result.append(
+            {
+                "mode": mode,
+                "column": column,
+                "rows": row["rows"],
+                "avg_bytes": round(float(row["avg_bytes"]), 1),
+                "column_bytes": int(row["column_bytes"]),
+                "index": index if row["index_bytes"] is not None else None,
+                "index_bytes": row["index_bytes"],
+            }
+        )
+    return result
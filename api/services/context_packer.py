@@ -0,0 +1,158 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from api.config import Config
+
+# Sem o tokenizer do modelo, ~4 caracteres por token é a aproximação usual
+# para texto em inglês/português com tokenizers BPE.
+CHARS_PER_TOKEN = 4
+SEGMENT_SEPARATOR = "\n[...]\n"
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class PackedContext:
+    documents: list[dict[str, Any]] = field(default_factory=list)
+    chunks: list[dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "documents": len(self.documents),
+            "chunks": len(self.chunks),
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "dropped_duplicates": self.duplicates,
+            "dropped_over_budget": self.over_budget,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def context_budget(scaffold_tokens: int) -> int:
+    # Janela do modelo (num_ctx) menos a reserva para a resposta e o que o
+    # prompt ocupa sem documentos (instruções + pergunta).
+    if Config.RAG_CONTEXT_TOKENS > 0:
+        return Config.RAG_CONTEXT_TOKENS
+    return max(0, Config.LLM_NUM_CTX - Config.RAG_ANSWER_TOKENS - scaffold_tokens)
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = _WORD.findall(text.casefold())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _near_duplicate(shingles: set, accepted: list[set]) -> bool:
+    threshold = Config.RAG_DEDUP_THRESHOLD
+    for other in accepted:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= threshold:
+            return True
+    return False
+
+
+def _starts_word(text: str, start: int) -> bool:
+    return start == 0 or not (text[start - 1].isalnum() and text[start].isalnum())
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    # Chunks vizinhos do splitter repetem até chunk_overlap caracteres: o
+    # maior sufixo de `left` que é prefixo de `right` é removido de `right`.
+    # Sobreposições curtas são coincidência ("the" + "every" não é "thevery"),
+    # então abaixo do mínimo os chunks só são unidos por espaço; entre as
+    # sobreposições válidas, prefere a que começa numa fronteira de palavra.
+    left, right = left.rstrip(), right.lstrip()
+    minimum = max(10, Config.CHUNK_OVERLAP // 2)
+    limit = min(len(left), len(right), Config.CHUNK_OVERLAP * 2)
+    fallback = None
+    for size in range(limit, minimum - 1, -1):
+        if not left.endswith(right[:size]):
+            continue
+        if _starts_word(left, len(left) - size):
+            return left + right[size:]
+        if fallback is None:
+            fallback = size
+    if fallback is not None:
+        return left + right[fallback:]
+    return f"{left} {right}"
+
+
+def _render(segments: list[dict[str, Any]]) -> str:
+    # Segmentos de um mesmo documento em ordem de chunk_seq; sequências
+    # consecutivas viram um único trecho contínuo.
+    ordered = sorted(segments, key=lambda c: c["chunk_seq"])
+    parts: list[str] = []
+    previous_seq = None
+    for chunk in ordered:
+        if previous_seq is not None and chunk["chunk_seq"] == previous_seq + 1:
+            parts[-1] = _join_overlapping(parts[-1], chunk["chunk"])
+        else:
+            parts.append(chunk["chunk"].strip())
+        previous_seq = chunk["chunk_seq"]
+    return SEGMENT_SEPARATOR.join(parts)
+
+
+def document_header(index: int, title: str) -> str:
+    return f"[Document {index} - {title}]:\n"
+
+
+def pack(chunks: list[dict[str, Any]], budget: int) -> PackedContext:
+    # Percorre os chunks em ordem de relevância: descarta quase-duplicados,
+    # agrupa por documento (mesclando vizinhos) e aceita cada chunk só se o
+    # contexto resultante couber no orçamento de tokens.
+    packed = PackedContext(budget=budget)
+    groups: dict[int, dict[str, Any]] = {}
+    accepted: list[set] = []
+    used = 0
+
+    for chunk in chunks:
+        shingles = _shingles(chunk["chunk"])
+        if _near_duplicate(shingles, accepted):
+            packed.duplicates += 1
+            continue
+
+        group = groups.get(chunk["id"])
+        if group is None:
+            header = document_header(len(groups) + 1, chunk["title"])
+            current = 0
+            segments = [chunk]
+        else:
+            header = group["header"]
+            current = group["tokens"]
+            segments = group["segments"] + [chunk]
+
+        tokens = estimate_tokens(header + _render(segments))
+        if used - current + tokens > budget:
+            packed.over_budget += 1
+            continue
+
+        used += tokens - current
+        accepted.append(shingles)
+        packed.chunks.append(chunk)
+        if group is None:
+            groups[chunk["id"]] = {
+                "id": chunk["id"],
+                "title": chunk["title"],
+                "header": header,
+                "segments": segments,
+                "tokens": tokens,
+            }
+        else:
+            group["segments"] = segments
+            group["tokens"] = tokens
+
+    packed.documents = [
+        {"id": g["id"], "title": g["title"], "text": _render(g["segments"])}
+        for g in groups.values()
+    ]
+    packed.tokens = used
+    return packed
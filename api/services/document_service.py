@@ -1,12 +1,25 @@
+import csv
+import io
 import json
 import logging
-from typing import Any
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
-from api.database import get_cursor
+from psycopg2.extras import RealDictCursor
+
+from api.config import Config
+from api.database import get_connection, get_cursor
+from api.services import answer_cache
 
 logger = logging.getLogger(__name__)
 
 
+class BulkIngestError(ValueError):
+    def __init__(self, message: str, results: list[dict[str, Any]]):
+        super().__init__(message)
+        self.results = results
+
+
 def create_document(
     title: str, content: str, metadata: dict | None = None
 ) -> dict[str, Any]:
@@ -24,15 +37,46 @@ def create_document(
         row = cur.fetchone()
 
     logger.info("Documento criado: id=%s, title=%s", row["id"], row["title"])
+    answer_cache.invalidate_documents([row["id"]])
     return dict(row)
 
 
-def get_all_documents() -> list[dict[str, Any]]:
+def list_documents(after_id: int = 0, limit: int = 100) -> list[dict[str, Any]]:
+    # Paginação keyset: cada página parte do último id visto, então o custo
+    # não cresce com a posição na tabela (ao contrário de OFFSET).
     with get_cursor() as cur:
-        cur.execute("SELECT id, title, content, metadata FROM documents ORDER BY id")
+        cur.execute(
+            """
+            SELECT id, title, content, metadata
+            FROM documents
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+            """,
+            (after_id, limit),
+        )
         return [dict(row) for row in cur.fetchall()]
 
 
+def iter_documents(after_id: int = 0) -> Iterator[dict[str, Any]]:
+    # Cursor nomeado (server-side): o Postgres entrega EXPORT_BATCH_SIZE
+    # linhas por vez, então a memória fica constante para qualquer tamanho.
+    with get_connection() as conn:
+        with conn.cursor(name="documents_export", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = Config.DOCUMENTS_EXPORT_BATCH_SIZE
+            cur.execute(
+                """
+                SELECT id, title, content, metadata
+                FROM documents
+                WHERE id > %s
+                ORDER BY id
+                """,
+                (after_id,),
+            )
+            for row in cur:
+                yield dict(row)
+
+
 def get_document_by_id(doc_id: int) -> dict[str, Any] | None:
     with get_cursor() as cur:
         cur.execute(
@@ -50,5 +94,141 @@ def delete_document(doc_id: int) -> bool:
 
     if deleted:
         logger.info("Documento removido: id=%s", doc_id)
+        answer_cache.invalidate_documents([doc_id])
         return True
     return False
+
+
+def validate_bulk_record(record: Any, position: int) -> dict[str, Any]:
+    if not isinstance(record, dict):
+        raise ValueError(f"Registro {position}: esperado um objeto JSON")
+    title, content = record.get("title"), record.get("content")
+    if not isinstance(title, str) or not title:
+        raise ValueError(f"Registro {position}: 'title' é obrigatório")
+    if not isinstance(content, str) or not content:
+        raise ValueError(f"Registro {position}: 'content' é obrigatório")
+    metadata = record.get("metadata") or {}
+    if not isinstance(metadata, dict):
+        raise ValueError(f"Registro {position}: 'metadata' deve ser um objeto")
+    key = record.get("idempotency_key")
+    if key is not None and (not isinstance(key, str) or not key):
+        raise ValueError(f"Registro {position}: 'idempotency_key' deve ser texto")
+    return {
+        "title": title,
+        "content": content,
+        "metadata": metadata,
+        "idempotency_key": key,
+    }
+
+
+def _copy_batch(cur, batch: list[tuple[int, dict[str, Any]]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for ord_, record in batch:
+        # None sai como "" no CSV; FORCE_NULL no COPY o transforma em NULL
+        # (chaves vazias são rejeitadas na validação).
+        writer.writerow(
+            (
+                ord_,
+                record["title"],
+                record["content"],
+                json.dumps(record["metadata"], ensure_ascii=False),
+                record["idempotency_key"],
+            )
+        )
+    buffer.seek(0)
+    cur.copy_expert(
+        """
+        COPY documents_bulk_stage (ord, title, content, metadata, idempotency_key)
+        FROM STDIN WITH (FORMAT csv, FORCE_NULL (idempotency_key))
+        """,
+        buffer,
+    )
+
+
+def _insert_batch(batch: list[tuple[int, dict[str, Any]]]) -> list[dict[str, Any]]:
+    with get_cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE documents_bulk_stage (
+                ord INTEGER NOT NULL,
+                id INTEGER NOT NULL DEFAULT nextval(
+                    pg_get_serial_sequence('public.documents', 'id')::regclass
+                ),
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata JSONB NOT NULL,
+                idempotency_key TEXT
+            ) ON COMMIT DROP
+            """)
+        _copy_batch(cur, batch)
+        cur.execute("""
+            INSERT INTO documents (id, title, content, metadata, idempotency_key)
+            SELECT id, title, content, metadata, idempotency_key
+            FROM documents_bulk_stage
+            ORDER BY ord
+            ON CONFLICT (idempotency_key) DO NOTHING
+            """)
+        # Linhas com chave já existente mantêm o id original (retry seguro).
+        cur.execute("""
+            SELECT
+                s.ord,
+                COALESCE(d.id, s.id) AS id,
+                (d.id IS NULL OR d.id = s.id) AS created
+            FROM documents_bulk_stage s
+            LEFT JOIN documents d ON d.idempotency_key = s.idempotency_key
+            ORDER BY s.ord
+            """)
+        rows = cur.fetchall()
+
+    return [{"id": row["id"], "created": row["created"]} for row in rows]
+
+
+def bulk_insert_documents(
+    records: Iterable[dict[str, Any]], batch_size: int | None = None
+) -> list[dict[str, Any]]:
+    # Cada lote é carregado com COPY numa tabela temporária e inserido com
+    # um único INSERT ... SELECT, numa transação própria. Lotes já
+    # confirmados permanecem se um registro posterior for inválido.
+    batch_size = batch_size or Config.BULK_BATCH_SIZE
+    results: list[dict[str, Any] | None] = []
+    first_by_key: dict[str, int] = {}
+    iterator = iter(enumerate(records))
+
+    while True:
+        batch: list[tuple[int, dict[str, Any]]] = []
+        duplicates: list[tuple[int, int]] = []
+        try:
+            chunk = list(islice(iterator, batch_size))
+            for position, record in chunk:
+                record = validate_bulk_record(record, position + 1)
+                results.append(None)
+                key = record["idempotency_key"]
+                if key is not None and key in first_by_key:
+                    duplicates.append((position, first_by_key[key]))
+                    continue
+                if key is not None:
+                    first_by_key[key] = position
+                batch.append((position, record))
+        except ValueError as e:
+            raise BulkIngestError(str(e), [r for r in results if r]) from e
+
+        if not chunk:
+            break
+
+        if batch:
+            inserted = _insert_batch(batch)
+            for (position, _), result in zip(batch, inserted):
+                results[position] = result
+            created = [r["id"] for r in inserted if r["created"]]
+            if created:
+                answer_cache.invalidate_documents(created)
+            logger.info(
+                "Carga em lote: %d documentos inseridos, %d já existentes",
+                len(created),
+                len(inserted) - len(created),
+            )
+
+        for position, first in duplicates:
+            results[position] = {"id": results[first]["id"], "created": False}
+
+    return results
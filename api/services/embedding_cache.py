@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+import psycopg2
+
+from api.config import Config
+from api.database import get_cursor
+
+logger = logging.getLogger(__name__)
+
+SHARED_TABLE = "embedding_cache"
+
+# Entradas guardadas como float32 (array 'f'): ~3 KB por vetor de 768d
+# em vez dos ~25 KB de uma list[float].
+_entries: OrderedDict[str, tuple[float, array]] = OrderedDict()
+_lock = threading.Lock()
+_model: str | None = None
+_shared_writes = 0
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "expirations": 0,
+    "invalidations": 0,
+    "shared_hits": 0,
+    "shared_errors": 0,
+}
+
+_PURGE_EVERY = 1000
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def _key(normalized: str) -> str:
+    # Sem casefold: o texto enviado ao Ollama mantém maiúsculas e os
+    # embeddings do nomic diferem entre "PostgreSQL" e "postgresql".
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _check_model() -> str | None:
+    # Chamado com _lock adquirido. Trocar Config.EMBEDDING_MODEL invalida tudo;
+    # devolve o modelo novo para o chamador limpar o cache compartilhado
+    # depois de soltar o lock (é um DELETE no banco).
+    global _model
+    if _model == Config.EMBEDDING_MODEL:
+        return None
+    changed = _model is not None
+    if changed:
+        logger.info(
+            "Modelo de embedding mudou (%s -> %s), limpando cache",
+            _model,
+            Config.EMBEDDING_MODEL,
+        )
+        _stats["invalidations"] += 1
+    _entries.clear()
+    _model = Config.EMBEDDING_MODEL
+    return _model if changed else None
+
+
+def _store_local(key: str, vector: array) -> None:
+    if Config.EMBEDDING_CACHE_SIZE <= 0:
+        return
+    _entries[key] = (time.monotonic() + Config.EMBEDDING_CACHE_TTL, vector)
+    _entries.move_to_end(key)
+    while len(_entries) > Config.EMBEDDING_CACHE_SIZE:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def _get_local(key: str) -> array | None:
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    expires_at, vector = entry
+    if expires_at < time.monotonic():
+        del _entries[key]
+        _stats["expirations"] += 1
+        return None
+    _entries.move_to_end(key)
+    return vector
+
+
+def _get_shared(key: str, model: str) -> list[float] | None:
+    try:
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT embedding FROM {SHARED_TABLE}
+                WHERE model = %s
+                  AND text_hash = %s
+                  AND created_at > now() - make_interval(secs => %s)
+                """,
+                (model, key, Config.EMBEDDING_CACHE_TTL),
+            )
+            row = cur.fetchone()
+    except (psycopg2.Error, RuntimeError) as e:
+        _stats["shared_errors"] += 1
+        logger.warning("Cache compartilhado de embeddings indisponível: %s", e)
+        return None
+    return row["embedding"] if row else None
+
+
+def _put_shared(key: str, model: str, embedding: list[float]) -> None:
+    global _shared_writes
+    try:
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {SHARED_TABLE} (model, text_hash, embedding)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (model, text_hash)
+                DO UPDATE SET embedding = EXCLUDED.embedding, created_at = now()
+                """,
+                (model, key, embedding),
+            )
+            _shared_writes += 1
+            if _shared_writes % _PURGE_EVERY == 0:
+                cur.execute(
+                    f"""
+                    DELETE FROM {SHARED_TABLE}
+                    WHERE created_at < now() - make_interval(secs => %s)
+                    """,
+                    (Config.EMBEDDING_CACHE_TTL,),
+                )
+    except (psycopg2.Error, RuntimeError) as e:
+        _stats["shared_errors"] += 1
+        logger.warning("Falha ao gravar no cache compartilhado: %s", e)
+
+
+def _purge_other_models(model: str) -> None:
+    if not Config.EMBEDDING_CACHE_SHARED:
+        return
+    try:
+        with get_cursor() as cur:
+            cur.execute(f"DELETE FROM {SHARED_TABLE} WHERE model <> %s", (model,))
+    except (psycopg2.Error, RuntimeError) as e:
+        _stats["shared_errors"] += 1
+        logger.warning("Falha ao invalidar cache compartilhado: %s", e)
+
+
+def get(text: str) -> list[float] | None:
+    key = _key(normalize_text(text))
+
+    with _lock:
+        purge = _check_model()
+        model = _model
+        vector = _get_local(key)
+        if vector is not None:
+            _stats["hits"] += 1
+            return vector.tolist()
+    if purge:
+        _purge_other_models(purge)
+
+    if Config.EMBEDDING_CACHE_SHARED:
+        embedding = _get_shared(key, model)
+        if embedding is not None:
+            with _lock:
+                _stats["hits"] += 1
+                _stats["shared_hits"] += 1
+                if _model == model:
+                    _store_local(key, array("f", embedding))
+            return [float(x) for x in embedding]
+
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def put(text: str, embedding: list[float], model: str | None = None) -> None:
+    model = model or Config.EMBEDDING_MODEL
+    key = _key(normalize_text(text))
+
+    with _lock:
+        purge = _check_model()
+        current = _model
+        if model == current:
+            _store_local(key, array("f", embedding))
+    if purge:
+        _purge_other_models(purge)
+    if model != current:
+        return
+
+    if Config.EMBEDDING_CACHE_SHARED:
+        _put_shared(key, model, embedding)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        _stats["invalidations"] += 1
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "size": len(_entries),
+            "max_size": Config.EMBEDDING_CACHE_SIZE,
+            "ttl_seconds": Config.EMBEDDING_CACHE_TTL,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "model": _model or Config.EMBEDDING_MODEL,
+            "shared": Config.EMBEDDING_CACHE_SHARED,
+        }
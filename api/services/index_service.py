@@ -0,0 +1,280 @@
+import logging
+import math
+import re
+from typing import Any
+
+from api.config import Config
+from api.database import get_autocommit_cursor, get_cursor
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_TABLE = "public.documents_embeddings_store"
+INDEX_NAME = "documents_embeddings_store_embedding_idx"
+INDEX_METHODS = ("hnsw", "ivfflat")
+# Limites do pgvector para hnsw.ef_search e ivfflat.probes.
+EF_SEARCH_RANGE = (1, 1000)
+PROBES_RANGE = (1, 32768)
+# iterative_scan só existe a partir do pgvector 0.8; o ivfflat não tem
+# strict_order.
+ITERATIVE_SCAN_VERSION = (0, 8)
+
+_WITH_PARAM = re.compile(r"(\w+)\s*=\s*'?(\d+)'?")
+
+_pgvector_version: tuple[int, ...] | None = None
+
+
+class IndexConflict(RuntimeError):
+    pass
+
+
+def default_ivfflat_lists(row_count: int) -> int:
+    # Recomendação do pgvector: rows/1000 até 1M linhas, sqrt(rows) acima.
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return max(1, int(math.sqrt(row_count)))
+
+
+def _index_sql(
+    method: str,
+    m: int,
+    ef_construction: int,
+    lists: int,
+    concurrently: bool,
+    name: str = INDEX_NAME,
+    column: str = "embedding",
+    opclass: str = "vector_cosine_ops",
+) -> str:
+    if method == "hnsw":
+        params = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        params = f"lists = {int(lists)}"
+
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"IF NOT EXISTS {name} "
+        f"ON {EMBEDDINGS_TABLE} USING {method} ({column} {opclass}) "
+        f"WITH ({params})"
+    )
+
+
+def _set_build_memory(cur) -> None:
+    if Config.ANN_MAINTENANCE_WORK_MEM:
+        cur.execute(
+            "SELECT set_config('maintenance_work_mem', %s, false)",
+            (Config.ANN_MAINTENANCE_WORK_MEM,),
+        )
+
+
+def _reset_build_memory(cur) -> None:
+    if Config.ANN_MAINTENANCE_WORK_MEM:
+        cur.execute("RESET maintenance_work_mem")
+
+
+def get_index() -> dict[str, Any] | None:
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                i.indexname AS name,
+                am.amname AS method,
+                i.indexdef AS definition,
+                pg_relation_size(c.oid) AS size_bytes,
+                ix.indisvalid AS valid
+            FROM pg_indexes i
+            JOIN pg_class c ON c.relname = i.indexname
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+                AND n.nspname = i.schemaname
+            JOIN pg_index ix ON ix.indexrelid = c.oid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE i.schemaname = 'public' AND i.indexname = %s
+            """,
+            (INDEX_NAME,),
+        )
+        row = cur.fetchone()
+
+    if not row:
+        return None
+
+    info = dict(row)
+    info["parameters"] = {
+        key: int(value)
+        for key, value in _WITH_PARAM.findall(info["definition"].split("WITH", 1)[-1])
+    }
+    return info
+
+
+def create_index(
+    method: str | None = None,
+    m: int | None = None,
+    ef_construction: int | None = None,
+    lists: int | None = None,
+    concurrently: bool = False,
+    replace: bool = False,
+) -> dict[str, Any]:
+    method = (method or Config.ANN_INDEX_METHOD).lower()
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Método de índice inválido: {method}")
+
+    m = m or Config.HNSW_M
+    ef_construction = ef_construction or Config.HNSW_EF_CONSTRUCTION
+
+    # CREATE INDEX IF NOT EXISTS não compara a definição: sem replace, um
+    # índice existente com outro método ou parâmetros é um conflito.
+    existing = None if replace else get_index()
+    if existing is not None:
+        requested = {"m": m, "ef_construction": ef_construction}
+        if method == "ivfflat":
+            requested = {"lists": lists} if lists else {}
+        differs = existing["method"] != method or any(
+            existing["parameters"].get(key) != value for key, value in requested.items()
+        )
+        if differs:
+            raise IndexConflict(
+                f"Índice ANN já existe com outra definição ({existing['method']}, "
+                f"{existing['parameters']}); use replace=true para recriá-lo"
+            )
+        logger.info("Índice ANN já existe com a mesma definição")
+        return existing
+
+    with get_autocommit_cursor() as cur:
+        if method == "ivfflat" and not lists:
+            cur.execute(f"SELECT count(*) AS total FROM {EMBEDDINGS_TABLE}")
+            lists = default_ivfflat_lists(cur.fetchone()["total"])
+
+        if replace:
+            cur.execute(
+                f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}"
+                f"IF EXISTS public.{INDEX_NAME}"
+            )
+
+        _set_build_memory(cur)
+        try:
+            cur.execute(_index_sql(method, m, ef_construction, lists, concurrently))
+        finally:
+            _reset_build_memory(cur)
+
+    logger.info(
+        "Índice ANN criado: method=%s m=%s ef_construction=%s lists=%s",
+        method,
+        m,
+        ef_construction,
+        lists,
+    )
+    return get_index()
+
+
+def create_index_in_transaction(
+    cur,
+    name: str = INDEX_NAME,
+    column: str = "embedding",
+    opclass: str = "vector_cosine_ops",
+) -> None:
+    # Usado pelo setup, que já roda dentro de uma transação. As cópias
+    # compactas (compact_vectors) usam o mesmo método com outra coluna.
+    method = Config.ANN_INDEX_METHOD.lower()
+    if method not in INDEX_METHODS:
+        logger.info("Criação de índice ANN desativada (ANN_INDEX_METHOD=%s)", method)
+        return
+
+    lists = Config.IVFFLAT_LISTS
+    if method == "ivfflat" and not lists:
+        cur.execute(f"SELECT count(*) AS total FROM {EMBEDDINGS_TABLE}")
+        lists = default_ivfflat_lists(cur.fetchone()["total"])
+        logger.info(
+            "IVFFlat criado com lists=%d; reconstrua após a carga inicial "
+            "com POST /api/system/index/rebuild",
+            lists,
+        )
+
+    cur.execute(
+        _index_sql(
+            method,
+            Config.HNSW_M,
+            Config.HNSW_EF_CONSTRUCTION,
+            lists,
+            concurrently=False,
+            name=name,
+            column=column,
+            opclass=opclass,
+        )
+    )
+
+
+def rebuild_index(concurrently: bool = True) -> dict[str, Any] | None:
+    with get_autocommit_cursor() as cur:
+        _set_build_memory(cur)
+        try:
+            cur.execute(
+                f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}"
+                f"public.{INDEX_NAME}"
+            )
+        finally:
+            _reset_build_memory(cur)
+
+    logger.info("Índice ANN reconstruído: %s", INDEX_NAME)
+    return get_index()
+
+
+def drop_index(concurrently: bool = False) -> bool:
+    existed = get_index() is not None
+    with get_autocommit_cursor() as cur:
+        cur.execute(
+            f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}"
+            f"IF EXISTS public.{INDEX_NAME}"
+        )
+
+    if existed:
+        logger.info("Índice ANN removido: %s", INDEX_NAME)
+    return existed
+
+
+def check_search_settings(ef_search: int | None, probes: int | None) -> None:
+    for name, value, (low, high) in (
+        ("ef_search", ef_search, EF_SEARCH_RANGE),
+        ("probes", probes, PROBES_RANGE),
+    ):
+        if value is not None and not low <= value <= high:
+            raise ValueError(f"{name} deve estar entre {low} e {high}")
+
+
+def _pgvector(cur) -> tuple[int, ...]:
+    # Lida uma vez por processo: a versão só muda com ALTER EXTENSION e um
+    # restart da API. Sem a extensão (antes do /setup) nada fica guardado.
+    global _pgvector_version
+    if _pgvector_version is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        if row is None:
+            return ()
+        _pgvector_version = tuple(int(p) for p in re.findall(r"\d+", row["extversion"]))
+        if _pgvector_version < ITERATIVE_SCAN_VERSION:
+            logger.info(
+                "pgvector %s sem iterative_scan; ANN_ITERATIVE_SCAN ignorado",
+                row["extversion"],
+            )
+    return _pgvector_version
+
+
+def apply_search_settings(
+    cur, ef_search: int | None = None, probes: int | None = None
+) -> None:
+    # set_config(..., true) equivale a SET LOCAL: vale só para a transação
+    # corrente, o que é seguro com PgBouncer em modo transaction.
+    settings = [
+        ("hnsw.ef_search", ef_search or Config.HNSW_EF_SEARCH),
+        ("ivfflat.probes", probes or Config.IVFFLAT_PROBES),
+    ]
+    iterative = Config.ANN_ITERATIVE_SCAN.lower()
+    if iterative != "off" and _pgvector(cur) >= ITERATIVE_SCAN_VERSION:
+        settings.append(("hnsw.iterative_scan", iterative))
+        if iterative == "relaxed_order":
+            settings.append(("ivfflat.iterative_scan", iterative))
+
+    settings = [(name, str(value)) for name, value in settings if value]
+    if not settings:
+        return
+
+    cur.execute(
+        "SELECT " + ", ".join("set_config(%s, %s, true)" for _ in settings),
+        [item for pair in settings for item in pair],
+    )
@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Any
+
+from api.config import Config
+from api.services import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+# Ollama em CPU atende poucas gerações ao mesmo tempo; acima disso todas
+# ficam mais lentas até estourarem o timeout. O agendador deixa no máximo
+# LLM_MAX_CONCURRENCY gerações em andamento, enfileira as demais (interativas
+# antes das de lote, FIFO dentro de cada classe) e recusa o que passa do
+# tamanho da fila, para que a vazão fique estável sob sobrecarga.
+PRIORITIES = ("interactive", "batch")
+_RANK = {name: rank for rank, name in enumerate(PRIORITIES)}
+
+
+class Overloaded(RuntimeError):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "cancelled", "event")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+
+_lock = threading.Lock()
+_queue: list[tuple[int, int, _Waiter]] = []
+_sequence = itertools.count()
+_active = 0
+_depth = {name: 0 for name in PRIORITIES}
+# Média móvel exponencial da duração das gerações, para estimar Retry-After.
+_avg_seconds = 10.0
+_stats = {"admitted": 0, "rejected": 0, "timeouts": 0}
+
+queue_wait = metrics.Histogram(
+    f"{metrics.PREFIX}_llm_queue_wait_seconds",
+    "Espera na fila do agendador até iniciar a geração.",
+    ("priority",),
+)
+rejections = metrics.Counter(
+    f"{metrics.PREFIX}_llm_rejections_total",
+    "Gerações recusadas pelo agendador (fila cheia ou espera esgotada).",
+    ("priority", "reason"),
+)
+
+
+def _queue_limit(priority: str) -> int:
+    # Lote só ocupa parte da fila, deixando espaço para requisições
+    # interativas mesmo durante um backfill.
+    if priority == "batch":
+        return Config.LLM_QUEUE_MAX_BATCH
+    return Config.LLM_QUEUE_MAX
+
+
+def _retry_after() -> int:
+    # Chamado com _lock adquirido: tempo para esvaziar a fila atual.
+    queued = sum(_depth.values())
+    concurrency = max(1, Config.LLM_MAX_CONCURRENCY)
+    return max(1, math.ceil(_avg_seconds * (queued / concurrency + 1)))
+
+
+def _reject(priority: str, reason: str, message: str) -> Overloaded:
+    _stats["rejected" if reason == "queue_full" else "timeouts"] += 1
+    rejections.inc(priority=priority, reason=reason)
+    logger.warning("Geração recusada (%s, %s): %s", priority, reason, message)
+    return Overloaded(message, _retry_after())
+
+
+def _acquire(priority: str) -> None:
+    global _active
+    if priority not in _RANK:
+        raise ValueError(f"Prioridade inválida: {priority}")
+
+    with _lock:
+        if _active < Config.LLM_MAX_CONCURRENCY and not any(_depth.values()):
+            _active += 1
+            _stats["admitted"] += 1
+            return
+        if sum(_depth.values()) >= _queue_limit(priority):
+            raise _reject(
+                priority, "queue_full", "Fila de geração cheia, tente novamente"
+            )
+        waiter = _Waiter(priority)
+        heapq.heappush(_queue, (_RANK[priority], next(_sequence), waiter))
+        _depth[priority] += 1
+
+    if waiter.event.wait(Config.LLM_QUEUE_TIMEOUT):
+        return
+    with _lock:
+        # A vaga pode ter sido concedida entre o timeout e o lock.
+        if waiter.granted:
+            return
+        waiter.cancelled = True
+        _depth[priority] -= 1
+        raise _reject(
+            priority,
+            "timeout",
+            f"Sem vaga para geração após {Config.LLM_QUEUE_TIMEOUT:g}s na fila",
+        )
+
+
+def _release(elapsed: float) -> None:
+    global _active, _avg_seconds
+    with _lock:
+        _avg_seconds = 0.8 * _avg_seconds + 0.2 * elapsed
+        # A vaga passa direto para o próximo da fila (sem voltar ao pool),
+        # assim uma requisição nova não fura a fila.
+        while _queue:
+            _, _, waiter = heapq.heappop(_queue)
+            if waiter.cancelled:
+                continue
+            _depth[waiter.priority] -= 1
+            _stats["admitted"] += 1
+            waiter.granted = True
+            waiter.event.set()
+            return
+        _active -= 1
+
+
+class Slot:
+    def __init__(self, priority: str, admitted: float):
+        self.priority = priority
+        self.admitted = admitted
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            _release(time.perf_counter() - self.admitted)
+
+    def __enter__(self) -> "Slot":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+def acquire(priority: str = "interactive") -> Slot:
+    # Bloqueia até haver vaga (ou levanta Overloaded); a vaga é devolvida
+    # com release() ou ao sair do bloco `with`.
+    started = time.perf_counter()
+    _acquire(priority)
+    admitted = time.perf_counter()
+    queue_wait.observe(admitted - started, priority=priority)
+    profiling.record("llm_queue", (admitted - started) * 1000)
+    return Slot(priority, admitted)
+
+
+def check(priority: str = "interactive") -> None:
+    # Recusa antecipada (sem enfileirar) para quem não pode receber um 429
+    # depois de começar a responder, como o streaming SSE.
+    with _lock:
+        if sum(_depth.values()) >= _queue_limit(priority):
+            raise _reject(
+                priority, "queue_full", "Fila de geração cheia, tente novamente"
+            )
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "active": _active,
+            "max_concurrency": Config.LLM_MAX_CONCURRENCY,
+            "queued": dict(_depth),
+            "queue_max": Config.LLM_QUEUE_MAX,
+            "avg_generation_s": round(_avg_seconds, 2),
+        }
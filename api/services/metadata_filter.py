@@ -0,0 +1,157 @@
+import json
+import logging
+import re
+from datetime import date, datetime
+from typing import Any
+
+from api.config import Config
+
+logger = logging.getLogger(__name__)
+
+RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+MAX_KEYS = 20
+MAX_IN_VALUES = 100
+
+_KEY = re.compile(r"^[A-Za-z_][\w.-]*$")
+_INDEX_KEY = re.compile(r"^[A-Za-z_]\w*$")
+
+
+class MetadataFilterError(ValueError):
+    pass
+
+
+def parse(raw: str | dict[str, Any] | None) -> dict[str, Any] | None:
+    # Aceita o objeto já decodificado (corpo JSON) ou a string JSON da
+    # query string (?filter={"source": "wikipedia"}).
+    if raw is None or raw == "":
+        return None
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise MetadataFilterError(f"Filtro não é JSON válido: {e.msg}") from e
+    if not isinstance(raw, dict):
+        raise MetadataFilterError("O filtro deve ser um objeto JSON")
+    if len(raw) > MAX_KEYS:
+        raise MetadataFilterError(f"Máximo de {MAX_KEYS} chaves por filtro")
+    for key in raw:
+        if not _KEY.match(key):
+            raise MetadataFilterError(f"Chave de metadado inválida: {key}")
+    return raw or None
+
+
+def _scalar(key: str, value: Any) -> Any:
+    if isinstance(value, (dict, list)) or value is None:
+        raise MetadataFilterError(
+            f"Valor de '{key}' deve ser string, número ou booleano"
+        )
+    return value
+
+
+def _iso(key: str, value: Any) -> str:
+    # Intervalos comparam o texto ISO-8601 (metadata->>'chave'), que ordena
+    # como data e usa o índice de expressão btree. O valor é normalizado
+    # para o mesmo formato (data pura continua data pura). Um sufixo 'Z' é
+    # mantido: isoformat() o troca por '+00:00', e como texto 'Z' > '+' a
+    # comparação com metadados gravados com 'Z' sairia errada.
+    if not isinstance(value, str):
+        raise MetadataFilterError(f"Intervalo em '{key}' exige datas ISO-8601")
+    try:
+        if len(value) == 10:
+            return date.fromisoformat(value).isoformat()
+        normalized = datetime.fromisoformat(value).isoformat()
+    except ValueError as e:
+        raise MetadataFilterError(f"Data inválida em '{key}': {value}") from e
+    if value[-1] in "Zz" and normalized.endswith("+00:00"):
+        normalized = normalized[: -len("+00:00")] + "Z"
+    return normalized
+
+
+def build(
+    filters: dict[str, Any] | None, alias: str = "doc"
+) -> tuple[str, dict[str, Any]]:
+    # Devolve um predicado SQL sobre {alias}.metadata e seus parâmetros
+    # nomeados. Igualdade e IN viram containment (@>), atendidos pelo índice
+    # GIN jsonb_path_ops; intervalos usam o índice de expressão da chave.
+    if not filters:
+        return "TRUE", {}
+
+    clauses: list[str] = []
+    params: dict[str, Any] = {}
+    equals: dict[str, Any] = {}
+
+    for n, (key, spec) in enumerate(filters.items()):
+        if isinstance(spec, list):
+            spec = {"in": spec}
+        if not isinstance(spec, dict):
+            equals[key] = _scalar(key, spec)
+            continue
+
+        unknown = set(spec) - set(RANGE_OPERATORS) - {"eq", "in"}
+        if unknown or not spec:
+            raise MetadataFilterError(
+                f"Operadores inválidos em '{key}': {sorted(unknown) or '{}'}"
+            )
+
+        if "eq" in spec:
+            equals[key] = _scalar(key, spec["eq"])
+
+        if "in" in spec:
+            values = spec["in"]
+            if not isinstance(values, list) or not values:
+                raise MetadataFilterError(f"'in' de '{key}' deve ser lista não vazia")
+            if len(values) > MAX_IN_VALUES:
+                raise MetadataFilterError(
+                    f"Máximo de {MAX_IN_VALUES} valores em '{key}'"
+                )
+            options = []
+            for i, value in enumerate(values):
+                name = f"mf_{n}_in_{i}"
+                params[name] = json.dumps({key: _scalar(key, value)})
+                options.append(f"{alias}.metadata @> %({name})s::jsonb")
+            clauses.append("(" + " OR ".join(options) + ")")
+
+        for op, sql_op in RANGE_OPERATORS.items():
+            if op not in spec:
+                continue
+            key_name, value_name = f"mf_{n}_key", f"mf_{n}_{op}"
+            params[key_name] = key
+            params[value_name] = _iso(key, spec[op])
+            clauses.append(
+                f"{alias}.metadata ->> %({key_name})s {sql_op} %({value_name})s"
+            )
+
+    if equals:
+        params["mf_eq"] = json.dumps(equals)
+        clauses.insert(0, f"{alias}.metadata @> %(mf_eq)s::jsonb")
+
+    return " AND ".join(clauses), params
+
+
+def indexed_keys() -> list[str]:
+    keys = []
+    for key in Config.METADATA_INDEXED_KEYS.split(","):
+        key = key.strip()
+        if not key:
+            continue
+        if not _INDEX_KEY.match(key):
+            logger.warning("Chave de metadado ignorada para índice: %s", key)
+            continue
+        keys.append(key)
+    return keys
+
+
+def create_indexes(cur) -> list[str]:
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS documents_metadata_idx
+        ON documents USING gin (metadata jsonb_path_ops)
+        """)
+    created = ["documents_metadata_idx"]
+    for key in indexed_keys():
+        name = f"documents_metadata_{key.lower()}_idx"
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON documents ((metadata ->> %s))",
+            (key,),
+        )
+        created.append(name)
+    return created
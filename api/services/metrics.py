@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from flask import Flask, g, request
+
+from api.services import profiling
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "rag_api"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Em segundos, como manda a convenção do Prometheus. Os estágios vão de
+# hits de cache (sub-ms) até gerações longas do LLM.
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[Any, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Por série: contagens por bucket (não cumulativas), soma e total.
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    labels = _labels(self.labelnames, key, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total:.6f}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+http_requests = Counter(
+    f"{PREFIX}_http_requests_total",
+    "Requisições HTTP por rota, método e status.",
+    ("method", "route", "status"),
+)
+http_latency = Histogram(
+    f"{PREFIX}_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota (até o fim do handler).",
+    ("method", "route"),
+)
+stage_latency = Histogram(
+    f"{PREFIX}_stage_duration_seconds",
+    "Latência por estágio: embed, vector_sql, llm e serialize.",
+    ("stage",),
+)
+
+# Métricas lidas na hora da coleta (pool, caches, Ollama, vectorizer):
+# cada coletor devolve linhas de exposição já formatadas.
+_collectors: list[Callable[[], list[str]]] = []
+
+
+def collector(fn: Callable[[], list[str]]) -> Callable[[], list[str]]:
+    _collectors.append(fn)
+    return fn
+
+
+def family(
+    name: str,
+    help: str,
+    samples: list[tuple[dict[str, Any], Any]],
+    kind: str = "gauge",
+) -> list[str]:
+    name = f"{PREFIX}_{name}"
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        names = tuple(labels)
+        lines.append(
+            f"{name}{_labels(names, tuple(labels[n] for n in names))} {float(value):g}"
+        )
+    return lines
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    stage_latency.observe(seconds, stage=stage)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe_stage(name, elapsed)
+        profiling.record(name, elapsed * 1000)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in (http_requests, http_latency, stage_latency):
+        lines.extend(metric.render())
+    for fn in _collectors:
+        try:
+            lines.extend(fn())
+        except Exception as e:
+            # Uma fonte indisponível (ex.: banco fora) não derruba a coleta.
+            logger.warning("Coletor de métricas %s falhou: %s", fn.__name__, e)
+    return "\n".join(lines) + "\n"
+
+
+def _route() -> str:
+    # A regra da rota (/api/documents/<int:doc_id>) e não a URL, para manter
+    # a cardinalidade dos labels limitada.
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_app(app: Flask) -> None:
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = _route()
+            http_latency.observe(
+                time.perf_counter() - started, method=request.method, route=route
+            )
+            http_requests.inc(
+                method=request.method, route=route, status=response.status_code
+            )
+        return response
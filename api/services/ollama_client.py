@@ -0,0 +1,264 @@
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api.config import Config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+RETRY_STATUS = (502, 503, 504)
+
+GENERATION_OPTIONS = {
+    "temperature": 0.3,
+    "top_p": 0.9,
+}
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_endpoints: dict[str, dict[str, Any]] = {}
+_warmup: dict[str, Any] = {}
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=Config.OLLAMA_POOL_SIZE,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def close() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _url(path: str) -> str:
+    return f"{Config.OLLAMA_HOST.rstrip('/')}{path}"
+
+
+def _record(endpoint: str, elapsed_ms: float, error: bool, retries: int = 0) -> None:
+    with _stats_lock:
+        entry = _endpoints.get(endpoint)
+        if entry is None:
+            entry = _endpoints[endpoint] = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "latency_ms_sum": 0.0,
+                "latency_ms_max": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        entry["requests"] += 1
+        entry["errors"] += int(error)
+        entry["retries"] += retries
+        entry["latency_ms_sum"] += elapsed_ms
+        entry["latency_ms_max"] = max(entry["latency_ms_max"], elapsed_ms)
+        entry["buckets"][bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: espera aleatória entre 0 e base * 2^tentativa.
+    return random.uniform(0, Config.OLLAMA_RETRY_BACKOFF * (2**attempt))
+
+
+def request(
+    method: str,
+    path: str,
+    *,
+    json: dict[str, Any] | None = None,
+    read_timeout: float,
+    retries: int = 0,
+    stream: bool = False,
+) -> requests.Response:
+    session = _get_session()
+    endpoint = f"{path} (stream)" if stream else path
+    timeout = (Config.OLLAMA_CONNECT_TIMEOUT, read_timeout)
+    started = time.perf_counter()
+    attempt = 0
+
+    while True:
+        try:
+            response = session.request(
+                method, _url(path), json=json, timeout=timeout, stream=stream
+            )
+            if response.status_code in RETRY_STATUS and attempt < retries:
+                response.close()
+                raise requests.HTTPError(
+                    f"{response.status_code} from Ollama", response=response
+                )
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            retryable = not isinstance(e, requests.HTTPError) or (
+                e.response is not None and e.response.status_code in RETRY_STATUS
+            )
+            if retryable and attempt < retries:
+                delay = _backoff(attempt)
+                attempt += 1
+                logger.warning(
+                    "Ollama %s falhou (%s), tentativa %d/%d em %.2fs",
+                    path,
+                    e,
+                    attempt,
+                    retries,
+                    delay,
+                )
+                time.sleep(delay)
+                continue
+            _record(endpoint, (time.perf_counter() - started) * 1000, True, attempt)
+            raise
+
+        _record(endpoint, (time.perf_counter() - started) * 1000, False, attempt)
+        return response
+
+
+def _keep_alive(payload: dict[str, Any]) -> dict[str, Any]:
+    # Sem keep_alive o Ollama descarrega o modelo após 5 min ociosos e a
+    # próxima requisição paga o carregamento inteiro.
+    if Config.OLLAMA_KEEP_ALIVE and "keep_alive" not in payload:
+        return {**payload, "keep_alive": Config.OLLAMA_KEEP_ALIVE}
+    return payload
+
+
+def generation_options() -> dict[str, Any]:
+    # num_ctx faz parte da configuração do runner: uma chamada com outro
+    # valor (ou sem ele) obriga o Ollama a recarregar o modelo.
+    return {**GENERATION_OPTIONS, "num_ctx": Config.LLM_NUM_CTX}
+
+
+def embed(texts: list[str], model: str) -> list[list[float]]:
+    # /api/embed aceita várias entradas numa chamada; é idempotente, então
+    # pode ser repetido com segurança.
+    try:
+        response = request(
+            "POST",
+            "/api/embed",
+            json=_keep_alive({"model": model, "input": texts}),
+            read_timeout=Config.OLLAMA_EMBED_TIMEOUT,
+            retries=Config.OLLAMA_EMBED_RETRIES,
+        )
+    except requests.RequestException as e:
+        raise RuntimeError(f"Ollama indisponível em {Config.OLLAMA_HOST}: {e}") from e
+
+    data = response.json()
+    embeddings = data.get("embeddings")
+    if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+        raise RuntimeError(f"Embeddings inválidos retornados: {data}")
+    if not all(isinstance(e, list) and e for e in embeddings):
+        raise RuntimeError(f"Embedding inválido retornado: {data}")
+
+    return [[float(x) for x in embedding] for embedding in embeddings]
+
+
+def generate(payload: dict[str, Any], stream: bool = False) -> requests.Response:
+    return request(
+        "POST",
+        "/api/generate",
+        json=_keep_alive({**payload, "stream": stream}),
+        read_timeout=Config.OLLAMA_GENERATE_TIMEOUT,
+        stream=stream,
+    )
+
+
+def chat(payload: dict[str, Any], stream: bool = False) -> requests.Response:
+    return request(
+        "POST",
+        "/api/chat",
+        json=_keep_alive({**payload, "stream": stream}),
+        read_timeout=Config.OLLAMA_GENERATE_TIMEOUT,
+        stream=stream,
+    )
+
+
+def warm_up(
+    llm_model: str, embedding_model: str, system_prompt: str = ""
+) -> dict[str, Any]:
+    # Carrega os modelos na memória do Ollama e mede quanto custou: é a
+    # latência que a primeira requisição pagaria. O LLM é aquecido por
+    # /api/chat com as mesmas opções das requisições reais (num_ctx diferente
+    # recarregaria o runner) e com o system prompt delas, que fica no cache
+    # KV como prefixo; para o modelo de embedding basta uma entrada curta.
+    result: dict[str, Any] = {}
+    for kind, model in (("llm", llm_model), ("embedding", embedding_model)):
+        started = time.perf_counter()
+        try:
+            if kind == "llm":
+                messages = [{"role": "user", "content": "warm up"}]
+                if system_prompt:
+                    messages.insert(0, {"role": "system", "content": system_prompt})
+                response = chat(
+                    {
+                        "model": model,
+                        "messages": messages,
+                        "options": {**generation_options(), "num_predict": 1},
+                    }
+                )
+                load_ms = response.json().get("load_duration", 0) / 1e6
+            else:
+                embed(["warm up"], model)
+                load_ms = None
+        except (requests.RequestException, RuntimeError, ValueError) as e:
+            logger.warning("Warm-up do modelo %s falhou: %s", model, e)
+            result[kind] = {"model": model, "ok": False, "error": str(e)}
+            continue
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result[kind] = {
+            "model": model,
+            "ok": True,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "load_ms": round(load_ms, 1) if load_ms is not None else None,
+        }
+        logger.info("Modelo %s aquecido em %.0f ms", model, elapsed_ms)
+
+    with _stats_lock:
+        _warmup.update(result)
+    return result
+
+
+def warmup_status() -> dict[str, Any]:
+    with _stats_lock:
+        return dict(_warmup)
+
+
+def tags() -> dict[str, Any]:
+    response = request("GET", "/api/tags", read_timeout=Config.OLLAMA_HEALTH_TIMEOUT)
+    return response.json()
+
+
+def stats() -> dict[str, Any]:
+    with _stats_lock:
+        result = {}
+        for endpoint, entry in _endpoints.items():
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, entry["buckets"]):
+                cumulative += count
+                histogram[f"le_{bound}ms"] = cumulative
+            histogram["le_inf"] = cumulative + entry["buckets"][-1]
+            result[endpoint] = {
+                "requests": entry["requests"],
+                "errors": entry["errors"],
+                "retries": entry["retries"],
+                "latency_ms_avg": round(entry["latency_ms_sum"] / entry["requests"], 1),
+                "latency_ms_max": round(entry["latency_ms_max"], 1),
+                "latency_ms_histogram": histogram,
+            }
+        return result
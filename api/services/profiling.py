@@ -0,0 +1,163 @@
+import cProfile
+import hmac
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, TypeVar
+
+from api.config import Config
+
+T = TypeVar("T")
+
+PROFILE_HEADER = "X-Profile-Token"
+MAX_STACK_DEPTH = 64
+
+# Timings da requisição corrente. Fica None fora de ?debug_timings/?profile,
+# então o custo para requisições normais é um ContextVar.get por estágio.
+_current: ContextVar[dict[str, Any] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def active() -> dict[str, Any] | None:
+    return _current.get()
+
+
+def record(name: str, ms: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        key = f"{name}_ms"
+        timings[key] = round(timings.get(key, 0.0) + ms, 3)
+
+
+def annotate(key: str, value: Any) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings[key] = value
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
+
+
+def summarize_plan(plan: dict[str, Any]) -> dict[str, Any]:
+    # Resumo de um EXPLAIN (FORMAT JSON): custo e linhas estimadas do topo e
+    # os nós/índices na ordem em que aparecem, o suficiente para ver se o
+    # índice ANN (ou o de metadados) foi usado.
+    root = plan["Plan"]
+    nodes: list[str] = []
+    indexes: list[str] = []
+
+    def walk(node: dict[str, Any]) -> None:
+        nodes.append(node["Node Type"])
+        if "Index Name" in node and node["Index Name"] not in indexes:
+            indexes.append(node["Index Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(root)
+    return {
+        "total_cost": root.get("Total Cost"),
+        "plan_rows": root.get("Plan Rows"),
+        "nodes": nodes,
+        "indexes": indexes,
+    }
+
+
+def profile_allowed(headers) -> bool:
+    # O profiler expõe caminhos de código e custa caro; só roda com o token
+    # configurado em PROFILE_TOKEN no header X-Profile-Token.
+    token = Config.PROFILE_TOKEN
+    provided = headers.get(PROFILE_HEADER, "")
+    return bool(token) and hmac.compare_digest(provided.encode(), token.encode())
+
+
+def _frame(func: tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def collapsed_stacks(profiler: cProfile.Profile) -> str:
+    # Converte o grafo caller -> callee do cProfile em pilhas "a;b;c valor"
+    # (formato folded do flamegraph.pl / speedscope), com valores em µs.
+    # O cProfile não guarda pilhas completas: o tempo de cada função é
+    # repartido entre os chamadores proporcionalmente ao tempo cumulativo
+    # vindo de cada um.
+    stats = pstats.Stats(profiler).stats
+    callees: dict[tuple, list[tuple[tuple, float]]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, caller_ct) in callers.items():
+            callees.setdefault(caller, []).append((func, caller_ct))
+
+    roots = [
+        func
+        for func, (_, _, _, _, callers) in stats.items()
+        if not any(caller in stats for caller in callers)
+    ]
+    lines: dict[str, float] = {}
+
+    def walk(func: tuple, path: list[str], seen: set, ct: float) -> None:
+        _, _, tt, total_ct, _ = stats[func]
+        if total_ct <= 0 or len(path) >= MAX_STACK_DEPTH:
+            return
+        share = min(ct / total_ct, 1.0)
+        path = path + [_frame(func)]
+        stack = ";".join(path)
+        lines[stack] = lines.get(stack, 0.0) + tt * share
+        for callee, callee_ct in callees.get(func, []):
+            if callee not in seen:
+                walk(callee, path, seen | {callee}, callee_ct * share)
+
+    for root in roots:
+        walk(root, [], {root}, stats[root][3])
+
+    return "\n".join(
+        f"{stack} {round(seconds * 1e6)}"
+        for stack, seconds in sorted(lines.items())
+        if round(seconds * 1e6) > 0
+    )
+
+
+def run(
+    fn: Callable[[], T], debug_timings: bool = False, profile: bool = False
+) -> tuple[T, dict[str, Any]]:
+    # Executa fn coletando os timings da requisição e, opcionalmente, o
+    # cProfile. Devolve o resultado e os campos extras para a resposta.
+    if not debug_timings and not profile:
+        return fn(), {}
+
+    timings: dict[str, Any] = {}
+    token = _current.set(timings)
+    started = time.perf_counter()
+    try:
+        if profile:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(fn)
+        else:
+            result = fn()
+    finally:
+        _current.reset(token)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    extras: dict[str, Any] = {}
+    if debug_timings:
+        extras["timings"] = timings
+    if profile:
+        extras["profile"] = {
+            "format": "folded",
+            "unit": "us",
+            "stacks": collapsed_stacks(profiler),
+        }
+    return result, extras
@@ -0,0 +1,402 @@
+import ipaddress
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from typing import Any
+from urllib.parse import urlparse
+
+import psycopg2
+import requests
+from requests.adapters import HTTPAdapter
+
+from api.config import Config
+from api.database import get_cursor
+from api.services import llm_scheduler
+from api.services.rag_service import generate_rag_response
+
+logger = logging.getLogger(__name__)
+
+TABLE = "rag_jobs"
+STATUSES = ("queued", "running", "succeeded", "failed")
+
+# Estado no Postgres: qualquer instância da API responde o GET e qualquer
+# worker de qualquer instância pode executar o job. O job é reservado com
+# FOR UPDATE SKIP LOCKED, então dois workers nunca pegam o mesmo.
+_wake = threading.Event()
+_stop = threading.Event()
+_threads: list[threading.Thread] = []
+_worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+_lock = threading.Lock()
+_stats = {"claimed": 0, "succeeded": 0, "failed": 0, "requeued": 0, "webhooks": 0}
+
+
+def create_table(cur) -> None:
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            id UUID PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'queued',
+            request JSONB NOT NULL,
+            result JSONB,
+            error TEXT,
+            webhook_url TEXT,
+            webhook_status TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        )
+        """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {TABLE}_pending_idx
+        ON {TABLE} (run_after, created_at)
+        WHERE status IN ('queued', 'running')
+        """)
+
+
+def check_webhook_url(url: str) -> str | None:
+    # O webhook é chamado pelo servidor: sem esta checagem, webhook_url
+    # alcançaria serviços internos (db:5432, metadados da nuvem). Repetida
+    # antes de cada chamada, pois o DNS pode mudar depois do submit. Devolve
+    # o endereço validado, ao qual a conexão é presa (ver _post_webhook);
+    # None quando o host está na lista de permitidos.
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("webhook_url deve ser uma URL http(s)")
+    host = parsed.hostname.lower()
+
+    allowed = [
+        h.strip().lower()
+        for h in Config.RAG_JOB_WEBHOOK_ALLOWED_HOSTS.split(",")
+        if h.strip()
+    ]
+    if allowed:
+        if host not in allowed:
+            raise ValueError(f"Host do webhook não permitido: {host}")
+        return None
+
+    try:
+        addresses = list(
+            dict.fromkeys(
+                info[4][0].split("%")[0]
+                for info in socket.getaddrinfo(host, parsed.port or None)
+            )
+        )
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"Host do webhook não resolve: {host}") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address)
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Host do webhook aponta para endereço interno: {host}")
+    return addresses[0]
+
+
+class _PinnedAdapter(HTTPAdapter):
+    # A URL vai com o IP já validado; em https o SNI e a verificação do
+    # certificado continuam sendo feitos contra o nome original.
+    def __init__(self, hostname: str):
+        self.hostname = hostname
+        super().__init__()
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["server_hostname"] = self.hostname
+        kwargs["assert_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _post_webhook(
+    url: str, address: str | None, payload: dict[str, Any]
+) -> requests.Response:
+    # Sem seguir redirecionamentos: um 302 levaria de volta à rede interna.
+    if address is None:
+        return requests.post(
+            url,
+            json=payload,
+            timeout=Config.RAG_JOB_WEBHOOK_TIMEOUT,
+            allow_redirects=False,
+        )
+
+    # Conecta no endereço checado em vez de resolver o nome de novo: um DNS
+    # com TTL curto poderia trocar o IP entre a checagem e a conexão
+    # (DNS rebinding). O nome original segue no header Host.
+    parsed = urlparse(url)
+    userinfo, _, host_header = parsed.netloc.rpartition("@")
+    netloc = f"[{address}]" if ":" in address else address
+    if parsed.port:
+        netloc = f"{netloc}:{parsed.port}"
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    with requests.Session() as session:
+        session.mount(f"{parsed.scheme}://", _PinnedAdapter(parsed.hostname))
+        return session.post(
+            parsed._replace(netloc=netloc).geturl(),
+            json=payload,
+            headers={"Host": host_header},
+            timeout=Config.RAG_JOB_WEBHOOK_TIMEOUT,
+            allow_redirects=False,
+        )
+
+
+def submit(request: dict[str, Any], webhook_url: str | None = None) -> dict[str, Any]:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {TABLE} (id, request, webhook_url)
+            VALUES (%s, %s::jsonb, %s)
+            RETURNING id, status, created_at
+            """,
+            (str(uuid.uuid4()), json.dumps(request), webhook_url),
+        )
+        job = cur.fetchone()
+    # Acorda um worker local; os das outras instâncias acham o job no
+    # próximo ciclo de polling.
+    _wake.set()
+    return job
+
+
+def get(job_id: str) -> dict[str, Any] | None:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, status, request, result, error, webhook_status, attempts,
+                   created_at, started_at, finished_at
+            FROM {TABLE}
+            WHERE id = %s
+            """,
+            (job_id,),
+        )
+        return cur.fetchone()
+
+
+def _claim() -> dict[str, Any] | None:
+    # Jobs 'running' cujo worker sumiu (instância reiniciada) há mais de
+    # RAG_JOB_TIMEOUT voltam a ser elegíveis, até RAG_JOB_MAX_ATTEMPTS.
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {TABLE} j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                worker = %(worker)s,
+                started_at = now()
+            FROM (
+                SELECT id
+                FROM {TABLE}
+                WHERE run_after <= now()
+                  AND attempts < %(max_attempts)s
+                  AND (
+                      status = 'queued'
+                      OR (
+                          status = 'running'
+                          AND started_at < now() - make_interval(secs => %(timeout)s)
+                      )
+                  )
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            ) next_job
+            WHERE j.id = next_job.id
+            RETURNING j.id, j.request, j.webhook_url, j.attempts
+            """,
+            {
+                "worker": _worker_id,
+                "max_attempts": Config.RAG_JOB_MAX_ATTEMPTS,
+                "timeout": Config.RAG_JOB_TIMEOUT,
+            },
+        )
+        return cur.fetchone()
+
+
+def _finish(
+    job_id: str, status: str, result: Any = None, error: str | None = None
+) -> dict[str, Any] | None:
+    # Só o worker que ainda detém o job o finaliza: se ele passou de
+    # RAG_JOB_TIMEOUT e outro worker o retomou, nada volta e o chamador não
+    # dispara o webhook; o resultado que vale é o do dono atual.
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {TABLE}
+            SET status = %s, result = %s::jsonb, error = %s, finished_at = now()
+            WHERE id = %s AND worker = %s AND status = 'running'
+            RETURNING id, status, result, error, finished_at
+            """,
+            (
+                status,
+                json.dumps(result, default=str) if result is not None else None,
+                error,
+                job_id,
+                _worker_id,
+            ),
+        )
+        return cur.fetchone()
+
+
+def _requeue(job_id: str, delay: float) -> None:
+    # Fila de geração cheia não é falha do job: volta para a fila e tenta de
+    # novo depois do Retry-After, sem gastar uma tentativa.
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {TABLE}
+            SET status = 'queued',
+                attempts = attempts - 1,
+                worker = NULL,
+                run_after = now() + make_interval(secs => %s)
+            WHERE id = %s AND worker = %s AND status = 'running'
+            """,
+            (delay, job_id, _worker_id),
+        )
+
+
+def _notify(job: dict[str, Any], url: str) -> None:
+    payload = {
+        "id": str(job["id"]),
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "finished_at": job["finished_at"].isoformat(),
+    }
+    try:
+        address = check_webhook_url(url)
+        response = _post_webhook(url, address, payload)
+        status = str(response.status_code)
+    except ValueError as e:
+        logger.warning("Webhook do job %s bloqueado: %s", job["id"], e)
+        status = "blocked"
+    except requests.RequestException as e:
+        logger.warning("Webhook do job %s falhou: %s", job["id"], e)
+        status = f"error: {type(e).__name__}"
+
+    with get_cursor() as cur:
+        cur.execute(
+            f"UPDATE {TABLE} SET webhook_status = %s WHERE id = %s",
+            (status, job["id"]),
+        )
+    with _lock:
+        _stats["webhooks"] += 1
+
+
+def _run(job: dict[str, Any]) -> None:
+    request = job["request"]
+    try:
+        result = generate_rag_response(
+            question=request["question"],
+            max_chunks=request.get("max_chunks", 5),
+            model=request.get("model"),
+            mode=request.get("mode") or Config.RAG_SEARCH_MODE,
+            filters=request.get("filters"),
+            priority=request.get("priority") or "batch",
+            rerank=request.get("rerank"),
+        )
+    except llm_scheduler.Overloaded as e:
+        _requeue(job["id"], e.retry_after)
+        with _lock:
+            _stats["requeued"] += 1
+        return
+    except (ConnectionError, RuntimeError, ValueError) as e:
+        finished = _finish(job["id"], "failed", error=str(e))
+        outcome = "failed"
+    except Exception as e:
+        logger.exception("Erro inesperado no job %s", job["id"])
+        finished = _finish(job["id"], "failed", error=f"Erro inesperado: {e}")
+        outcome = "failed"
+    else:
+        finished = _finish(job["id"], "succeeded", result=result)
+        outcome = "succeeded"
+
+    if finished is None:
+        logger.warning(
+            "Job %s foi retomado por outro worker; resultado descartado", job["id"]
+        )
+        return
+    with _lock:
+        _stats[outcome] += 1
+    logger.info("Job %s: %s", job["id"], outcome)
+    if job["webhook_url"]:
+        _notify(finished, job["webhook_url"])
+
+
+def _maintain() -> None:
+    # Jobs presos em 'running' que já esgotaram as tentativas viram 'failed'
+    # e jobs terminados há mais de RAG_JOB_TTL são apagados.
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {TABLE}
+            SET status = 'failed',
+                error = 'Job abandonado após o número máximo de tentativas',
+                finished_at = now()
+            WHERE status = 'running'
+              AND attempts >= %s
+              AND started_at < now() - make_interval(secs => %s)
+            """,
+            (Config.RAG_JOB_MAX_ATTEMPTS, Config.RAG_JOB_TIMEOUT),
+        )
+        cur.execute(
+            f"""
+            DELETE FROM {TABLE}
+            WHERE finished_at < now() - make_interval(secs => %s)
+            """,
+            (Config.RAG_JOB_TTL,),
+        )
+
+
+def _worker(index: int) -> None:
+    last_maintenance = 0.0
+    while not _stop.is_set():
+        try:
+            if index == 0 and time.monotonic() - last_maintenance > 60:
+                _maintain()
+                last_maintenance = time.monotonic()
+            job = _claim()
+        except (psycopg2.Error, RuntimeError) as e:
+            # Banco fora ou tabela ainda não criada (antes do /setup).
+            logger.warning("Worker de jobs RAG: %s", e)
+            job = None
+
+        if job is None:
+            _wake.wait(Config.RAG_JOB_POLL_INTERVAL)
+            _wake.clear()
+            continue
+
+        with _lock:
+            _stats["claimed"] += 1
+        try:
+            _run(job)
+        except (psycopg2.Error, RuntimeError) as e:
+            # Falha ao gravar o resultado: o job fica 'running' e é
+            # retomado depois de RAG_JOB_TIMEOUT.
+            logger.error("Job %s não pôde ser finalizado: %s", job["id"], e)
+
+
+def start_workers(count: int | None = None) -> None:
+    count = Config.RAG_JOB_WORKERS if count is None else count
+    if _threads:
+        return
+    _stop.clear()
+    for index in range(count):
+        thread = threading.Thread(
+            target=_worker, args=(index,), name=f"rag-job-{index}", daemon=True
+        )
+        thread.start()
+        _threads.append(thread)
+    if count:
+        logger.info("%d workers de jobs RAG iniciados (%s)", count, _worker_id)
+
+
+def stop_workers() -> None:
+    _stop.set()
+    _wake.set()
+    for thread in _threads:
+        thread.join(timeout=5)
+    _threads.clear()
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        return {**_stats, "workers": len(_threads), "worker_id": _worker_id}
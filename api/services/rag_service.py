@@ -1,95 +1,246 @@
+import json
 import logging
-from typing import Any
+import time
+from typing import Any, Iterator
 
 import requests
 
 from api.config import Config
-from api.services.search_service import semantic_search
+from api.services import (
+    answer_cache,
+    context_packer,
+    embedding_cache,
+    llm_scheduler,
+    metadata_filter,
+    metrics,
+    ollama_client,
+    profiling,
+    single_flight,
+)
+from api.services.search_service import _ollama_embed, semantic_search
 
 logger = logging.getLogger(__name__)
 
+NO_DOCUMENTS_ANSWER = "No relevant documents found in the knowledge base."
+
+
+def _follower_wait() -> float:
+    # A follower must be able to wait as long as its leader may legitimately
+    # take: retrieval, the queue for a generation slot and the generation.
+    if Config.SINGLE_FLIGHT_RAG_WAIT > 0:
+        return Config.SINGLE_FLIGHT_RAG_WAIT
+    return (
+        Config.SINGLE_FLIGHT_SEARCH_WAIT
+        + Config.LLM_QUEUE_TIMEOUT
+        + Config.OLLAMA_CONNECT_TIMEOUT
+        + Config.OLLAMA_GENERATE_TIMEOUT
+    )
+
+
+_inflight = single_flight.group("rag", _follower_wait)
+
+
+# Stable system prefix: identical bytes on every request, so Ollama can
+# reuse the KV cache for it and only evaluate the documents + question.
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions based ONLY on the "
+    "documents provided by the user.\n\n"
+    "INSTRUCTIONS:\n"
+    "1. Use ONLY information from the provided documents to answer\n"
+    "2. If the information is in the documents, provide a clear and complete answer\n"
+    "3. Cite relevant documents when appropriate (e.g., 'According to Document 2...')\n"
+    "4. If the information is NOT in the documents, respond with EXACTLY: "
+    "'I could not find information about this in the available documents.'"
+)
+
+
+def _build_messages(
+    question: str, documents: list[dict[str, Any]]
+) -> list[dict[str, str]]:
+    # Build numbered context (one entry per document, chunks already merged)
+    context_parts = []
+    for i, document in enumerate(documents, 1):
+        context_parts.append(
+            context_packer.document_header(i, document["title"]) + document["text"]
+        )
+
+    context = "\n\n".join(context_parts)
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"DOCUMENTS:\n{context}\n\nQUESTION: {question}",
+        },
+    ]
+
+
+def _pack_context(
+    question: str, chunks: list[dict[str, Any]]
+) -> context_packer.PackedContext:
+    # The budget is what is left of the model context after the answer
+    # reserve and the prompt without documents.
+    scaffold = sum(
+        context_packer.estimate_tokens(message["content"])
+        for message in _build_messages(question, [])
+    )
+    packed = context_packer.pack(chunks, context_packer.context_budget(scaffold))
+    profiling.annotate("context", packed.stats())
+    return packed
+
+
+def _format_sources(chunks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": chunk["id"],
+            "title": chunk["title"],
+            "chunk": chunk["chunk"],
+            "distance": round(chunk["distance"], 4),
+        }
+        for chunk in chunks
+    ]
+
 
 def generate_rag_response(
     question: str,
     max_chunks: int = 5,
     model: str | None = None,
+    mode: str = "vector",
+    filters: dict[str, Any] | None = None,
+    priority: str = "interactive",
+    rerank: bool | None = None,
 ) -> dict[str, Any]:
     model = model or Config.LLM_MODEL
+    rerank = Config.RAG_RERANK if rerank is None else rerank
+
+    # Identical questions arriving while one is being answered wait for that
+    # generation instead of starting their own (the answer cache only helps
+    # once it has finished). Priority is part of the key so an interactive
+    # request never waits behind a batch leader in the LLM queue.
+    filter_sql, filter_params = metadata_filter.build(filters)
+    key = (
+        embedding_cache.normalize_text(question),
+        max_chunks,
+        model,
+        mode,
+        filter_sql,
+        tuple(sorted(filter_params.items())),
+        rerank,
+        priority,
+    )
+    result = _inflight.do(
+        key,
+        lambda: _generate(question, max_chunks, model, mode, filters, priority, rerank),
+    )
+    return {**result, "question": question}
 
-    chunks = semantic_search(question, limit=max_chunks)
+
+def _generate(
+    question: str,
+    max_chunks: int,
+    model: str,
+    mode: str,
+    filters: dict[str, Any] | None,
+    priority: str,
+    rerank: bool,
+) -> dict[str, Any]:
+    # With the answer cache on, the question is embedded here once and the
+    # same vector is used by the search and by the cache lookup/store.
+    question_embedding = (
+        _ollama_embed(question) if Config.RAG_ANSWER_CACHE_ENABLED else None
+    )
+    chunks = semantic_search(
+        question,
+        limit=max_chunks,
+        mode=mode,
+        filters=filters,
+        rerank=rerank,
+        embedding=question_embedding,
+    )
 
     if not chunks:
         return {
             "question": question,
-            "answer": "No relevant documents found in the knowledge base.",
+            "answer": NO_DOCUMENTS_ANSWER,
             "sources": [],
             "model": model,
+            "cached": False,
         }
 
-    # Build numbered context
-    context_parts = []
-    for i, chunk in enumerate(chunks, 1):
-        context_parts.append(f"[Document {i} - {chunk['title']}]:\n{chunk['chunk']}")
+    # Looked up before packing: a hit skips the prompt build entirely.
+    cached = question_embedding and answer_cache.lookup(
+        question_embedding, model, chunks
+    )
+    if cached:
+        return {
+            "question": question,
+            "answer": cached["answer"],
+            "sources": cached["sources"] or _format_sources(chunks),
+            "model": model,
+            "cached": True,
+        }
 
-    context = "\n\n".join(context_parts)
+    with profiling.timed("prompt_build"):
+        packed = _pack_context(question, chunks)
+        messages = _build_messages(question, packed.documents)
 
-    # Improved prompt for better responses
-    prompt = (
-        "You are a helpful assistant that answers questions based ONLY on the "
-        "documents provided below.\n\n"
-        "INSTRUCTIONS:\n"
-        "1. Use ONLY information from the provided documents to answer\n"
-        "2. If the information is in the documents, provide a clear and complete answer\n"
-        "3. Cite relevant documents when appropriate (e.g., 'According to Document 2...')\n"
-        "4. If the information is NOT in the documents, respond with EXACTLY: "
-        "'I could not find information about this in the available documents.'\n\n"
-        f"DOCUMENTS:\n{context}\n\n"
-        f"QUESTION: {question}\n\n"
-        "ANSWER:"
-    )
+    # Waits for a generation slot (or raises llm_scheduler.Overloaded) so
+    # Ollama never runs more than LLM_MAX_CONCURRENCY generations at once.
+    with llm_scheduler.acquire(priority):
+        llm_started = time.perf_counter()
 
-    try:
-        response = requests.post(
-            f"{Config.OLLAMA_HOST}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                },
-            },
-            timeout=120,
-        )
-        response.raise_for_status()
-    except requests.ConnectionError:
-        logger.error("Ollama not accessible at %s", Config.OLLAMA_HOST)
-        raise ConnectionError(
-            f"Ollama not accessible at {Config.OLLAMA_HOST}. "
-            "Please check if the container is running."
-        )
-    except requests.Timeout:
-        logger.error("Timeout calling LLM")
-        raise RuntimeError("Timeout generating response. Please try again.")
+        try:
+            response = ollama_client.chat(
+                {
+                    "model": model,
+                    "messages": messages,
+                    "options": ollama_client.generation_options(),
+                }
+            )
+        except requests.ConnectionError:
+            logger.error("Ollama not accessible at %s", Config.OLLAMA_HOST)
+            raise ConnectionError(
+                f"Ollama not accessible at {Config.OLLAMA_HOST}. "
+                "Please check if the container is running."
+            )
+        except requests.Timeout:
+            logger.error("Timeout calling LLM")
+            raise RuntimeError("Timeout generating response. Please try again.")
 
-    data = response.json()
+        data = response.json()
+        llm_seconds = time.perf_counter() - llm_started
+    metrics.observe_stage("llm", llm_seconds)
+    profiling.record("llm", llm_seconds * 1000)
+    profiling.annotate(
+        "ollama",
+        {
+            "prompt_eval_count": data.get("prompt_eval_count"),
+            "prompt_eval_duration_ms": round(
+                data.get("prompt_eval_duration", 0) / 1e6, 1
+            ),
+            "eval_count": data.get("eval_count"),
+            "eval_duration_ms": round(data.get("eval_duration", 0) / 1e6, 1),
+            "load_duration_ms": round(data.get("load_duration", 0) / 1e6, 1),
+        },
+    )
 
     if "error" in data:
         logger.error("Ollama error: %s", data["error"])
         raise RuntimeError(f"Ollama error: {data['error']}")
 
-    answer = data.get("response", "No response from model.").strip()
-
-    sources = [
-        {
-            "id": chunk["id"],
-            "title": chunk["title"],
-            "chunk": chunk["chunk"],
-            "distance": round(chunk["distance"], 4),
-        }
-        for chunk in chunks
-    ]
+    content = data.get("message", {}).get("content")
+    answer = (content or "No response from model.").strip()
+    sources = _format_sources(packed.chunks)
+    if content is not None and question_embedding:
+        answer_cache.store(
+            question,
+            question_embedding,
+            model,
+            chunks,
+            answer,
+            llm_seconds,
+            sources=sources,
+        )
 
     logger.info(
         "RAG completed: question='%s', sources=%d, model=%s",
@@ -103,4 +254,172 @@ def generate_rag_response(
         "answer": answer,
         "sources": sources,
         "model": model,
+        "cached": False,
     }
+
+
+def _ms(start: float, end: float | None = None) -> float:
+    return round(((end or time.perf_counter()) - start) * 1000, 1)
+
+
+def stream_rag_response(
+    question: str,
+    max_chunks: int = 5,
+    model: str | None = None,
+    mode: str = "vector",
+    filters: dict[str, Any] | None = None,
+    priority: str = "interactive",
+    rerank: bool | None = None,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    # Yields (event, data): sources, then tokens, then done (or error).
+    # Closing the generator (client disconnected) closes the streamed Ollama
+    # response, which makes Ollama abort the generation.
+    model = model or Config.LLM_MODEL
+    started = time.perf_counter()
+
+    rerank = Config.RAG_RERANK if rerank is None else rerank
+
+    try:
+        question_embedding = (
+            _ollama_embed(question) if Config.RAG_ANSWER_CACHE_ENABLED else None
+        )
+        chunks = semantic_search(
+            question,
+            limit=max_chunks,
+            mode=mode,
+            filters=filters,
+            rerank=rerank,
+            embedding=question_embedding,
+        )
+    except Exception as e:
+        logger.error("Retrieval failed: %s", e)
+        yield "error", {"message": f"Retrieval failed: {e}"}
+        return
+    retrieval_ms = _ms(started)
+
+    cached = (
+        chunks
+        and question_embedding
+        and answer_cache.lookup(question_embedding, model, chunks)
+    )
+    if cached:
+        yield "sources", {
+            "question": question,
+            "model": model,
+            "sources": cached["sources"] or _format_sources(chunks),
+        }
+        yield "token", {"text": cached["answer"]}
+        yield "done", {
+            "retrieval_ms": retrieval_ms,
+            "total_ms": _ms(started),
+            "cached": True,
+        }
+        return
+
+    packed = _pack_context(question, chunks)
+
+    yield "sources", {
+        "question": question,
+        "model": model,
+        "sources": _format_sources(packed.chunks),
+        "context": packed.stats(),
+    }
+
+    if not chunks:
+        yield "token", {"text": NO_DOCUMENTS_ANSWER}
+        yield "done", {"retrieval_ms": retrieval_ms, "total_ms": _ms(started)}
+        return
+
+    messages = _build_messages(question, packed.documents)
+
+    # The slot is held for the whole stream and released in the finally
+    # below (also when the client disconnects and the generator is closed).
+    try:
+        slot = llm_scheduler.acquire(priority)
+    except llm_scheduler.Overloaded as e:
+        yield "error", {"message": str(e), "retry_after": e.retry_after}
+        return
+    llm_started = time.perf_counter()
+
+    try:
+        response = ollama_client.chat(
+            {
+                "model": model,
+                "messages": messages,
+                "options": ollama_client.generation_options(),
+            },
+            stream=True,
+        )
+    except requests.ConnectionError:
+        slot.release()
+        logger.error("Ollama not accessible at %s", Config.OLLAMA_HOST)
+        yield "error", {"message": f"Ollama not accessible at {Config.OLLAMA_HOST}."}
+        return
+    except requests.RequestException as e:
+        slot.release()
+        logger.error("Error calling LLM: %s", e)
+        yield "error", {"message": f"Error generating response: {e}"}
+        return
+
+    first_token_ms = None
+    completed = False
+    parts: list[str] = []
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+
+            if "error" in data:
+                logger.error("Ollama error: %s", data["error"])
+                yield "error", {"message": f"Ollama error: {data['error']}"}
+                return
+
+            text = data.get("message", {}).get("content", "")
+            if text:
+                if first_token_ms is None:
+                    first_token_ms = _ms(started)
+                parts.append(text)
+                yield "token", {"text": text}
+
+            if data.get("done"):
+                completed = True
+                yield "done", {
+                    "retrieval_ms": retrieval_ms,
+                    "first_token_ms": first_token_ms,
+                    "total_ms": _ms(started),
+                    "prompt_eval_count": data.get("prompt_eval_count"),
+                    "prompt_eval_ms": round(
+                        data.get("prompt_eval_duration", 0) / 1e6, 1
+                    ),
+                    "eval_count": data.get("eval_count"),
+                    "eval_ms": round(data.get("eval_duration", 0) / 1e6, 1),
+                    "cached": False,
+                }
+                break
+    except requests.RequestException as e:
+        logger.error("LLM stream interrupted: %s", e)
+        yield "error", {"message": f"Stream interrupted: {e}"}
+    finally:
+        response.close()
+        slot.release()
+        if completed:
+            metrics.observe_stage("llm", time.perf_counter() - llm_started)
+            if question_embedding:
+                answer_cache.store(
+                    question,
+                    question_embedding,
+                    model,
+                    chunks,
+                    "".join(parts).strip(),
+                    time.perf_counter() - llm_started,
+                    sources=_format_sources(packed.chunks),
+                )
+            logger.info(
+                "RAG stream completed: question='%s', sources=%d, model=%s",
+                question[:50],
+                len(chunks),
+                model,
+            )
+        else:
+            logger.info("RAG stream closed before completion: '%s'", question[:50])
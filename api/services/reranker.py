@@ -0,0 +1,88 @@
+from typing import Sequence
+
+import numpy as np
+
+# vector_send do pgvector: int16 dimensões, int16 reservado e depois os
+# valores em float32 big-endian.
+_HEADER_BYTES = 4
+_WIRE_DTYPE = np.dtype(">f4")
+
+
+def decode_vectors(values: Sequence[bytes | memoryview]) -> np.ndarray:
+    # Uma única cópia para todos os candidatos: os buffers sem cabeçalho são
+    # concatenados e lidos de uma vez como matriz (n, dimensões).
+    if not values:
+        return np.empty((0, 0), dtype=np.float32)
+    dimensions = int.from_bytes(bytes(values[0][:2]), "big")
+    body = b"".join(bytes(v)[_HEADER_BYTES:] for v in values)
+    matrix = np.frombuffer(body, dtype=_WIRE_DTYPE).reshape(len(values), dimensions)
+    return matrix.astype(np.float32)
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def relevance(
+    query: np.ndarray,
+    unit: np.ndarray,
+    lexical: np.ndarray | None = None,
+    lexical_weight: float = 0.0,
+) -> np.ndarray:
+    # Similaridade de cosseno com a consulta, opcionalmente misturada ao
+    # ts_rank normalizado para [0, 1] (o maior score léxico vira 1).
+    scores = unit @ _unit(query.astype(np.float32))
+    if lexical is not None and lexical_weight > 0:
+        top = lexical.max()
+        normalized = lexical / top if top > 0 else np.zeros_like(lexical)
+        scores = (1 - lexical_weight) * scores + lexical_weight * normalized
+    return scores
+
+
+def mmr(
+    unit: np.ndarray,
+    scores: np.ndarray,
+    k: int,
+    diversity_lambda: float,
+) -> list[int]:
+    # Maximal marginal relevance: a cada passo escolhe o candidato que
+    # maximiza  λ·relevância − (1−λ)·max(similaridade com os já escolhidos).
+    # O laço é só sobre as k escolhas; cada passo é uma operação vetorial
+    # sobre todos os candidatos (uma linha da matriz de similaridade).
+    n = len(scores)
+    k = min(k, n)
+    relevance_term = diversity_lambda * scores
+    # Começa no menor cosseno possível: no primeiro passo a penalidade é a
+    # mesma para todos e vence o mais relevante.
+    redundancy = np.full(n, -1.0, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: list[int] = []
+
+    for _ in range(k):
+        marginal = relevance_term - (1 - diversity_lambda) * redundancy
+        marginal[~available] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, unit @ unit[best], out=redundancy)
+
+    return selected
+
+
+def rerank(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    diversity_lambda: float,
+    lexical: np.ndarray | None = None,
+    lexical_weight: float = 0.0,
+) -> list[int]:
+    # Índices dos k candidatos escolhidos, em ordem.
+    unit = _unit(candidates)
+    scores = relevance(query, unit, lexical, lexical_weight)
+    if diversity_lambda >= 1:
+        # Sem diversificação: só a ordenação pela relevância combinada.
+        return [int(i) for i in np.argsort(-scores, kind="stable")[:k]]
+    return mmr(unit, scores, k, diversity_lambda)
@@ -1,67 +1,485 @@
 import logging
 from typing import Any
 
-import requests
+import numpy as np
 
 from api.config import Config
-from api.database import get_cursor
+from api.database import Vector, get_cursor
+from api.services import (
+    compact_vectors,
+    embedding_cache,
+    metadata_filter,
+    metrics,
+    ollama_client,
+    profiling,
+    reranker,
+    single_flight,
+    vector_index,
+)
+from api.services.index_service import apply_search_settings, check_search_settings
 
 logger = logging.getLogger(__name__)
 
+SEARCH_MODES = ("vector", "hybrid")
+
+_inflight = single_flight.group("search", lambda: Config.SINGLE_FLIGHT_SEARCH_WAIT)
+
+# O top-k é resolvido primeiro (ORDER BY distância + LIMIT, forma que o
+# índice HNSW/IVFFlat atende) e só depois o limiar é aplicado. Um
+# WHERE sobre a distância no mesmo nível impede o uso do índice.
+# O vetor vai uma única vez e a distância é calculada uma vez por linha.
+# {filter} é o predicado de metadados: com o iterative scan do pgvector
+# (ANN_ITERATIVE_SCAN) o índice continua varrendo até preencher o LIMIT
+# com linhas que passam no filtro, em vez de devolver só ef_search
+# candidatos e perder recall.
+VECTOR_SQL = """
+    SELECT id, title, chunk, chunk_id, chunk_seq, distance
+    FROM (
+        SELECT
+            doc.id,
+            doc.title,
+            emb.chunk,
+            emb.embedding_uuid AS chunk_id,
+            emb.chunk_seq,
+            emb.embedding <=> %(vector)s AS distance
+        FROM public.documents_embeddings_store emb
+        JOIN public.documents doc ON doc.id = emb.id
+        WHERE {filter}
+        ORDER BY distance
+        LIMIT %(limit)s
+    ) nn
+    WHERE distance <= %(max_distance)s
+    ORDER BY distance
+"""
+
+# Busca em duas fases sobre uma cópia compacta (compact_vectors): o índice
+# ANN da representação compacta devolve %(candidates)s candidatos pela
+# distância aproximada ({coarse}) e só eles têm a distância exata calculada
+# no vetor completo, que decide o top-k e o limiar.
+TWO_PHASE_SQL = """
+    SELECT id, title, chunk, chunk_id, chunk_seq, distance
+    FROM (
+        SELECT
+            doc.id,
+            doc.title,
+            emb.chunk,
+            emb.embedding_uuid AS chunk_id,
+            emb.chunk_seq,
+            emb.embedding <=> %(vector)s AS distance
+        FROM (
+            SELECT emb.embedding_uuid
+            FROM public.documents_embeddings_store emb
+            JOIN public.documents doc ON doc.id = emb.id
+            WHERE {filter}
+            ORDER BY {coarse}
+            LIMIT %(candidates)s
+        ) coarse
+        JOIN public.documents_embeddings_store emb
+            ON emb.embedding_uuid = coarse.embedding_uuid
+        JOIN public.documents doc ON doc.id = emb.id
+        ORDER BY distance
+        LIMIT %(limit)s
+    ) nn
+    WHERE distance <= %(max_distance)s
+    ORDER BY distance
+"""
+
+# Busca híbrida numa única query: candidatos vetoriais (por chunk) e
+# léxicos (full-text em documents.search_tsv, representados pelo chunk mais
+# próximo da consulta) são fundidos por reciprocal-rank fusion:
+#   score = w_vec / (k + rank_vec) + w_lex / (k + rank_lex)
+# O vetor é referenciado via (SELECT v FROM q), um InitPlan que o índice
+# ANN aceita como constante.
+HYBRID_SQL = """
+    WITH q AS (
+        SELECT
+            %(vector)s AS v,
+            websearch_to_tsquery(%(ts_config)s::regconfig, %(query)s) AS tsq
+    ),
+    vec AS (
+        SELECT id, chunk, chunk_id, chunk_seq, distance,
+               row_number() OVER (ORDER BY distance) AS rank
+        FROM (
+            SELECT
+                emb.id,
+                emb.chunk,
+                emb.embedding_uuid AS chunk_id,
+                emb.chunk_seq,
+                emb.embedding <=> (SELECT v FROM q) AS distance
+            FROM public.documents_embeddings_store emb
+            JOIN public.documents doc ON doc.id = emb.id
+            WHERE {filter}
+            ORDER BY distance
+            LIMIT %(candidates)s
+        ) nn
+        WHERE distance <= %(max_distance)s
+    ),
+    lex AS (
+        SELECT doc.id,
+               row_number() OVER (
+                   ORDER BY ts_rank_cd(doc.search_tsv, q.tsq) DESC, doc.id
+               ) AS rank
+        FROM public.documents doc, q
+        WHERE doc.search_tsv @@ q.tsq AND {filter}
+        ORDER BY rank
+        LIMIT %(candidates)s
+    ),
+    lex_chunks AS (
+        SELECT lex.id, best.chunk, best.chunk_id, best.chunk_seq, best.distance,
+               lex.rank
+        FROM lex
+        CROSS JOIN LATERAL (
+            SELECT
+                emb.chunk,
+                emb.embedding_uuid AS chunk_id,
+                emb.chunk_seq,
+                emb.embedding <=> (SELECT v FROM q) AS distance
+            FROM public.documents_embeddings_store emb
+            WHERE emb.id = lex.id
+            ORDER BY distance
+            LIMIT 1
+        ) best
+    )
+    SELECT
+        doc.id,
+        doc.title,
+        COALESCE(vec.chunk, lex_chunks.chunk) AS chunk,
+        COALESCE(vec.chunk_id, lex_chunks.chunk_id) AS chunk_id,
+        COALESCE(vec.chunk_seq, lex_chunks.chunk_seq) AS chunk_seq,
+        COALESCE(vec.distance, lex_chunks.distance) AS distance,
+        COALESCE(%(vector_weight)s::float8 / (%(rrf_k)s + vec.rank), 0)
+            + COALESCE(%(lexical_weight)s::float8 / (%(rrf_k)s + lex_chunks.rank), 0)
+            AS score
+    FROM vec
+    FULL OUTER JOIN lex_chunks ON lex_chunks.chunk_id = vec.chunk_id
+    JOIN public.documents doc ON doc.id = COALESCE(vec.id, lex_chunks.id)
+    ORDER BY score DESC, distance
+    LIMIT %(limit)s
+"""
+
+
+# Segunda etapa do rerank: os candidatos já vieram do índice ANN (ou da
+# fusão híbrida) e aqui só se busca, pela chave primária, o vetor de cada
+# um em binário (vector_send, sem formatar/parsear texto) e o ts_rank do
+# chunk contra a consulta, calculado pelo próprio Postgres.
+RERANK_SQL = """
+    SELECT
+        emb.embedding_uuid AS chunk_id,
+        vector_send(emb.embedding) AS embedding,
+        CASE WHEN %(lexical)s THEN
+            ts_rank_cd(
+                to_tsvector(%(ts_config)s::regconfig, emb.chunk),
+                websearch_to_tsquery(%(ts_config)s::regconfig, %(query)s)
+            )
+        ELSE 0 END AS lexical
+    FROM public.documents_embeddings_store emb
+    WHERE emb.embedding_uuid = ANY(%(chunk_ids)s::uuid[])
+"""
+
 
 def _ollama_embed(text: str) -> list[float]:
-    url = f"{Config.OLLAMA_HOST.rstrip('/')}/api/embeddings"
-    payload = {"model": Config.EMBEDDING_MODEL, "prompt": text}
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached
 
-    try:
-        resp = requests.post(url, json=payload, timeout=30)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        raise RuntimeError(f"Ollama indisponível em {Config.OLLAMA_HOST}: {e}") from e
+    model = Config.EMBEDDING_MODEL
+    normalized = embedding_cache.normalize_text(text)
+    with metrics.stage("embed"):
+        embedding = ollama_client.embed([normalized], model)[0]
+    embedding_cache.put(text, embedding, model=model)
+    return embedding
 
-    data = resp.json()
-    embedding = data.get("embedding")
-    if not isinstance(embedding, list) or not embedding:
-        raise RuntimeError(f"Embedding inválido retornado: {data}")
 
-    return [float(x) for x in embedding]
+def _ollama_embed_batch(texts: list[str]) -> list[list[float]]:
+    embeddings: list[list[float] | None] = [embedding_cache.get(t) for t in texts]
+    missing = [i for i, emb in enumerate(embeddings) if emb is None]
+    if not missing:
+        return embeddings
+
+    model = Config.EMBEDDING_MODEL
+    with metrics.stage("embed"):
+        batch = ollama_client.embed(
+            [embedding_cache.normalize_text(texts[i]) for i in missing], model
+        )
+
+    for i, embedding in zip(missing, batch):
+        embedding_cache.put(texts[i], embedding, model=model)
+        embeddings[i] = embedding
+
+    return embeddings
+
+
+def _format_row(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "chunk": row["chunk"],
+        "chunk_id": str(row["chunk_id"]),
+        "chunk_seq": row["chunk_seq"],
+        "distance": round(float(row["distance"]), 4),
+        "score": round(float(row["score"]), 6) if "score" in row else None,
+    }
 
 
 def semantic_search(
-    query: str, limit: int = 5, max_distance: float = 1.5
+    query: str,
+    limit: int = 5,
+    max_distance: float = 1.5,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    mode: str = "vector",
+    vector_weight: float | None = None,
+    lexical_weight: float | None = None,
+    filters: dict[str, Any] | None = None,
+    rerank: bool = False,
+    mmr_lambda: float | None = None,
+    compact: str | None = None,
+    embedding: list[float] | None = None,
 ) -> list[dict[str, Any]]:
     query = (query or "").strip()
     if not query:
         return []
 
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Modo de busca inválido: {mode}")
+    check_search_settings(ef_search, probes)
+    if mmr_lambda is not None and not 0 <= mmr_lambda <= 1:
+        raise ValueError("mmr_lambda deve estar entre 0 e 1")
+    # COMPACT_SEARCH é o padrão só do modo vector; "none" força o vetor
+    # completo numa única fase.
+    if compact is None:
+        compact = Config.COMPACT_SEARCH if mode == "vector" else ""
+    compact = "" if compact == "none" else compact.lower()
+    if compact:
+        if mode != "vector":
+            raise ValueError("Busca compacta só está disponível no modo vector")
+        if compact not in compact_vectors.enabled():
+            raise ValueError(
+                f"Representação compacta não habilitada em COMPACT_VECTORS: {compact}"
+            )
+
     limit = max(1, min(int(limit), 20))
+    filter_sql, filter_params = metadata_filter.build(filters)
 
-    query_embedding = _ollama_embed(query)
-    vec_literal = "[" + ",".join(f"{x:.8f}" for x in query_embedding) + "]"
+    # Buscas idênticas concorrentes (mesma consulta normalizada, parâmetros,
+    # filtros e modelo de embedding) compartilham uma única execução.
+    key = (
+        embedding_cache.normalize_text(query),
+        limit,
+        max_distance,
+        ef_search,
+        probes,
+        mode,
+        vector_weight,
+        lexical_weight,
+        filter_sql,
+        tuple(sorted(filter_params.items())),
+        rerank,
+        mmr_lambda,
+        compact,
+        Config.EMBEDDING_MODEL,
+    )
+    return _inflight.do(
+        key,
+        lambda: _search(
+            query,
+            limit,
+            max_distance,
+            ef_search,
+            probes,
+            mode,
+            vector_weight,
+            lexical_weight,
+            filter_sql,
+            filter_params,
+            rerank,
+            mmr_lambda,
+            compact,
+            embedding,
+        ),
+    )
 
+
+def _search(
+    query: str,
+    limit: int,
+    max_distance: float,
+    ef_search: int | None,
+    probes: int | None,
+    mode: str,
+    vector_weight: float | None,
+    lexical_weight: float | None,
+    filter_sql: str,
+    filter_params: dict[str, Any],
+    rerank: bool,
+    mmr_lambda: float | None,
+    compact: str,
+    embedding: list[float] | None = None,
+) -> list[dict[str, Any]]:
+    # O chamador pode já ter o embedding da consulta (o RAG o usa também no
+    # cache de respostas).
+    if embedding is None:
+        embedding = _ollama_embed(query)
+    # Sem filtros, híbrido ou rerank a busca exata no snapshot em memória
+    # responde sem ir ao Postgres; None quando ele está atrasado.
+    if mode == "vector" and not filter_params and not rerank and not compact:
+        local = vector_index.search([embedding], limit, max_distance)
+        if local is not None:
+            return [_format_row(row) for row in local[0]]
+
+    # Com rerank, busca limit × RERANK_CANDIDATE_FACTOR candidatos e o
+    # reranker escolhe os `limit` finais.
+    fetch = limit
+    if rerank:
+        fetch = min(
+            Config.RERANK_MAX_CANDIDATES, limit * Config.RERANK_CANDIDATE_FACTOR
+        )
+    params = {
+        "vector": Vector(embedding),
+        "limit": fetch,
+        "max_distance": max_distance,
+        **filter_params,
+    }
+    sql = VECTOR_SQL
+    if compact:
+        candidates = compact_vectors.candidates(fetch)
+        sql = TWO_PHASE_SQL.replace(
+            "{coarse}", compact_vectors.spec(compact)["distance"]
+        )
+        params["candidates"] = candidates
+        # O índice só devolve até ef_search vizinhos por varredura; a
+        # primeira fase precisa de todos os candidatos.
+        ef_search = min(1000, max(ef_search or Config.HNSW_EF_SEARCH, candidates))
+    elif mode == "hybrid":
+        sql = HYBRID_SQL
+        params.update(
+            query=query,
+            ts_config=Config.HYBRID_TS_CONFIG,
+            candidates=max(fetch, Config.HYBRID_CANDIDATES),
+            rrf_k=Config.HYBRID_RRF_K,
+            vector_weight=(
+                Config.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+            ),
+            lexical_weight=(
+                Config.HYBRID_LEXICAL_WEIGHT
+                if lexical_weight is None
+                else lexical_weight
+            ),
+        )
+
+    with get_cursor() as cur:
+        apply_search_settings(cur, ef_search=ef_search, probes=probes)
+        sql = sql.format(filter=filter_sql)
+        with metrics.stage("vector_sql"):
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        if profiling.active() is not None:
+            # Só com ?debug_timings/?profile: o plano (sem ANALYZE, para não
+            # executar a busca de novo) mostra se o índice foi usado.
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()["QUERY PLAN"][0]
+            profiling.annotate("sql_plan", profiling.summarize_plan(plan))
+        if rerank and len(rows) > 1:
+            rows = _rerank(cur, query, embedding, rows, limit, mmr_lambda)
+
+    return [_format_row(row) for row in rows]
+
+
+def _rerank(
+    cur,
+    query: str,
+    embedding: list[float],
+    rows: list[dict[str, Any]],
+    limit: int,
+    mmr_lambda: float | None,
+) -> list[dict[str, Any]]:
+    lexical_weight = Config.RERANK_LEXICAL_WEIGHT
+    with metrics.stage("rerank_sql"):
+        cur.execute(
+            RERANK_SQL,
+            {
+                "chunk_ids": [str(row["chunk_id"]) for row in rows],
+                "lexical": lexical_weight > 0,
+                "ts_config": Config.HYBRID_TS_CONFIG,
+                "query": query,
+            },
+        )
+        extra = {str(row["chunk_id"]): row for row in cur.fetchall()}
+
+    # Um chunk pode sumir entre as duas queries (vectorizer reprocessando o
+    # documento); fica de fora.
+    rows = [row for row in rows if str(row["chunk_id"]) in extra]
+    matches = [extra[str(row["chunk_id"])] for row in rows]
+    with metrics.stage("rerank"):
+        order = reranker.rerank(
+            np.asarray(embedding, dtype=np.float32),
+            reranker.decode_vectors([m["embedding"] for m in matches]),
+            limit,
+            Config.RERANK_MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+            np.array([m["lexical"] for m in matches], dtype=np.float32),
+            lexical_weight,
+        )
+    return [rows[i] for i in order]
+
+
+def batch_semantic_search(
+    queries: list[str],
+    limit: int = 5,
+    max_distance: float = 1.5,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> list[list[dict[str, Any]]]:
+    check_search_settings(ef_search, probes)
+    normalized = [(q or "").strip() for q in queries]
+    positions = [i for i, q in enumerate(normalized) if q]
+    results: list[list[dict[str, Any]]] = [[] for _ in normalized]
+    if not positions:
+        return results
+
+    limit = max(1, min(int(limit), 20))
+
+    embeddings = _ollama_embed_batch([normalized[i] for i in positions])
+
+    # Todas as consultas num único produto de matrizes contra o snapshot.
+    local = vector_index.search(embeddings, limit, max_distance)
+    if local is not None:
+        for position, rows in zip(positions, local):
+            results[position] = [_format_row(row) for row in rows]
+        return results
+
+    # Um único round trip: cada vetor de consulta vira uma linha do unnest e
+    # o LATERAL executa o top-k por vizinho mais próximo para cada uma.
     sql = """
-        SELECT
-            doc.id,
-            doc.title,
-            emb.chunk,
-            emb.embedding <=> (%s)::vector AS distance
-        FROM public.documents_embeddings_store emb
-        JOIN public.documents doc ON doc.id = emb.id
-        WHERE emb.embedding <=> (%s)::vector <= %s
-        ORDER BY distance
-        LIMIT %s
+        SELECT q.ord, r.id, r.title, r.chunk, r.chunk_id, r.chunk_seq, r.distance
+        FROM unnest(%s::vector[]) WITH ORDINALITY AS q(vec, ord)
+        CROSS JOIN LATERAL (
+            SELECT
+                doc.id,
+                doc.title,
+                emb.chunk,
+                emb.embedding_uuid AS chunk_id,
+                emb.chunk_seq,
+                emb.embedding <=> q.vec AS distance
+            FROM public.documents_embeddings_store emb
+            JOIN public.documents doc ON doc.id = emb.id
+            ORDER BY emb.embedding <=> q.vec
+            LIMIT %s
+        ) r
+        WHERE r.distance <= %s
+        ORDER BY q.ord, r.distance
     """
 
     with get_cursor() as cur:
-        cur.execute(sql, (vec_literal, vec_literal, max_distance, limit))
-        rows = cur.fetchall()
-
-    return [
-        {
-            "id": row["id"],
-            "title": row["title"],
-            "chunk": row["chunk"],
-            "distance": round(float(row["distance"]), 4),
-        }
-        for row in rows
-    ]
+        apply_search_settings(cur, ef_search=ef_search, probes=probes)
+        with metrics.stage("vector_sql"):
+            cur.execute(
+                sql,
+                ([Vector(e) for e in embeddings], limit, max_distance),
+            )
+            rows = cur.fetchall()
+
+    for row in rows:
+        results[positions[row["ord"] - 1]].append(_format_row(row))
+
+    logger.info("Busca em lote: %d consultas, %d resultados", len(positions), len(rows))
+    return results
@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+import logging
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterator
+
+from api.config import Config
+from api.services.document_service import bulk_insert_documents
+
+logger = logging.getLogger(__name__)
+
+SEED_EXTENSIONS = (".ndjson", ".jsonl", ".json")
+SEED_KEY_PREFIX = "seed:"
+
+_CORPUS_NAME = re.compile(r"^[\w-]+$")
+
+
+def _seed_dir() -> Path:
+    return Path(Config.SEED_DIR)
+
+
+def list_corpora() -> list[str]:
+    seed_dir = _seed_dir()
+    if not seed_dir.is_dir():
+        return []
+    return sorted(
+        {path.stem for path in seed_dir.iterdir() if path.suffix in SEED_EXTENSIONS}
+    )
+
+
+def _corpus_path(name: str) -> Path:
+    if not _CORPUS_NAME.match(name):
+        raise ValueError(f"Nome de corpus inválido: {name}")
+    for extension in SEED_EXTENSIONS:
+        path = _seed_dir() / f"{name}{extension}"
+        if path.is_file():
+            return path
+    raise FileNotFoundError(f"Corpus '{name}' não encontrado em {Config.SEED_DIR}")
+
+
+def _iter_articles(path: Path) -> Iterator[dict[str, Any]]:
+    # NDJSON é lido linha a linha (memória constante); .json é um array e é
+    # carregado inteiro, então corpora grandes devem usar NDJSON.
+    with path.open(encoding="utf-8") as f:
+        if path.suffix == ".json":
+            yield from json.load(f)
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(
+                    f"{path.name}, linha {line_no}: JSON inválido ({e.msg})"
+                ) from e
+
+
+def _to_record(article: dict[str, Any], corpus: str) -> dict[str, Any]:
+    if not isinstance(article, dict):
+        return article
+
+    metadata = {"source": corpus, **(article.get("metadata") or {})}
+    if article.get("url"):
+        metadata["url"] = article["url"]
+
+    title = article.get("title")
+    return {
+        "title": title,
+        "content": article.get("content"),
+        "metadata": metadata,
+        # A chave única por título torna a carga idempotente com um único
+        # INSERT ... ON CONFLICT DO NOTHING por lote.
+        "idempotency_key": f"{SEED_KEY_PREFIX}{title}" if title else None,
+    }
+
+
+def seed_corpus(name: str) -> dict[str, int]:
+    path = _corpus_path(name)
+    records = (_to_record(article, name) for article in _iter_articles(path))
+
+    results = bulk_insert_documents(records)
+    inserted = sum(1 for r in results if r["created"])
+
+    logger.info(
+        "Corpus '%s' carregado: %d inseridos, %d já existiam",
+        name,
+        inserted,
+        len(results) - inserted,
+    )
+    return {"inserted": inserted, "existing": len(results) - inserted}
+
+
+def _seeded_articles() -> Iterator[tuple[str, str]]:
+    # (título, url) de cada artigo dos corpora em SEED_DIR: identifica um
+    # documento como semeado sem depender de metadados que documentos do
+    # usuário também podem ter.
+    for name in list_corpora():
+        try:
+            for article in _iter_articles(_corpus_path(name)):
+                if (
+                    isinstance(article, dict)
+                    and article.get("title")
+                    and article.get("url")
+                ):
+                    yield article["title"], article["url"]
+        except (OSError, ValueError) as e:
+            logger.warning("Corpus '%s' ignorado no backfill das chaves: %s", name, e)
+
+
+def _copy_articles(cur, rows: list[tuple[str, str]]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(
+        "COPY seed_articles_stage (title, url) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def backfill_seed_keys(cur) -> int:
+    # Documentos semeados antes da chave existir recebem 'seed:<título>'
+    # (um por título), para que um novo seed não os duplique. Só contam os
+    # que têm título e url de um artigo dos corpora.
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM documents WHERE idempotency_key IS NULL
+        ) AS pending
+        """)
+    if not cur.fetchone()["pending"]:
+        return 0
+
+    # Os artigos vão em lotes por COPY para uma tabela temporária, como na
+    # carga em lote: memória constante para corpora NDJSON de qualquer
+    # tamanho.
+    cur.execute("""
+        CREATE TEMP TABLE seed_articles_stage (
+            title TEXT NOT NULL,
+            url TEXT NOT NULL
+        ) ON COMMIT DROP
+        """)
+    articles = _seeded_articles()
+    while batch := list(islice(articles, Config.BULK_BATCH_SIZE)):
+        _copy_articles(cur, batch)
+
+    cur.execute(
+        """
+        UPDATE documents d
+        SET idempotency_key = %s || d.title
+        FROM (
+            SELECT min(doc.id) AS id
+            FROM documents doc
+            JOIN seed_articles_stage seed
+              ON seed.title = doc.title AND seed.url = doc.metadata->>'url'
+            WHERE doc.idempotency_key IS NULL
+            GROUP BY doc.title
+        ) first_by_title
+        WHERE d.id = first_by_title.id
+          AND NOT EXISTS (
+              SELECT 1 FROM documents k WHERE k.idempotency_key = %s || d.title
+          )
+        """,
+        (SEED_KEY_PREFIX, SEED_KEY_PREFIX),
+    )
+    updated = cur.rowcount
+    cur.execute("DROP TABLE seed_articles_stage")
+    return updated
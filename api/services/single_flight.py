@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Any, Callable
+
+from api.config import Config
+from api.services import profiling
+
+logger = logging.getLogger(__name__)
+
+
+class WaitTimeout(RuntimeError):
+    pass
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class Group:
+    # Single-flight: chamadas concorrentes com a mesma chave compartilham uma
+    # única execução. A primeira (líder) executa; as demais (seguidoras)
+    # esperam no máximo `timeout()` segundos e recebem o mesmo resultado ou
+    # a mesma exceção. Nada fica guardado depois que a execução termina: o
+    # cache de resultados é papel do embedding_cache/answer_cache.
+    def __init__(self, name: str, timeout: Callable[[], float]):
+        self.name = name
+        self._timeout = timeout
+        self._calls: dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0, "errors": 0, "timeouts": 0}
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        # Com ?debug_timings/?profile os tempos e o cProfile são coletados na
+        # thread que executa: uma seguidora voltaria com eles vazios.
+        if not Config.SINGLE_FLIGHT_ENABLED or profiling.active() is not None:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+                leader = True
+            else:
+                call.followers += 1
+                self._stats["followers"] += 1
+                leader = False
+
+        if not leader:
+            profiling.annotate(f"coalesced_{self.name}", True)
+            return self._wait(call)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # Removida antes de liberar as seguidoras: quem chegar depois
+                # disto começa uma nova execução em vez de ler um resultado
+                # que pode já estar velho.
+                del self._calls[key]
+                if call.error is not None:
+                    self._stats["errors"] += 1
+            call.done.set()
+        return call.result
+
+    def _wait(self, call: _Call) -> Any:
+        timeout = self._timeout()
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            logger.warning(
+                "%s: tempo de espera pela execução em andamento esgotado (%gs)",
+                self.name,
+                timeout,
+            )
+            raise WaitTimeout(
+                f"Tempo esgotado aguardando requisição idêntica em andamento "
+                f"({timeout:g}s)"
+            )
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+_groups: dict[str, Group] = {}
+
+
+def group(name: str, timeout: Callable[[], float]) -> Group:
+    return _groups.setdefault(name, Group(name, timeout))
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return {name: g.stats() for name, g in _groups.items()}
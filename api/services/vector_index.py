@@ -0,0 +1,686 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from api.config import Config
+from api.database import get_connection, get_cursor
+from api.services import metrics, profiling, reranker
+from api.services.index_service import EMBEDDINGS_TABLE
+
+logger = logging.getLogger(__name__)
+
+CHANGES_TABLE = "public.documents_embeddings_changes"
+DTYPES = ("float32", "float16")
+
+# Índice vetorial em processo para bases pequenas: o top-k exato sai de um
+# produto de matrizes NumPy sobre um snapshot da documents_embeddings_store,
+# sem round trip ao Postgres. Cada geração do snapshot são quatro arquivos
+# em VECTOR_INDEX_DIR:
+#   vectors-N.npy  matriz (capacidade × dimensões) de vetores unitários
+#   rows-N.npy     chunk_id, documento, chunk_seq, posição no payload e live
+#   payload-N.bin  título e chunk em JSON, lidos só para o top-k
+#   meta-N.npy     linhas ocupadas, último seq aplicado e hora do refresh
+# current.npy guarda o número da geração em uso. Todos os processos mapeiam
+# os mesmos arquivos (as páginas ficam uma vez só no page cache); só quem
+# segura o flock de writer.lock escreve, os demais apenas leem.
+ROW_DTYPE = np.dtype(
+    [
+        ("chunk_id", np.uint8, (16,)),
+        ("doc_id", "<i4"),
+        ("chunk_seq", "<i4"),
+        ("offset", "<i8"),
+        ("length", "<i4"),
+        ("live", np.uint8),
+    ]
+)
+_COUNT, _SEQ, _REFRESHED = range(3)
+
+# Mudanças na tabela de embeddings, gravadas por triggers de statement
+# (uma linha por chunk inserido/removido; UPDATE vira remoção + inserção).
+# O writer consome em ordem de seq a partir do último aplicado.
+CHANGES_SQL = f"""
+    SELECT seq, op, embedding_uuid
+    FROM {CHANGES_TABLE}
+    WHERE seq > %(after)s
+    ORDER BY seq
+    LIMIT %(limit)s
+"""
+
+GAPS_SQL = f"""
+    SELECT seq, op, embedding_uuid
+    FROM {CHANGES_TABLE}
+    WHERE seq = ANY(%(seqs)s::bigint[])
+    ORDER BY seq
+"""
+
+CHUNKS_SQL = f"""
+    SELECT
+        emb.embedding_uuid AS chunk_id,
+        emb.id,
+        emb.chunk_seq,
+        emb.chunk,
+        doc.title,
+        vector_send(emb.embedding) AS embedding
+    FROM {EMBEDDINGS_TABLE} emb
+    JOIN public.documents doc ON doc.id = emb.id
+"""
+
+
+class _Generation:
+    def __init__(self, number: int, writable: bool = False):
+        directory = Path(Config.VECTOR_INDEX_DIR)
+        mode = "r+" if writable else "r"
+        self.number = number
+        self.vectors = np.load(directory / f"vectors-{number}.npy", mmap_mode=mode)
+        self.rows = np.load(directory / f"rows-{number}.npy", mmap_mode=mode)
+        self.meta = np.load(directory / f"meta-{number}.npy", mmap_mode=mode)
+        flags = os.O_RDWR | os.O_APPEND if writable else os.O_RDONLY
+        self.payload = os.open(directory / f"payload-{number}.bin", flags)
+        self.payload_size = os.fstat(self.payload).st_size
+
+    def __del__(self):
+        # Fechado só quando nenhuma busca em andamento referencia a geração.
+        if hasattr(self, "payload"):
+            os.close(self.payload)
+
+    @classmethod
+    def create(cls, number: int, capacity: int, dimensions: int) -> "_Generation":
+        directory = Path(Config.VECTOR_INDEX_DIR)
+        open_memmap = np.lib.format.open_memmap
+        open_memmap(
+            directory / f"vectors-{number}.npy",
+            mode="w+",
+            dtype=Config.VECTOR_INDEX_DTYPE,
+            shape=(capacity, dimensions),
+        )
+        open_memmap(
+            directory / f"rows-{number}.npy",
+            mode="w+",
+            dtype=ROW_DTYPE,
+            shape=(capacity,),
+        )
+        open_memmap(
+            directory / f"meta-{number}.npy", mode="w+", dtype=np.int64, shape=(3,)
+        )
+        (directory / f"payload-{number}.bin").write_bytes(b"")
+        return cls(number, writable=True)
+
+    @property
+    def count(self) -> int:
+        return min(int(self.meta[_COUNT]), len(self.rows))
+
+    def append(self, rows: list[dict[str, Any]]) -> None:
+        start = int(self.meta[_COUNT])
+        if start + len(rows) > len(self.rows):
+            raise RuntimeError("Snapshot do índice vetorial sem capacidade")
+
+        vectors = reranker.decode_vectors([row["embedding"] for row in rows])
+        if vectors.shape[1] != self.vectors.shape[1]:
+            raise RuntimeError(
+                f"Embeddings com {vectors.shape[1]} dimensões; o snapshot tem "
+                f"{self.vectors.shape[1]}"
+            )
+        payloads = [
+            json.dumps({"title": row["title"], "chunk": row["chunk"]}).encode()
+            for row in rows
+        ]
+        lengths = np.array([len(p) for p in payloads], dtype=np.int64)
+        offsets = self.payload_size + np.cumsum(lengths) - lengths
+        os.write(self.payload, b"".join(payloads))
+        self.payload_size += int(lengths.sum())
+
+        end = start + len(rows)
+        self.vectors[start:end] = _normalize(vectors)
+        block = self.rows[start:end]
+        block["chunk_id"] = np.frombuffer(
+            b"".join(uuid.UUID(str(row["chunk_id"])).bytes for row in rows),
+            dtype=np.uint8,
+        ).reshape(-1, 16)
+        block["doc_id"] = [row["id"] for row in rows]
+        block["chunk_seq"] = [row["chunk_seq"] for row in rows]
+        block["offset"] = offsets
+        block["length"] = lengths
+        block["live"] = 1
+        # Só depois dos dados: quem lê nunca enxerga uma linha pela metade.
+        self.meta[_COUNT] = end
+
+    def row(self, index: int, distance: float) -> dict[str, Any]:
+        row = self.rows[index]
+        payload = json.loads(
+            os.pread(self.payload, int(row["length"]), int(row["offset"]))
+        )
+        return {
+            "id": int(row["doc_id"]),
+            "title": payload["title"],
+            "chunk": payload["chunk"],
+            "chunk_id": uuid.UUID(bytes=row["chunk_id"].tobytes()),
+            "chunk_seq": int(row["chunk_seq"]),
+            "distance": distance,
+        }
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+_stats = {"searches": 0, "refreshes": 0, "rebuilds": 0, "applied": 0, "errors": 0}
+_fallbacks: dict[str, int] = {}
+_last_rebuild_s: float | None = None
+
+# Lado leitor (todos os processos).
+_current: np.ndarray | None = None
+_view: _Generation | None = None
+
+# Lado writer (só o processo com o flock).
+_lock_fd: int | None = None
+_generation: _Generation | None = None
+_positions: dict[bytes, int] = {}
+# seq que faltaram na sequência (transação ainda aberta quando o writer leu
+# as vizinhas) e quando foram vistos; são relidos até VECTOR_INDEX_GAP_WAIT.
+_gaps: dict[int, float] = {}
+
+
+def create_change_log(cur) -> None:
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+            seq BIGSERIAL PRIMARY KEY,
+            op CHAR(1) NOT NULL,
+            embedding_uuid UUID,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS documents_embeddings_changes_created_idx
+        ON {CHANGES_TABLE} (created_at)
+        """)
+    # Triggers por statement com transition tables: o vectorizer grava os
+    # chunks de um documento num único INSERT, que vira um único INSERT ...
+    # SELECT no log em vez de uma chamada de função por linha.
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION public.documents_embeddings_log_changes()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO {CHANGES_TABLE} (op) VALUES ('T');
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO {CHANGES_TABLE} (op, embedding_uuid)
+                SELECT 'D', embedding_uuid FROM old_rows;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {CHANGES_TABLE} (op, embedding_uuid)
+                SELECT 'I', embedding_uuid FROM new_rows;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """)
+    for event, referencing in (
+        ("INSERT", "REFERENCING NEW TABLE AS new_rows"),
+        ("UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("DELETE", "REFERENCING OLD TABLE AS old_rows"),
+        ("TRUNCATE", ""),
+    ):
+        cur.execute(f"""
+            CREATE OR REPLACE TRIGGER documents_embeddings_log_{event.lower()}
+            AFTER {event} ON {EMBEDDINGS_TABLE}
+            {referencing}
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION public.documents_embeddings_log_changes()
+            """)
+
+
+def build(
+    batches: Iterable[list[dict[str, Any]]],
+    capacity: int,
+    last_seq: int = 0,
+    dimensions: int | None = None,
+) -> int:
+    # Grava uma geração nova completa e só então a publica em current.npy.
+    # Também usado pelo benchmark, com linhas sintéticas no formato de
+    # CHUNKS_SQL.
+    global _generation, _positions
+    directory = Path(Config.VECTOR_INDEX_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    current = _open_current(create=True)
+    number = int(current[0]) + 1
+
+    generation = _Generation.create(
+        number, capacity, dimensions or Config.EMBEDDING_DIMENSIONS
+    )
+    for batch in batches:
+        if batch:
+            generation.append(batch)
+    generation.meta[_SEQ] = last_seq
+    generation.meta[_REFRESHED] = _now_ms()
+
+    positions = {
+        chunk_id.tobytes(): index
+        for index, chunk_id in enumerate(
+            generation.rows["chunk_id"][: generation.count]
+        )
+    }
+    current[0] = number
+    _generation, _positions = generation, positions
+
+    # Processos que ainda leem a geração anterior mantêm o mapeamento
+    # válido mesmo após o unlink; na próxima busca abrem a nova.
+    for path in directory.glob("*-*.*"):
+        stem = path.name.split("-", 1)[1].split(".", 1)[0]
+        if stem.isdigit() and int(stem) != number:
+            path.unlink(missing_ok=True)
+    return number
+
+
+def _open_current(create: bool = False) -> np.ndarray | None:
+    global _current
+    # O writer precisa do mapeamento gravável, mesmo que o processo já o
+    # tenha aberto antes como leitor.
+    if _current is None or (create and not _current.flags.writeable):
+        path = Path(Config.VECTOR_INDEX_DIR) / "current.npy"
+        if create and not path.exists():
+            np.lib.format.open_memmap(path, mode="w+", dtype=np.int64, shape=(1,))
+        if not path.exists():
+            return None
+        _current = np.load(path, mmap_mode="r+" if create else "r")
+    return _current
+
+
+def _snapshot() -> _Generation | None:
+    global _view
+    current = _open_current()
+    if current is None:
+        return None
+    number = int(current[0])
+    view = _view
+    if view is None or view.number != number:
+        with _lock:
+            if _view is None or _view.number != number:
+                writer = _generation
+                if writer is not None and writer.number == number:
+                    _view = writer
+                else:
+                    _view = _Generation(number)
+            view = _view
+    return view
+
+
+def _fallback(reason: str) -> None:
+    with _lock:
+        _fallbacks[reason] = _fallbacks.get(reason, 0) + 1
+    profiling.annotate("vector_index", reason)
+
+
+def _top_k(
+    generation: _Generation, count: int, queries: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Produto em blocos de VECTOR_INDEX_BLOCK_ROWS linhas (o float16 é
+    # convertido bloco a bloco) guardando só os k melhores de cada bloco.
+    queries = _normalize(queries)
+    scores_parts, index_parts = [], []
+    block_rows = max(1, Config.VECTOR_INDEX_BLOCK_ROWS)
+    for start in range(0, count, block_rows):
+        end = min(count, start + block_rows)
+        block = np.asarray(generation.vectors[start:end], dtype=np.float32)
+        scores = queries @ block.T
+        scores[:, generation.rows["live"][start:end] == 0] = -np.inf
+        take = min(k, end - start)
+        part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+        scores_parts.append(np.take_along_axis(scores, part, axis=1))
+        index_parts.append(part + start)
+
+    if not scores_parts:
+        empty = np.empty((len(queries), 0))
+        return empty.astype(np.int64), empty
+    scores = np.concatenate(scores_parts, axis=1)
+    indices = np.concatenate(index_parts, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    # Distância de cosseno, a mesma do operador <=> do pgvector.
+    distances = 1.0 - np.take_along_axis(scores, order, axis=1)
+    return np.take_along_axis(indices, order, axis=1), distances
+
+
+def search(
+    embeddings: list[list[float]], limit: int, max_distance: float
+) -> list[list[dict[str, Any]]] | None:
+    # None quando o snapshot não pode responder (desligado, inexistente,
+    # atrasado além de VECTOR_INDEX_MAX_LAG ou de outra dimensão): quem
+    # chama usa o SQL.
+    if not Config.VECTOR_INDEX_ENABLED:
+        return None
+    try:
+        generation = _snapshot()
+    except OSError as e:
+        logger.warning("Snapshot do índice vetorial indisponível: %s", e)
+        generation = None
+    if generation is None:
+        _fallback("missing")
+        return None
+
+    lag = time.time() - int(generation.meta[_REFRESHED]) / 1000
+    if lag > Config.VECTOR_INDEX_MAX_LAG:
+        _fallback("stale")
+        return None
+    queries = np.asarray(embeddings, dtype=np.float32)
+    if queries.shape[1] != generation.vectors.shape[1]:
+        _fallback("dimensions")
+        return None
+
+    with metrics.stage("vector_index"):
+        indices, distances = _top_k(generation, generation.count, queries, limit)
+        results = [
+            [
+                generation.row(int(index), float(distance))
+                for index, distance in zip(row_indices, row_distances)
+                if distance <= max_distance
+            ]
+            for row_indices, row_distances in zip(indices, distances)
+        ]
+    with _lock:
+        _stats["searches"] += 1
+    profiling.annotate("vector_index", "hit")
+    return results
+
+
+def _try_lock() -> bool:
+    global _lock_fd
+    directory = Path(Config.VECTOR_INDEX_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd = os.open(directory / "writer.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return False
+    # Mantido até o processo terminar; se ele morrer, outro assume.
+    _lock_fd = fd
+    logger.info("Este processo é o writer do índice vetorial local")
+    return True
+
+
+def _track_gaps(last_seq: int, seqs: list[int]) -> None:
+    now = time.monotonic()
+    expected = last_seq + 1
+    for seq in seqs:
+        # Saltos enormes vêm de limpeza do log, não de transações abertas.
+        if expected < seq <= expected + 1000:
+            for missing in range(expected, seq):
+                _gaps.setdefault(missing, now)
+        expected = max(expected, seq + 1)
+
+
+def _gap_scan(cur, last_seq: int) -> None:
+    # Ao (re)abrir o snapshot, os buracos recentes do log podem ser
+    # transações que ainda vão commitar.
+    cur.execute(
+        f"SELECT seq FROM {CHANGES_TABLE} WHERE seq > %s ORDER BY seq",
+        (max(0, last_seq - 1000),),
+    )
+    seqs = [row["seq"] for row in cur.fetchall() if row["seq"] <= last_seq]
+    if seqs:
+        _track_gaps(seqs[0] - 1, seqs + [last_seq + 1])
+
+
+def _rebuild() -> None:
+    global _last_rebuild_s
+    started = time.perf_counter()
+    _gaps.clear()
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"SELECT COALESCE(max(seq), 0) AS seq FROM {CHANGES_TABLE}")
+            last_seq = cur.fetchone()["seq"]
+            cur.execute(f"SELECT count(*) AS total FROM {EMBEDDINGS_TABLE}")
+            total = cur.fetchone()["total"]
+            _gap_scan(cur, last_seq)
+
+        # Cursor nomeado: a tabela vem em lotes, sem materializar tudo.
+        # Mudanças que commitarem durante a leitura têm seq > last_seq e são
+        # reaplicadas depois (inserção de chunk já presente é ignorada).
+        with conn.cursor("vector_index_snapshot", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = Config.VECTOR_INDEX_REFRESH_BATCH
+            cur.execute(CHUNKS_SQL)
+
+            def batches():
+                while True:
+                    rows = cur.fetchmany(Config.VECTOR_INDEX_REFRESH_BATCH)
+                    if not rows:
+                        return
+                    yield rows
+
+            number = build(batches(), int(total * 1.5) + 1024, last_seq)
+
+    _last_rebuild_s = time.perf_counter() - started
+    with _lock:
+        _stats["rebuilds"] += 1
+    logger.info(
+        "Snapshot do índice vetorial reconstruído: geração %d, %d chunks em %.1fs",
+        number,
+        _generation.count,
+        _last_rebuild_s,
+    )
+
+
+def _reopen() -> bool:
+    # Reaproveita o snapshot em disco quando o formato bate com a config.
+    global _generation, _positions
+    current = _open_current(create=True)
+    number = int(current[0])
+    if not number:
+        return False
+    try:
+        generation = _Generation(number, writable=True)
+    except OSError:
+        return False
+    if (
+        generation.vectors.dtype != np.dtype(Config.VECTOR_INDEX_DTYPE)
+        or generation.vectors.shape[1] != Config.EMBEDDING_DIMENSIONS
+    ):
+        return False
+
+    count = generation.count
+    live = generation.rows["live"][:count]
+    _positions = {
+        chunk_id.tobytes(): index
+        for index, chunk_id in enumerate(generation.rows["chunk_id"][:count])
+        if live[index]
+    }
+    _generation = generation
+    with get_cursor() as cur:
+        _gap_scan(cur, int(generation.meta[_SEQ]))
+    logger.info("Snapshot do índice vetorial reaberto: geração %d", number)
+    return True
+
+
+def _apply(cur, generation: _Generation, changes: list[dict[str, Any]]) -> bool:
+    # Devolve False quando só uma reconstrução resolve (TRUNCATE ou falta
+    # de capacidade). Aplicar de novo a mesma mudança não tem efeito.
+    if any(change["op"] == "T" for change in changes):
+        return False
+
+    for change in changes:
+        if change["op"] == "D":
+            index = _positions.pop(uuid.UUID(str(change["embedding_uuid"])).bytes, None)
+            if index is not None:
+                generation.rows["live"][index] = 0
+
+    wanted = {
+        str(change["embedding_uuid"])
+        for change in changes
+        if change["op"] == "I"
+        and uuid.UUID(str(change["embedding_uuid"])).bytes not in _positions
+    }
+    if not wanted:
+        return True
+    # Chunk removido depois de logado não volta do SELECT: o 'D' dele já
+    # está no log e nada é inserido.
+    cur.execute(
+        CHUNKS_SQL + " WHERE emb.embedding_uuid = ANY(%(ids)s::uuid[])",
+        {"ids": list(wanted)},
+    )
+    rows = cur.fetchall()
+    if generation.count + len(rows) > len(generation.rows):
+        return False
+    start = generation.count
+    generation.append(rows)
+    for offset, row in enumerate(rows):
+        _positions[uuid.UUID(str(row["chunk_id"])).bytes] = start + offset
+    return True
+
+
+def _refresh() -> None:
+    generation = _generation
+    last_seq = int(generation.meta[_SEQ])
+    applied = 0
+    consistent = True
+    with get_cursor() as cur:
+        now = time.monotonic()
+        for seq, seen in list(_gaps.items()):
+            if now - seen > Config.VECTOR_INDEX_GAP_WAIT:
+                del _gaps[seq]
+        if _gaps:
+            cur.execute(GAPS_SQL, {"seqs": list(_gaps)})
+            changes = cur.fetchall()
+            for change in changes:
+                del _gaps[change["seq"]]
+            consistent = _apply(cur, generation, changes)
+            applied += len(changes)
+
+        while consistent:
+            cur.execute(
+                CHANGES_SQL,
+                {"after": last_seq, "limit": Config.VECTOR_INDEX_REFRESH_BATCH},
+            )
+            changes = cur.fetchall()
+            if not changes:
+                break
+            consistent = _apply(cur, generation, changes)
+            _track_gaps(last_seq, [change["seq"] for change in changes])
+            last_seq = changes[-1]["seq"]
+            generation.meta[_SEQ] = last_seq
+            applied += len(changes)
+            if len(changes) < Config.VECTOR_INDEX_REFRESH_BATCH:
+                break
+
+    if not consistent:
+        _rebuild()
+        return
+    generation.meta[_REFRESHED] = _now_ms()
+    with _lock:
+        _stats["refreshes"] += 1
+        _stats["applied"] += applied
+
+
+def _maintain() -> None:
+    # Limpa o log e reconstrói quando o snapshot ficou para trás do log
+    # (writer parado além do TTL) ou tem mais de 25% de linhas removidas.
+    generation = _generation
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            DELETE FROM {CHANGES_TABLE}
+            WHERE created_at < now() - make_interval(secs => %s)
+            """,
+            (Config.VECTOR_INDEX_CHANGELOG_TTL,),
+        )
+        cur.execute(f"SELECT min(seq) AS seq FROM {CHANGES_TABLE}")
+        oldest = cur.fetchone()["seq"]
+
+    count = generation.count
+    dead = count - int(generation.rows["live"][:count].sum())
+    behind = oldest is not None and oldest > int(generation.meta[_SEQ]) + 1
+    if behind or (count > 10_000 and dead > count // 4):
+        _rebuild()
+
+
+def _loop() -> None:
+    last_maintenance = time.monotonic()
+    while True:
+        try:
+            if _lock_fd is not None or _try_lock():
+                if _generation is None:
+                    if not _reopen():
+                        _rebuild()
+                elif time.monotonic() - last_maintenance > 60:
+                    _maintain()
+                    last_maintenance = time.monotonic()
+                _refresh()
+        except (psycopg2.Error, RuntimeError, OSError) as e:
+            # Banco fora ou /setup ainda não rodou: as buscas usam o SQL até
+            # o snapshot voltar a ficar em dia.
+            with _lock:
+                _stats["errors"] += 1
+            logger.warning("Índice vetorial local: %s", e)
+        if _stop.wait(Config.VECTOR_INDEX_REFRESH_INTERVAL):
+            return
+
+
+def start() -> None:
+    global _thread
+    if not Config.VECTOR_INDEX_ENABLED or _thread is not None:
+        return
+    if Config.VECTOR_INDEX_DTYPE not in DTYPES:
+        logger.error(
+            "VECTOR_INDEX_DTYPE inválido (%s); índice vetorial local desligado",
+            Config.VECTOR_INDEX_DTYPE,
+        )
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="vector-index", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        result: dict[str, Any] = {
+            **_stats,
+            "enabled": Config.VECTOR_INDEX_ENABLED,
+            "role": "writer" if _lock_fd is not None else "reader",
+            "fallbacks": dict(_fallbacks),
+            "last_rebuild_s": (
+                round(_last_rebuild_s, 2) if _last_rebuild_s is not None else None
+            ),
+        }
+    try:
+        generation = _snapshot() if Config.VECTOR_INDEX_ENABLED else None
+    except OSError:
+        generation = None
+    if generation is not None:
+        count = generation.count
+        result.update(
+            generation=generation.number,
+            dtype=str(generation.vectors.dtype),
+            rows=count,
+            live=int(generation.rows["live"][:count].sum()),
+            capacity=len(generation.rows),
+            last_seq=int(generation.meta[_SEQ]),
+            lag_s=round(time.time() - int(generation.meta[_REFRESHED]) / 1000, 3),
+        )
+    return result
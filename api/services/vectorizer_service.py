@@ -0,0 +1,321 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from api.config import Config
+from api.database import get_cursor
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TABLE = "public.documents"
+
+# A configuração do vectorizer fica em ai.vectorizer.config (JSONB) e o
+# worker do pgai a relê a cada lote: mudar chunking/processing ali vale
+# para os próximos itens da fila sem recriar o vectorizer (o que apagaria a
+# tabela de embeddings e deixaria a busca vazia até o backfill terminar).
+# pending_items é a contagem exata da fila: ai.vectorizer_status usa
+# exact_count => false, que acima de 10 000 itens devolve um valor fixo e
+# tornaria a vazão do backfill inútil justamente nas cargas grandes.
+VECTORIZER_SQL = """
+    SELECT
+        v.id,
+        v.config,
+        format('%I.%I', v.queue_schema, v.queue_table) AS queue,
+        ai.vectorizer_queue_pending(v.id, exact_count => true) AS pending_items
+    FROM ai.vectorizer v
+    WHERE v.source_schema = 'public' AND v.source_table = 'documents'
+    ORDER BY v.id
+    LIMIT 1
+"""
+
+_lock = threading.Lock()
+# (instante, itens pendentes) de cada contagem da fila, para a vazão.
+_samples: deque[tuple[float, int]] = deque(maxlen=1000)
+_backfill: dict[str, Any] = {}
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def _load(cur) -> dict[str, Any]:
+    cur.execute(VECTORIZER_SQL)
+    row = cur.fetchone()
+    if row is None:
+        raise LookupError(
+            "Vectorizer não encontrado. Execute POST /api/system/setup primeiro."
+        )
+    return row
+
+
+def record(pending: int) -> None:
+    now = time.monotonic()
+    with _lock:
+        _samples.append((now, pending))
+        while _samples and now - _samples[0][0] > Config.VECTORIZER_THROUGHPUT_WINDOW:
+            _samples.popleft()
+
+
+def throughput(pending: int | None = None) -> dict[str, Any]:
+    # Vazão líquida da fila na janela: só as quedas de pending_items contam
+    # (entradas novas, inclusive a re-vetorização, aparecem como subidas e
+    # são ignoradas). As amostras vêm do sampler em segundo plano
+    # (VECTORIZER_SAMPLE_INTERVAL); com ele desligado, só das chamadas a
+    # GET /vectorizer, e a vazão passa a depender de quando elas ocorrem.
+    with _lock:
+        samples = list(_samples)
+        backfill = dict(_backfill)
+    if pending is None and samples:
+        pending = samples[-1][1]
+
+    rate = None
+    if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+        drained = sum(
+            max(0, before - after)
+            for (_, before), (_, after) in zip(samples, samples[1:])
+        )
+        rate = drained / (samples[-1][0] - samples[0][0])
+
+    result: dict[str, Any] = {
+        "items_per_second": round(rate, 2) if rate is not None else None,
+        "window_seconds": (
+            round(samples[-1][0] - samples[0][0], 1) if len(samples) >= 2 else 0
+        ),
+        "samples": len(samples),
+        "eta_seconds": round(pending / rate) if rate and pending else None,
+    }
+    if backfill:
+        result["backfill"] = backfill
+    return result
+
+
+def _describe(row: dict[str, Any]) -> dict[str, Any]:
+    config = row["config"] or {}
+    chunking = config.get("chunking") or {}
+    processing = config.get("processing") or {}
+    scheduling = config.get("scheduling") or {}
+    record(row["pending_items"])
+    return {
+        "id": row["id"],
+        "chunking": {
+            "implementation": chunking.get("implementation"),
+            "chunk_size": chunking.get("chunk_size"),
+            "chunk_overlap": chunking.get("chunk_overlap"),
+        },
+        "processing": {
+            "batch_size": processing.get("batch_size"),
+            "concurrency": processing.get("concurrency"),
+        },
+        "scheduling": {
+            "implementation": scheduling.get("implementation"),
+            "schedule_interval": scheduling.get("schedule_interval"),
+            # Sem agendamento no banco, quem dita o ritmo é o --poll-interval
+            # do worker (VECTORIZER_POLL_INTERVAL no docker-compose).
+            "worker_poll_interval": Config.VECTORIZER_POLL_INTERVAL,
+        },
+        "pending_items": row["pending_items"],
+        "throughput": throughput(row["pending_items"]),
+    }
+
+
+def get() -> dict[str, Any]:
+    with get_cursor() as cur:
+        return _describe(_load(cur))
+
+
+def _positive(name: str, value: int | None) -> None:
+    if value is not None and value < 1:
+        raise ValueError(f"{name} deve ser maior que zero")
+
+
+def _enqueue(cur, queue: str, after_id: int = 0, limit: int | None = None) -> dict:
+    # Documentos já na fila não são duplicados. Em lotes (after_id/limit)
+    # o chamador controla quanto trabalho entra de cada vez.
+    cur.execute(
+        f"""
+        WITH queued AS (
+            INSERT INTO {queue} (id)
+            SELECT d.id
+            FROM {SOURCE_TABLE} d
+            WHERE d.id > %(after_id)s
+              AND NOT EXISTS (SELECT 1 FROM {queue} q WHERE q.id = d.id)
+            ORDER BY d.id
+            LIMIT %(limit)s
+            RETURNING id
+        )
+        SELECT count(*) AS enqueued, max(id) AS last_id FROM queued
+        """,
+        {"after_id": after_id, "limit": limit},
+    )
+    return cur.fetchone()
+
+
+def _start_backfill(enqueued: int, pending: int, reason: str) -> None:
+    with _lock:
+        _backfill.clear()
+        _backfill.update(
+            reason=reason,
+            enqueued=enqueued,
+            pending_at_start=pending + enqueued,
+            started_at=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        )
+
+
+def update(
+    chunk_size: int | None = None,
+    chunk_overlap: int | None = None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    schedule_interval: str | None = None,
+    revectorize: bool = True,
+) -> dict[str, Any]:
+    for name, value in (
+        ("chunk_size", chunk_size),
+        ("batch_size", batch_size),
+        ("concurrency", concurrency),
+    ):
+        _positive(name, value)
+
+    with get_cursor() as cur:
+        row = _load(cur)
+        config = row["config"] or {}
+        current = config.get("chunking") or {}
+
+        chunking = {
+            key: value
+            for key, value in (
+                ("chunk_size", chunk_size),
+                ("chunk_overlap", chunk_overlap),
+            )
+            if value is not None
+        }
+        size = chunking.get("chunk_size", current.get("chunk_size"))
+        overlap = chunking.get("chunk_overlap", current.get("chunk_overlap"))
+        if overlap is not None and size is not None and not 0 <= overlap < size:
+            raise ValueError("chunk_overlap deve estar entre 0 e chunk_size - 1")
+        processing = {
+            key: value
+            for key, value in (("batch_size", batch_size), ("concurrency", concurrency))
+            if value is not None
+        }
+        scheduling = config.get("scheduling") or {}
+        if schedule_interval and scheduling.get("implementation") != "timescaledb":
+            raise ValueError(
+                "Vectorizer sem agendamento no banco: o intervalo é o "
+                "--poll-interval do worker (VECTORIZER_POLL_INTERVAL)"
+            )
+
+        cur.execute(
+            """
+            UPDATE ai.vectorizer
+            SET config = config
+                || jsonb_build_object(
+                    'chunking', config->'chunking' || %(chunking)s::jsonb,
+                    'processing',
+                    COALESCE(config->'processing', '{}'::jsonb)
+                        || %(processing)s::jsonb
+                )
+            WHERE id = %(id)s
+            """,
+            {
+                "id": row["id"],
+                "chunking": json.dumps(chunking),
+                "processing": json.dumps(processing),
+            },
+        )
+
+        if schedule_interval:
+            cur.execute(
+                "SELECT alter_job(%s, schedule_interval => %s::interval)",
+                (scheduling["job_id"], schedule_interval),
+            )
+            cur.execute(
+                """
+                UPDATE ai.vectorizer
+                SET config = jsonb_set(
+                    config, '{scheduling,schedule_interval}', to_jsonb(%s::text)
+                )
+                WHERE id = %s
+                """,
+                (schedule_interval, row["id"]),
+            )
+
+        # Chunking novo só se aplica ao que o worker processar daqui em
+        # diante; re-vetorizar enfileira todos os documentos na mesma
+        # transação da mudança. Cada documento tem os chunks antigos
+        # trocados pelos novos quando o worker chega nele, então a busca
+        # nunca fica sem resultados.
+        changed = any(current.get(key) != value for key, value in chunking.items())
+        enqueued = 0
+        if changed and revectorize:
+            enqueued = _enqueue(cur, row["queue"])["enqueued"]
+        row = _load(cur)
+
+    if enqueued:
+        _start_backfill(enqueued, row["pending_items"] - enqueued, "chunking")
+    logger.info(
+        "Vectorizer %s atualizado: chunking=%s processing=%s schedule=%s "
+        "(%d documentos re-enfileirados)",
+        row["id"],
+        chunking,
+        processing,
+        schedule_interval,
+        enqueued,
+    )
+    result = _describe(row)
+    result["enqueued"] = enqueued
+    result["chunking_changed"] = changed
+    return result
+
+
+def revectorize(after_id: int = 0, limit: int | None = None) -> dict[str, Any]:
+    _positive("limit", limit)
+    with get_cursor() as cur:
+        row = _load(cur)
+        queued = _enqueue(cur, row["queue"], after_id, limit)
+        pending = _load(cur)["pending_items"]
+
+    if queued["enqueued"]:
+        _start_backfill(queued["enqueued"], pending - queued["enqueued"], "manual")
+    record(pending)
+    return {
+        "enqueued": queued["enqueued"],
+        "last_id": queued["last_id"],
+        "pending_items": pending,
+    }
+
+
+def sample() -> None:
+    with get_cursor() as cur:
+        record(_load(cur)["pending_items"])
+
+
+def _loop() -> None:
+    while not _stop.wait(Config.VECTORIZER_SAMPLE_INTERVAL):
+        try:
+            sample()
+        except LookupError:
+            # /setup ainda não rodou.
+            continue
+        except Exception as e:
+            # Banco fora, pool esgotado ou ainda não iniciado: a thread
+            # continua e tenta de novo no próximo intervalo.
+            logger.warning("Amostra da fila do vectorizer falhou: %s", e)
+
+
+def start() -> None:
+    global _thread
+    if Config.VECTORIZER_SAMPLE_INTERVAL <= 0 or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="vectorizer-sampler", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
@@ -0,0 +1,181 @@
+"""Armazenamento, construção, latência e recall@k das representações compactas.
+
+Roda contra um banco já populado pelo benchmarks.corpus (descartável: as
+colunas geradas e os índices de cada modo ficam criados). Para cada modo
+(full, halfvec, binary, matryoshka) mede o tempo de ALTER TABLE + índice
+ANN, os bytes da coluna e do índice, a latência da busca (uma fase para
+full, duas fases para os compactos) e o recall@k contra o top-k exato por
+varredura sequencial no vetor completo.
+
+As consultas são vetores da própria tabela com ruído gaussiano. Com o
+corpus sintético (vetores aleatórios, sem estrutura Matryoshka) o recall do
+modo matryoshka é pessimista; use um banco com embeddings reais para
+decidir MATRYOSHKA_DIMENSIONS.
+
+    python -m benchmarks.compact_vectors --dsn "host=localhost user=postgres password=postgres"
+    python -m benchmarks.compact_vectors --dsn "$DSN" --modes binary --k 10 --queries 200
+"""
+
+import argparse
+import time
+from typing import Any
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from api.config import Config
+from api.database import Vector
+from api.services import compact_vectors, reranker
+from api.services.index_service import EMBEDDINGS_TABLE, apply_search_settings
+from api.services.search_service import TWO_PHASE_SQL, VECTOR_SQL
+from benchmarks import load
+
+EXACT_SQL = f"""
+    SELECT embedding_uuid
+    FROM {EMBEDDINGS_TABLE}
+    ORDER BY embedding <=> %(vector)s
+    LIMIT %(limit)s
+"""
+
+
+def _queries(cur, n: int, noise: float, seed: int) -> list[list[float]]:
+    cur.execute("SELECT setseed(%s)", (seed / 2**31,))
+    cur.execute(
+        f"""
+        SELECT vector_send(embedding) AS embedding
+        FROM {EMBEDDINGS_TABLE}
+        ORDER BY random()
+        LIMIT %s
+        """,
+        (n,),
+    )
+    base = reranker.decode_vectors([row["embedding"] for row in cur.fetchall()])
+    rng = np.random.default_rng(seed)
+    scale = noise * np.abs(base).mean()
+    return (base + scale * rng.normal(size=base.shape)).astype(np.float32).tolist()
+
+
+def _exact(conn, queries: list[list[float]], k: int) -> list[set[str]]:
+    truth = []
+    with conn.cursor() as cur:
+        for query in queries:
+            cur.execute("SET LOCAL enable_indexscan = off")
+            cur.execute(EXACT_SQL, {"vector": Vector(query), "limit": k})
+            truth.append({str(row["embedding_uuid"]) for row in cur.fetchall()})
+            conn.rollback()
+    return truth
+
+
+def _build(conn, mode: str) -> float | None:
+    if mode == "full":
+        return None
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(
+            "SET maintenance_work_mem = %s", (Config.ANN_MAINTENANCE_WORK_MEM or "1GB",)
+        )
+        compact_vectors.create_in_transaction(cur, [mode])
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def _search(conn, mode: str, query: list[float], k: int) -> tuple[float, set[str]]:
+    params: dict[str, Any] = {"vector": Vector(query), "limit": k, "max_distance": 2.0}
+    ef_search = None
+    sql = VECTOR_SQL
+    if mode != "full":
+        candidates = compact_vectors.candidates(k)
+        sql = TWO_PHASE_SQL.replace("{coarse}", compact_vectors.spec(mode)["distance"])
+        params["candidates"] = candidates
+        ef_search = min(1000, max(Config.HNSW_EF_SEARCH, candidates))
+    sql = sql.format(filter="TRUE")
+
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        apply_search_settings(cur, ef_search=ef_search)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+    conn.rollback()
+    return elapsed, {str(row["chunk_id"]) for row in rows}
+
+
+def run_mode(
+    conn, mode: str, queries: list[list[float]], truth: list[set[str]], k: int
+) -> dict[str, Any]:
+    build_seconds = _build(conn, mode)
+    for query in queries[:5]:
+        _search(conn, mode, query, k)
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        elapsed, found = _search(conn, mode, query, k)
+        latencies.append(elapsed)
+        recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "build_seconds": round(build_seconds, 2) if build_seconds is not None else None,
+        "candidates": compact_vectors.candidates(k) if mode != "full" else k,
+        "latency_ms": {
+            "p50": round(load.percentile(latencies, 50), 3),
+            "p95": round(load.percentile(latencies, 95), 3),
+            "p99": round(load.percentile(latencies, 99), 3),
+        },
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="DSN do banco do corpus")
+    parser.add_argument(
+        "--modes",
+        default=",".join(("full",) + compact_vectors.MODES),
+        help="Lista de modos a medir",
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--noise", type=float, default=0.3, help="Ruído relativo das consultas"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    for mode in modes:
+        if mode != "full":
+            compact_vectors.spec(mode)
+
+    conn = psycopg2.connect(args.dsn, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cur:
+            queries = _queries(cur, args.queries, args.noise, args.seed)
+        conn.rollback()
+        truth = _exact(conn, queries, args.k)
+        results = [run_mode(conn, mode, queries, truth, args.k) for mode in modes]
+        with conn.cursor() as cur:
+            storage = compact_vectors.storage_in_transaction(cur)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    load.write_report(
+        {
+            "commit": load.git_commit(),
+            "k": args.k,
+            "queries": len(queries),
+            "matryoshka_dimensions": Config.MATRYOSHKA_DIMENSIONS,
+            "candidate_factor": Config.COMPACT_CANDIDATE_FACTOR,
+            "storage": storage,
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
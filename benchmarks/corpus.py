@@ -0,0 +1,251 @@
+"""Corpus sintético para benchmarks: documentos, chunks e embeddings.
+
+Cria em um Postgres com pgvector (sem pgai) o mesmo esquema que o setup da
+API produz — documents, documents_embeddings_store no formato da tabela de
+destino do vectorizer, índice ANN, índices de metadados e cache de
+respostas — e o preenche com N chunks gerados no próprio banco, de forma
+reproduzível (setseed).
+
+    python -m benchmarks.corpus --dsn "host=localhost dbname=rag_bench user=postgres password=postgres" --size 10k
+
+Os vetores são aleatórios: servem para medir custo de busca e de índice,
+não qualidade de recuperação.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from api.config import Config
+from api.services import (
+    answer_cache,
+    index_service,
+    metadata_filter,
+    rag_jobs,
+    vector_index,
+)
+
+logger = logging.getLogger(__name__)
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CHUNKS_PER_DOCUMENT = 4
+WORDS_PER_CHUNK = 40
+PROJECTS = 10
+
+VOCABULARY = (
+    "postgres pgvector index vector embedding search query latency cache "
+    "model token prompt context document chunk retrieval ranking hybrid "
+    "lexical semantic cosine distance cluster graph layer probe list build "
+    "memory disk page buffer tuple scan filter join plan cost planner "
+    "worker queue batch stream throughput pool connection timeout retry "
+    "server client request response network python flask api endpoint "
+    "metric histogram percentile benchmark profile trace span sample "
+    "data table column row schema type json metadata source project date "
+    "history science music language city river mountain ocean planet "
+    "energy physics chemistry biology economy market finance health "
+    "medicine education school library book author poem novel theatre"
+).split()
+
+
+def create_schema(cur, dimensions: int) -> None:
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            metadata JSONB DEFAULT '{}'::jsonb,
+            idempotency_key TEXT
+        )
+        """)
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS documents_idempotency_key_idx
+        ON documents (idempotency_key)
+        """)
+    cur.execute(
+        """
+        ALTER TABLE documents
+        ADD COLUMN IF NOT EXISTS search_tsv tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector(%s::regconfig, title || ' ' || content)
+        ) STORED
+        """,
+        (Config.HYBRID_TS_CONFIG,),
+    )
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS documents_search_tsv_idx
+        ON documents USING gin (search_tsv)
+        """)
+    # Mesmo formato da tabela de destino criada pelo pgai.
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {index_service.EMBEDDINGS_TABLE} (
+            embedding_uuid UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+            chunk_seq INTEGER NOT NULL,
+            chunk TEXT NOT NULL,
+            embedding vector({dimensions}) NOT NULL,
+            UNIQUE (id, chunk_seq)
+        )
+        """)
+    metadata_filter.create_indexes(cur)
+    answer_cache.create_table(cur)
+    rag_jobs.create_table(cur)
+
+
+def _insert_batch(cur, first_doc: int, documents: int, dimensions: int) -> None:
+    # Um único statement por lote: os documentos inseridos alimentam os
+    # chunks via RETURNING. As subqueries referenciam a linha externa para
+    # que o Postgres as reavalie por linha (senão seriam um InitPlan único).
+    cur.execute(
+        f"""
+        WITH docs AS (
+            INSERT INTO documents (title, content, metadata)
+            SELECT
+                'Synthetic document ' || d,
+                array_to_string(
+                    ARRAY(
+                        SELECT (%(vocabulary)s::text[])[
+                            1 + floor(random() * %(vocabulary_size)s)::int
+                        ]
+                        FROM generate_series(1, %(words)s * %(chunks)s)
+                        WHERE d IS NOT NULL
+                    ),
+                    ' '
+                ),
+                jsonb_build_object(
+                    'source', 'synthetic',
+                    'project', 'project-' || (d %% %(projects)s),
+                    'date', to_char(date '2020-01-01' + (d %% 1500), 'YYYY-MM-DD')
+                )
+            FROM generate_series(%(first)s, %(last)s) d
+            RETURNING id, content
+        )
+        INSERT INTO {index_service.EMBEDDINGS_TABLE} (id, chunk_seq, chunk, embedding)
+        SELECT
+            docs.id,
+            seq,
+            array_to_string(
+                (regexp_split_to_array(docs.content, ' '))[
+                    seq * %(words)s + 1 : (seq + 1) * %(words)s
+                ],
+                ' '
+            ),
+            (
+                SELECT array_agg(random()::real - 0.5)::vector({dimensions})
+                FROM generate_series(1, {dimensions})
+                WHERE seq IS NOT NULL AND docs.id IS NOT NULL
+            )
+        FROM docs
+        CROSS JOIN generate_series(0, %(chunks)s - 1) seq
+        """,
+        {
+            "vocabulary": list(VOCABULARY),
+            "vocabulary_size": len(VOCABULARY),
+            "words": WORDS_PER_CHUNK,
+            "chunks": CHUNKS_PER_DOCUMENT,
+            "projects": PROJECTS,
+            "first": first_doc,
+            "last": first_doc + documents - 1,
+        },
+    )
+
+
+def seed(
+    dsn: str,
+    chunks: int,
+    dimensions: int | None = None,
+    batch_chunks: int = 20_000,
+    seed_value: float = 0.42,
+    maintenance_work_mem: str = "1GB",
+) -> dict:
+    dimensions = dimensions or Config.EMBEDDING_DIMENSIONS
+    documents = max(1, chunks // CHUNKS_PER_DOCUMENT)
+    per_batch = max(1, batch_chunks // CHUNKS_PER_DOCUMENT)
+    report = {"chunks": documents * CHUNKS_PER_DOCUMENT, "documents": documents}
+
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cur:
+            create_schema(cur, dimensions)
+            cur.execute(
+                f"SELECT count(*) AS total FROM {index_service.EMBEDDINGS_TABLE}"
+            )
+            if cur.fetchone()["total"]:
+                raise RuntimeError("O banco já tem chunks; use um banco descartável")
+            conn.commit()
+
+            started = time.perf_counter()
+            cur.execute("SELECT setseed(%s)", (seed_value,))
+            done = 0
+            while done < documents:
+                size = min(per_batch, documents - done)
+                _insert_batch(cur, done + 1, size, dimensions)
+                conn.commit()
+                done += size
+                logger.info(
+                    "%d/%d documentos (%d chunks)",
+                    done,
+                    documents,
+                    done * CHUNKS_PER_DOCUMENT,
+                )
+            report["load_seconds"] = round(time.perf_counter() - started, 1)
+            # Depois da carga: o snapshot inicial lê a tabela inteira, o log
+            # só precisa das mudanças feitas pela API durante o benchmark.
+            vector_index.create_change_log(cur)
+
+            cur.execute(f"ANALYZE documents, {index_service.EMBEDDINGS_TABLE}")
+            started = time.perf_counter()
+            cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+            index_service.create_index_in_transaction(cur)
+            conn.commit()
+            report["index_seconds"] = round(time.perf_counter() - started, 1)
+            report["index_method"] = Config.ANN_INDEX_METHOD
+
+            cur.execute(f"""
+                SELECT pg_total_relation_size('{index_service.EMBEDDINGS_TABLE}')
+                    AS table_bytes
+                """)
+            report["table_bytes"] = cur.fetchone()["table_bytes"]
+    finally:
+        conn.close()
+
+    return report
+
+
+def parse_size(value: str) -> int:
+    value = value.lower()
+    return SIZES[value] if value in SIZES else int(value)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="DSN de um banco descartável")
+    parser.add_argument(
+        "--size", default="10k", help="10k, 100k, 1m ou um número de chunks"
+    )
+    parser.add_argument("--dimensions", type=int, default=Config.EMBEDDING_DIMENSIONS)
+    parser.add_argument("--batch-chunks", type=int, default=20_000)
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    args = parser.parse_args()
+
+    report = seed(
+        args.dsn,
+        parse_size(args.size),
+        dimensions=args.dimensions,
+        batch_chunks=args.batch_chunks,
+        maintenance_work_mem=args.maintenance_work_mem,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
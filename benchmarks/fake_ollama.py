@@ -0,0 +1,211 @@
+"""Servidor Ollama falso para benchmarks.
+
+Implementa /api/embed, /api/generate e /api/chat (com e sem stream) e
+/api/tags com embeddings determinísticos (o mesmo texto gera sempre o mesmo
+vetor normalizado) e geração com latência até o primeiro token e taxa de
+tokens configuráveis, para medir a API sem depender de GPU nem do modelo
+real.
+
+    python -m benchmarks.fake_ollama --port 11435
+    python -m benchmarks.fake_ollama --latency 0.2 --tokens-per-second 40 --tokens 120
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+WORDS = (
+    "the answer depends on the documents provided and the context retrieved "
+    "from the knowledge base according to document one"
+).split()
+
+
+def embedding(text: str, dimensions: int) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    values = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta, como o Ollama real, para que o pool
+    # de conexões do cliente seja exercitado.
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, payload: dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            models = [self.server.embedding_model, self.server.llm_model]
+            self._send_json({"models": [{"name": name} for name in models]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self) -> None:
+        try:
+            payload = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, 400)
+            return
+
+        if self.path == "/api/embed":
+            self._embed(payload)
+        elif self.path == "/api/generate":
+            self._generate(payload)
+        elif self.path == "/api/chat":
+            self._generate(payload, chat=True)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _embed(self, payload: dict[str, Any]) -> None:
+        texts = payload.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        dimensions = self.server.dimensions
+        self._send_json(
+            {
+                "model": payload.get("model"),
+                "embeddings": [embedding(text, dimensions) for text in texts],
+            }
+        )
+
+    def _tokens(self, prompt: str) -> list[str]:
+        rng = random.Random(prompt)
+        return [rng.choice(WORDS) + " " for _ in range(self.server.tokens)]
+
+    def _generate(self, payload: dict[str, Any], chat: bool = False) -> None:
+        server = self.server
+        started = time.perf_counter_ns()
+        if chat:
+            prompt = "\n".join(m.get("content", "") for m in payload["messages"])
+        else:
+            prompt = payload.get("prompt", "")
+
+        def output(text: str) -> dict[str, Any]:
+            if chat:
+                return {"message": {"role": "assistant", "content": text}}
+            return {"response": text}
+
+        tokens = self._tokens(prompt)
+        interval = 1.0 / server.tokens_per_second if server.tokens_per_second else 0
+
+        time.sleep(server.latency)
+        prompt_eval_ns = time.perf_counter_ns() - started
+
+        def stats(eval_ns: int) -> dict[str, Any]:
+            return {
+                "model": payload.get("model"),
+                "done": True,
+                "total_duration": time.perf_counter_ns() - started,
+                "load_duration": 0,
+                "prompt_eval_count": len(prompt.split()),
+                "prompt_eval_duration": prompt_eval_ns,
+                "eval_count": len(tokens),
+                "eval_duration": eval_ns,
+            }
+
+        if not payload.get("stream", True):
+            time.sleep(interval * len(tokens))
+            eval_ns = time.perf_counter_ns() - started - prompt_eval_ns
+            self._send_json({**output("".join(tokens)), **stats(eval_ns)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data: dict[str, Any]) -> None:
+            line = (json.dumps(data) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            for token in tokens:
+                write_chunk({"model": payload.get("model"), **output(token)})
+                time.sleep(interval)
+            eval_ns = time.perf_counter_ns() - started - prompt_eval_ns
+            write_chunk({**output(""), **stats(eval_ns)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desconectou: o Ollama real também abandona a geração.
+            self.close_connection = True
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 11435,
+    dimensions: int = 768,
+    latency: float = 0.05,
+    tokens_per_second: float = 200.0,
+    tokens: int = 64,
+    embedding_model: str = "nomic-embed-text",
+    llm_model: str = "llama3.2",
+    verbose: bool = False,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.dimensions = dimensions
+    server.latency = latency
+    server.tokens_per_second = tokens_per_second
+    server.tokens = tokens
+    server.embedding_model = embedding_model
+    server.llm_model = llm_model
+    server.verbose = verbose
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Segundos até o 1º token"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=64, help="Tokens por resposta")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = serve(
+        host=args.host,
+        port=args.port,
+        dimensions=args.dimensions,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        tokens=args.tokens,
+        verbose=args.verbose,
+    )
+    print(f"Fake Ollama em http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
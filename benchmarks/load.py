@@ -0,0 +1,244 @@
+"""Gerador de carga para /api/search, /api/rag e /api/documents.
+
+Cada cenário roda por um tempo fixo em cada nível de concorrência (uma
+thread por cliente, cada uma com sua sessão HTTP e consultas geradas por
+uma semente fixa) e o relatório em JSON traz p50/p95/p99, média, máximo,
+erros e vazão, junto com o commit, para comparar execuções.
+
+    python -m benchmarks.load --url http://localhost:5000 --concurrency 1,8,32
+    python -m benchmarks.load --scenarios search,search_hybrid --duration 30 --output bench.json
+"""
+
+import argparse
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import requests
+
+from benchmarks.corpus import VOCABULARY
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _question(rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(3, 6)))
+
+
+def _search(session, url, rng):
+    return session.get(f"{url}/api/search/", params={"q": _question(rng), "limit": 5})
+
+
+def _search_hybrid(session, url, rng):
+    return session.get(
+        f"{url}/api/search/",
+        params={"q": _question(rng), "limit": 5, "mode": "hybrid"},
+    )
+
+
+def _rag(session, url, rng):
+    return session.post(
+        f"{url}/api/rag/", json={"question": _question(rng), "max_chunks": 5}
+    )
+
+
+def _documents(session, url, rng):
+    return session.get(
+        f"{url}/api/documents/",
+        params={"after_id": rng.randint(0, 1000), "limit": 50},
+    )
+
+
+SCENARIOS: dict[str, Callable[[requests.Session, str, random.Random], Any]] = {
+    "search": _search,
+    "search_hybrid": _search_hybrid,
+    "rag": _rag,
+    "documents": _documents,
+}
+
+
+def percentile(sorted_values: list[float], p: float) -> float | None:
+    # Nearest-rank: sempre um valor observado.
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_level(
+    url: str,
+    scenario: str,
+    concurrency: int,
+    duration: float,
+    warmup: float = 2.0,
+    seed: int = 42,
+) -> dict[str, Any]:
+    call = SCENARIOS[scenario]
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    lock = threading.Lock()
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(f"{seed}:{scenario}:{index}")
+        session = requests.Session()
+        local: list[float] = []
+        local_errors: dict[str, int] = {}
+        try:
+            while True:
+                started = time.perf_counter()
+                if started >= stop_at:
+                    break
+                try:
+                    response = call(session, url, rng)
+                    error = None if response.ok else str(response.status_code)
+                except requests.RequestException as e:
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - started
+                # Requisições do aquecimento (ou que terminam depois do
+                # prazo) não entram na amostra.
+                if started < start_at or started + elapsed > stop_at:
+                    continue
+                if error:
+                    local_errors[error] = local_errors.get(error, 0) + 1
+                else:
+                    local.append(elapsed * 1000)
+        finally:
+            session.close()
+        with lock:
+            latencies.extend(local)
+            for key, count in local_errors.items():
+                errors[key] = errors.get(key, 0) + count
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests": completed,
+        "errors": errors,
+        "throughput_rps": round(completed / duration, 2),
+        "latency_ms": {
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "mean": _round(sum(latencies) / completed if completed else None),
+            "max": _round(latencies[-1] if latencies else None),
+        },
+    }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    url: str,
+    scenarios: list[str],
+    concurrency: list[int],
+    duration: float,
+    warmup: float = 2.0,
+    seed: int = 42,
+) -> dict[str, Any]:
+    results = []
+    for scenario in scenarios:
+        for level in concurrency:
+            result = run_level(url, scenario, level, duration, warmup, seed)
+            print(
+                f"{scenario:>14} c={level:<4} {result['throughput_rps']:>8} req/s "
+                f"p50={result['latency_ms']['p50']}ms "
+                f"p99={result['latency_ms']['p99']}ms "
+                f"errors={sum(result['errors'].values())}",
+                file=sys.stderr,
+            )
+            results.append(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "url": url,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def _csv_ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _csv_scenarios(value: str) -> list[str]:
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"cenários desconhecidos: {sorted(unknown)}")
+    return names
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--scenarios",
+        type=_csv_scenarios,
+        default=["search", "rag", "documents"],
+        help=f"Lista separada por vírgula: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--concurrency", type=_csv_ints, default=[1, 8, 32])
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="Segundos por nível"
+    )
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+
+
+def write_report(report: dict[str, Any], output: str | None) -> None:
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(
+        args.url.rstrip("/"),
+        args.scenarios,
+        args.concurrency,
+        args.duration,
+        args.warmup,
+        args.seed,
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Latência fria/quente do LLM e reaproveitamento do prefixo do prompt.
+
+Contra um Ollama real, mede:
+
+- fria: modelo descarregado (keep_alive=0) antes da requisição, como após um
+  deploy ou um período ocioso; quente: a mesma requisição logo em seguida;
+- prompt único via /api/generate (formato anterior, instruções + documentos +
+  pergunta num só texto) contra mensagens system + user via /api/chat
+  (formato atual), em perguntas diferentes sobre os mesmos documentos:
+  prompt_eval_count/prompt_eval_duration mostram quanto do prefixo o Ollama
+  deixou de reavaliar.
+
+    python -m benchmarks.ollama_warmup --host http://localhost:11434 --model llama3.2
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from api.services import context_packer
+from api.services.ollama_client import GENERATION_OPTIONS
+from api.services.rag_service import SYSTEM_PROMPT, _build_messages
+from benchmarks import load
+
+DOCUMENTS = [
+    {
+        "title": "PostgreSQL",
+        "text": (
+            "PostgreSQL is a free and open-source relational database management "
+            "system emphasizing extensibility and SQL compliance. It supports "
+            "transactions with ACID properties, views, triggers and stored "
+            "procedures, and extensions such as pgvector add vector similarity "
+            "search with HNSW and IVFFlat indexes."
+        ),
+    },
+    {
+        "title": "Ollama",
+        "text": (
+            "Ollama runs large language models locally. Models are loaded into "
+            "memory on the first request and unloaded after keep_alive expires; "
+            "the prompt is evaluated before generation starts, and a cached "
+            "prefix can be reused between requests in the same slot."
+        ),
+    },
+]
+
+QUESTIONS = [
+    "What is PostgreSQL?",
+    "Which index types does pgvector provide?",
+    "When does Ollama unload a model?",
+    "What does ACID mean for PostgreSQL transactions?",
+    "How does Ollama reuse a cached prompt prefix?",
+    "Is PostgreSQL open source?",
+]
+
+
+def _legacy_prompt(question: str) -> str:
+    context = "\n\n".join(
+        context_packer.document_header(i, d["title"]) + d["text"]
+        for i, d in enumerate(DOCUMENTS, 1)
+    )
+    return (
+        SYSTEM_PROMPT.replace("provided by the user", "provided below")
+        + f"\n\nDOCUMENTS:\n{context}\n\nQUESTION: {question}\n\nANSWER:"
+    )
+
+
+def _call(host: str, path: str, payload: dict) -> dict:
+    started = time.perf_counter()
+    response = requests.post(f"{host}{path}", json=payload, timeout=600)
+    response.raise_for_status()
+    data = response.json()
+    return {
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "load_ms": round(data.get("load_duration", 0) / 1e6, 1),
+        "prompt_eval_count": data.get("prompt_eval_count"),
+        "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 1),
+        "eval_count": data.get("eval_count"),
+    }
+
+
+def _chat(host: str, model: str, question: str, num_predict: int) -> dict:
+    return _call(
+        host,
+        "/api/chat",
+        {
+            "model": model,
+            "messages": _build_messages(question, DOCUMENTS),
+            "options": {**GENERATION_OPTIONS, "num_predict": num_predict},
+            "stream": False,
+            "keep_alive": "10m",
+        },
+    )
+
+
+def _generate(host: str, model: str, question: str, num_predict: int) -> dict:
+    return _call(
+        host,
+        "/api/generate",
+        {
+            "model": model,
+            "prompt": _legacy_prompt(question),
+            "options": {**GENERATION_OPTIONS, "num_predict": num_predict},
+            "stream": False,
+            "keep_alive": "10m",
+        },
+    )
+
+
+def _unload(host: str, model: str) -> None:
+    requests.post(
+        f"{host}/api/generate", json={"model": model, "keep_alive": 0}, timeout=60
+    ).raise_for_status()
+    time.sleep(1)
+
+
+def _summary(samples: list[dict]) -> dict:
+    # A primeira amostra de cada formato preenche o cache; o resumo usa as
+    # seguintes, que são as que podem reaproveitar o prefixo.
+    reused = samples[1:] or samples
+    return {
+        "prompt_eval_count_mean": statistics.mean(
+            s["prompt_eval_count"] or 0 for s in reused
+        ),
+        "prompt_eval_ms_p50": statistics.median(s["prompt_eval_ms"] for s in reused),
+        "total_ms_p50": statistics.median(s["total_ms"] for s in reused),
+        "samples": samples,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="http://localhost:11434")
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--num-predict", type=int, default=32)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    host = args.host.rstrip("/")
+
+    _unload(host, args.model)
+    cold = _chat(host, args.model, QUESTIONS[0], args.num_predict)
+    warm = _chat(host, args.model, QUESTIONS[0], args.num_predict)
+
+    # Cada formato começa com o modelo recém-carregado, sem cache do outro.
+    _unload(host, args.model)
+    legacy = [_generate(host, args.model, q, args.num_predict) for q in QUESTIONS]
+    _unload(host, args.model)
+    chat = [_chat(host, args.model, q, args.num_predict) for q in QUESTIONS]
+
+    report = {
+        "commit": load.git_commit(),
+        "model": args.model,
+        "cold": cold,
+        "warm": warm,
+        "cold_penalty_ms": round(cold["total_ms"] - warm["total_ms"], 1),
+        "legacy_generate_prompt": _summary(legacy),
+        "chat_system_prefix": _summary(chat),
+    }
+    load.write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Microbenchmark do rerank (MMR + score léxico) sobre candidatos sintéticos.
+
+Gera conjuntos de candidatos em grupos de quase-duplicatas (como vários
+chunks vizinhos de um mesmo artigo), codifica os vetores no formato binário
+do vector_send e mede, por repetição, a decodificação e o rerank. O
+relatório traz p50/p95/p99 em ms e quantos grupos distintos aparecem no
+top-k com e sem MMR.
+
+    python -m benchmarks.rerank --candidates 200 --k 5,20
+    python -m benchmarks.rerank --candidates 200,1000 --repeat 2000 --output rerank.json
+"""
+
+import argparse
+import struct
+import time
+from typing import Any
+
+import numpy as np
+
+from api.config import Config
+from api.services import reranker
+from benchmarks import load
+
+BUDGET_MS = 2.0
+
+
+def _candidates(
+    rng: np.random.Generator, n: int, dimensions: int, group_size: int
+) -> tuple[np.ndarray, np.ndarray, list[bytes], np.ndarray]:
+    groups = max(1, n // group_size)
+    centers = rng.normal(size=(groups, dimensions)).astype(np.float32)
+    labels = np.arange(n) % groups
+    vectors = centers[labels] + 0.05 * rng.normal(size=(n, dimensions)).astype(
+        np.float32
+    )
+    query = centers[0] + 0.8 * centers[1 % groups]
+    header = struct.pack(">hh", dimensions, 0)
+    wire = [header + v.astype(">f4").tobytes() for v in vectors]
+    return query, labels, wire, rng.random(n).astype(np.float32)
+
+
+def _stats(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": round(load.percentile(samples, 50), 4),
+        "p95": round(load.percentile(samples, 95), 4),
+        "p99": round(load.percentile(samples, 99), 4),
+        "max": round(samples[-1], 4),
+    }
+
+
+def run_case(
+    n: int,
+    k: int,
+    dimensions: int,
+    repeat: int,
+    diversity_lambda: float,
+    lexical_weight: float,
+    group_size: int,
+    seed: int,
+) -> dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    query, labels, wire, lexical = _candidates(rng, n, dimensions, group_size)
+
+    decode_ms, rerank_ms = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        vectors = reranker.decode_vectors(wire)
+        decoded = time.perf_counter()
+        order = reranker.rerank(
+            query, vectors, k, diversity_lambda, lexical, lexical_weight
+        )
+        finished = time.perf_counter()
+        decode_ms.append((decoded - started) * 1000)
+        rerank_ms.append((finished - decoded) * 1000)
+
+    plain = reranker.rerank(query, vectors, k, 1.0)
+    rerank = _stats(rerank_ms)
+    return {
+        "candidates": n,
+        "k": k,
+        "dimensions": dimensions,
+        "decode_ms": _stats(decode_ms),
+        "rerank_ms": rerank,
+        "within_budget": rerank["p99"] < BUDGET_MS,
+        "distinct_groups_top_k": {
+            "relevance_only": len(set(labels[plain].tolist())),
+            "mmr": len(set(labels[order].tolist())),
+        },
+    }
+
+
+def _csv_ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=_csv_ints, default=[50, 200, 1000])
+    parser.add_argument("--k", type=_csv_ints, default=[5, 20])
+    parser.add_argument("--dimensions", type=int, default=Config.EMBEDDING_DIMENSIONS)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--mmr-lambda", type=float, default=Config.RERANK_MMR_LAMBDA)
+    parser.add_argument("--lexical-weight", type=float, default=0.3)
+    parser.add_argument(
+        "--group-size", type=int, default=8, help="Quase-duplicatas por grupo"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    results = [
+        run_case(
+            n,
+            k,
+            args.dimensions,
+            args.repeat,
+            args.mmr_lambda,
+            args.lexical_weight,
+            args.group_size,
+            args.seed,
+        )
+        for n in args.candidates
+        for k in args.k
+    ]
+    load.write_report(
+        {
+            "commit": load.git_commit(),
+            "numpy": np.__version__,
+            "budget_ms": BUDGET_MS,
+            "mmr_lambda": args.mmr_lambda,
+            "lexical_weight": args.lexical_weight,
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
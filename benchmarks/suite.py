@@ -0,0 +1,232 @@
+"""Benchmark ponta a ponta: Postgres descartável + Ollama falso + API + carga.
+
+1. Sobe um Postgres com pgvector descartável (container Docker, ou um banco
+   novo criado e removido num servidor indicado por --dsn).
+2. Gera o corpus sintético (benchmarks.corpus) do tamanho pedido.
+3. Sobe o Ollama falso (benchmarks.fake_ollama) e a API apontando para os
+   dois, cada um em seu próprio processo.
+4. Roda o gerador de carga (benchmarks.load) e grava o relatório JSON, com
+   os parâmetros do corpus e do Ollama falso, para comparar entre commits.
+
+    python -m benchmarks.suite --size 10k --output bench-10k.json
+    python -m benchmarks.suite --size 100k --dsn "host=localhost user=postgres password=postgres"
+"""
+
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import psycopg2
+import requests
+from psycopg2.extensions import make_dsn, parse_dsn
+
+from benchmarks import corpus, load
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+POSTGRES_IMAGE = "pgvector/pgvector:pg17"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait(check, what: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{what} não ficou pronto em {timeout:.0f}s")
+        time.sleep(0.5)
+
+
+def _can_connect(dsn: str) -> bool:
+    psycopg2.connect(dsn, connect_timeout=2).close()
+    return True
+
+
+@contextmanager
+def docker_postgres(image: str = POSTGRES_IMAGE) -> Iterator[str]:
+    port = _free_port()
+    name = f"rag-bench-{uuid.uuid4().hex[:8]}"
+    subprocess.run(
+        [
+            "docker",
+            "run",
+            "-d",
+            "--rm",
+            "--name",
+            name,
+            "-e",
+            "POSTGRES_PASSWORD=postgres",
+            "-p",
+            f"127.0.0.1:{port}:5432",
+            image,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    dsn = make_dsn(
+        host="127.0.0.1",
+        port=port,
+        dbname="postgres",
+        user="postgres",
+        password="postgres",
+    )
+    try:
+        _wait(lambda: _can_connect(dsn), "Postgres", timeout=120)
+        yield dsn
+    finally:
+        subprocess.run(["docker", "stop", name], capture_output=True)
+
+
+@contextmanager
+def throwaway_database(dsn: str) -> Iterator[str]:
+    name = f"rag_bench_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"CREATE DATABASE {name}")
+        yield make_dsn(dsn, dbname=name)
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        admin.close()
+
+
+@contextmanager
+def process(args: list[str], env: dict[str, str], ready, what: str) -> Iterator[None]:
+    proc = subprocess.Popen(args, cwd=ROOT_DIR, env={**os.environ, **env})
+    try:
+        _wait(lambda: proc.poll() is None and ready(), what)
+        yield
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _http_ok(url: str) -> bool:
+    return requests.get(url, timeout=2).ok
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m ou nº de chunks")
+    parser.add_argument(
+        "--dsn",
+        help="Servidor Postgres com pgvector onde criar um banco descartável "
+        "(padrão: container Docker)",
+    )
+    parser.add_argument("--image", default=POSTGRES_IMAGE)
+    parser.add_argument("--ollama-latency", type=float, default=0.05)
+    parser.add_argument("--ollama-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--ollama-tokens", type=int, default=64)
+    load.add_arguments(parser)
+    args = parser.parse_args()
+
+    chunks = corpus.parse_size(args.size)
+    with ExitStack() as stack:
+        if args.dsn:
+            dsn = stack.enter_context(throwaway_database(args.dsn))
+        else:
+            dsn = stack.enter_context(docker_postgres(args.image))
+
+        logger.info("Gerando corpus de %d chunks", chunks)
+        corpus_report = corpus.seed(dsn, chunks)
+
+        ollama_port = _free_port()
+        stack.enter_context(
+            process(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.fake_ollama",
+                    "--port",
+                    str(ollama_port),
+                    "--dimensions",
+                    str(corpus.Config.EMBEDDING_DIMENSIONS),
+                    "--latency",
+                    str(args.ollama_latency),
+                    "--tokens-per-second",
+                    str(args.ollama_tokens_per_second),
+                    "--tokens",
+                    str(args.ollama_tokens),
+                ],
+                {},
+                lambda: _http_ok(f"http://127.0.0.1:{ollama_port}/api/tags"),
+                "Ollama falso",
+            )
+        )
+
+        db = parse_dsn(dsn)
+        api_port = _free_port()
+        api_url = f"http://127.0.0.1:{api_port}"
+        stack.enter_context(
+            process(
+                [
+                    sys.executable,
+                    "-m",
+                    "flask",
+                    "--app",
+                    "api.app:create_app",
+                    "run",
+                    "--no-reload",
+                    "--with-threads",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(api_port),
+                ],
+                {
+                    "DB_HOST": db.get("host", "localhost"),
+                    "DB_PORT": str(db.get("port", "5432")),
+                    "DB_NAME": db["dbname"],
+                    "DB_USER": db.get("user", "postgres"),
+                    "DB_PASSWORD": db.get("password", ""),
+                    "OLLAMA_HOST": f"http://127.0.0.1:{ollama_port}",
+                },
+                lambda: _http_ok(f"{api_url}/api/system/health"),
+                "API",
+            )
+        )
+
+        report = load.run(
+            api_url,
+            args.scenarios,
+            args.concurrency,
+            args.duration,
+            args.warmup,
+            args.seed,
+        )
+
+    report["corpus"] = corpus_report
+    report["fake_ollama"] = {
+        "latency_s": args.ollama_latency,
+        "tokens_per_second": args.ollama_tokens_per_second,
+        "tokens": args.ollama_tokens,
+    }
+    load.write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
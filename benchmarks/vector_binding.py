@@ -0,0 +1,160 @@
+"""Micro-benchmark: literal do vetor de consulta em semantic_search.
+
+Compara o caminho antigo (f-string por elemento, literal enviado e parseado
+duas vezes, distância calculada no SELECT e no WHERE) com o atual
+(api.database.Vector: template por dimensão, literal único, distância
+calculada uma vez numa subquery).
+
+    python -m benchmarks.vector_binding
+    python -m benchmarks.vector_binding --dsn "host=localhost user=postgres password=postgres"
+
+Sem --dsn mede só o lado Python. Com --dsn cria uma tabela temporária com
+vetores aleatórios e mede Planning/Execution Time via EXPLAIN ANALYZE.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psycopg2
+from psycopg2.extensions import adapt
+
+from api.database import Vector
+
+OLD_SQL = """
+    SELECT id, embedding <=> (%s)::vector AS distance
+    FROM bench_vectors
+    WHERE embedding <=> (%s)::vector <= %s
+    ORDER BY distance
+    LIMIT %s
+"""
+
+NEW_SQL = """
+    SELECT id, distance
+    FROM (
+        SELECT id, embedding <=> %s AS distance
+        FROM bench_vectors
+        ORDER BY distance
+        LIMIT %s
+    ) nn
+    WHERE distance <= %s
+    ORDER BY distance
+"""
+
+
+def _old_params(embedding: list[float], max_distance: float, limit: int) -> bytes:
+    literal = "[" + ",".join(f"{x:.8f}" for x in embedding) + "]"
+    return b",".join(
+        [
+            adapt(literal).getquoted(),
+            adapt(literal).getquoted(),
+            adapt(max_distance).getquoted(),
+            adapt(limit).getquoted(),
+        ]
+    )
+
+
+def _new_params(embedding: list[float], max_distance: float, limit: int) -> bytes:
+    return b",".join(
+        [
+            adapt(Vector(embedding)).getquoted(),
+            adapt(limit).getquoted(),
+            adapt(max_distance).getquoted(),
+        ]
+    )
+
+
+def bench_python(dimensions: int, number: int) -> dict:
+    embedding = [random.gauss(0, 0.05) for _ in range(dimensions)]
+    result = {}
+    for name, fn in (("old", _old_params), ("new", _new_params)):
+        seconds = timeit.timeit(lambda: fn(embedding, 1.5, 5), number=number)
+        result[name] = {
+            "us_per_query": round(seconds / number * 1e6, 1),
+            "param_bytes": len(fn(embedding, 1.5, 5)),
+        }
+    result["speedup"] = round(
+        result["old"]["us_per_query"] / result["new"]["us_per_query"], 2
+    )
+    return result
+
+
+def _explain(cur, sql: str, params: tuple) -> tuple[float, float]:
+    cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]
+    return plan["Planning Time"], plan["Execution Time"]
+
+
+def bench_database(dsn: str, dimensions: int, rows: int, runs: int) -> dict:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET max_parallel_workers_per_gather = 0")
+            cur.execute(
+                f"""
+                CREATE TEMP TABLE bench_vectors AS
+                SELECT i AS id, v.embedding
+                FROM generate_series(1, %s) i
+                CROSS JOIN LATERAL (
+                    SELECT array_agg(random()::real - 0.5)::vector({dimensions})
+                        AS embedding
+                    FROM generate_series(1, {dimensions})
+                    WHERE i IS NOT NULL
+                ) v
+                """,
+                (rows,),
+            )
+            cur.execute("ANALYZE bench_vectors")
+
+            timings = {"old": [], "new": []}
+            for _ in range(runs):
+                embedding = [random.random() - 0.5 for _ in range(dimensions)]
+                literal = "[" + ",".join(f"{x:.8f}" for x in embedding) + "]"
+                timings["old"].append(
+                    _explain(cur, OLD_SQL, (literal, literal, 1.5, 5))
+                )
+                timings["new"].append(
+                    _explain(cur, NEW_SQL, (Vector(embedding), 5, 1.5))
+                )
+    finally:
+        conn.rollback()
+        conn.close()
+
+    result = {}
+    for name, samples in timings.items():
+        result[name] = {
+            "planning_ms_p50": round(statistics.median(p for p, _ in samples), 3),
+            "execution_ms_p50": round(statistics.median(e for _, e in samples), 3),
+        }
+    result["execution_speedup"] = round(
+        result["old"]["execution_ms_p50"] / result["new"]["execution_ms_p50"], 2
+    )
+    result["rows"] = rows
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", help="DSN do Postgres com pgvector (opcional)")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    report = {"python": bench_python(args.dimensions, args.number)}
+    if args.dsn:
+        report["database"] = bench_database(
+            args.dsn, args.dimensions, args.rows, args.runs
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
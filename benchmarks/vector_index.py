@@ -0,0 +1,144 @@
+"""Latência do índice vetorial local (snapshot mmap + NumPy) por tamanho da base.
+
+Monta snapshots sintéticos num diretório temporário, com o mesmo código que
+o writer usa, e mede o top-k exato por número de chunks, dtype da matriz e
+consultas por lote. O relatório traz tempo de montagem, bytes em disco e
+p50/p95/p99 em ms por busca; compare com o vector_sql do benchmarks.suite
+para escolher até que tamanho vale ligar VECTOR_INDEX_ENABLED.
+
+    python -m benchmarks.vector_index --rows 10000,100000 --batch 1,16
+    python -m benchmarks.vector_index --rows 1000000 --dtype float16 --output vi.json
+"""
+
+import argparse
+import struct
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from api.config import Config
+from api.services import vector_index
+from benchmarks import load
+
+BUILD_BATCH = 20_000
+
+
+def _batches(rng: np.random.Generator, n: int, dimensions: int):
+    header = struct.pack(">hh", dimensions, 0)
+    for start in range(0, n, BUILD_BATCH):
+        size = min(BUILD_BATCH, n - start)
+        vectors = rng.normal(size=(size, dimensions)).astype(">f4")
+        yield [
+            {
+                "chunk_id": uuid.uuid4(),
+                "id": start + i,
+                "chunk_seq": 0,
+                "chunk": "chunk sintético",
+                "title": f"Documento {start + i}",
+                "embedding": header + vector.tobytes(),
+            }
+            for i, vector in enumerate(vectors)
+        ]
+
+
+def _stats(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": round(load.percentile(samples, 50), 3),
+        "p95": round(load.percentile(samples, 95), 3),
+        "p99": round(load.percentile(samples, 99), 3),
+    }
+
+
+def run_case(
+    n: int,
+    dtype: str,
+    dimensions: int,
+    batches: list[int],
+    k: int,
+    repeat: int,
+    seed: int,
+) -> dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        Config.VECTOR_INDEX_DIR = directory
+        Config.VECTOR_INDEX_DTYPE = dtype
+        started = time.perf_counter()
+        vector_index.build(_batches(rng, n, dimensions), n, dimensions=dimensions)
+        build_seconds = time.perf_counter() - started
+        disk_bytes = sum(p.stat().st_size for p in Path(directory).iterdir())
+
+        results = []
+        for batch in batches:
+            samples = []
+            for _ in range(repeat):
+                queries = rng.normal(size=(batch, dimensions)).astype(np.float32)
+                started = time.perf_counter()
+                vector_index.search(queries, k, 2.0)
+                samples.append((time.perf_counter() - started) * 1000)
+            results.append(
+                {
+                    "batch": batch,
+                    "search_ms": _stats(samples),
+                    "per_query_ms": round(
+                        load.percentile(sorted(samples), 50) / batch, 3
+                    ),
+                }
+            )
+        # Libera os mmaps antes de apagar o diretório.
+        vector_index._generation = vector_index._view = None
+        vector_index._current = None
+
+    return {
+        "rows": n,
+        "dtype": dtype,
+        "dimensions": dimensions,
+        "build_seconds": round(build_seconds, 2),
+        "disk_bytes": disk_bytes,
+        "results": results,
+    }
+
+
+def _csv_ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=_csv_ints, default=[10_000, 100_000])
+    parser.add_argument(
+        "--dtype", default="float32,float16", help="Lista de dtypes da matriz"
+    )
+    parser.add_argument("--dimensions", type=int, default=Config.EMBEDDING_DIMENSIONS)
+    parser.add_argument("--batch", type=_csv_ints, default=[1, 16])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    Config.VECTOR_INDEX_ENABLED = True
+    Config.VECTOR_INDEX_MAX_LAG = float("inf")
+    results = [
+        run_case(n, dtype, args.dimensions, args.batch, args.k, args.repeat, args.seed)
+        for n in args.rows
+        for dtype in args.dtype.split(",")
+    ]
+    load.write_report(
+        {
+            "commit": load.git_commit(),
+            "numpy": np.__version__,
+            "block_rows": Config.VECTOR_INDEX_BLOCK_ROWS,
+            "k": args.k,
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
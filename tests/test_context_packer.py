@@ -0,0 +1,26 @@
+from api.config import Config
+from api.services.context_packer import _join_overlapping
+
+
+def test_join_overlapping_trims_real_overlap(monkeypatch):
+    monkeypatch.setattr(Config, "CHUNK_OVERLAP", 50)
+    left = "The quick brown fox jumps over the lazy dog near the river bank"
+    right = "the lazy dog near the river bank and then runs into the forest"
+
+    assert _join_overlapping(left, right) == (
+        "The quick brown fox jumps over the lazy dog near the river bank"
+        " and then runs into the forest"
+    )
+
+
+def test_join_overlapping_keeps_chunks_without_overlap(monkeypatch):
+    monkeypatch.setattr(Config, "CHUNK_OVERLAP", 50)
+
+    assert (
+        _join_overlapping("the fox jumps over the", "every dog sleeps")
+        == "the fox jumps over the every dog sleeps"
+    )
+    assert (
+        _join_overlapping("we saw a cat", "toads in the pond")
+        == "we saw a cat toads in the pond"
+    )
@@ -0,0 +1,96 @@
+import itertools
+
+import pytest
+
+from api.services import document_service
+from api.services.document_service import BulkIngestError, bulk_insert_documents
+
+
+@pytest.fixture
+def database(monkeypatch):
+    # Simula o INSERT ... ON CONFLICT (idempotency_key) DO NOTHING: chaves já
+    # gravadas devolvem o id original com created=False.
+    state = {"keys": {}, "batches": [], "invalidated": []}
+    ids = itertools.count(1)
+
+    def insert_batch(batch):
+        state["batches"].append([position for position, _ in batch])
+        results = []
+        for _, record in batch:
+            key = record["idempotency_key"]
+            if key is not None and key in state["keys"]:
+                results.append({"id": state["keys"][key], "created": False})
+                continue
+            doc_id = next(ids)
+            if key is not None:
+                state["keys"][key] = doc_id
+            results.append({"id": doc_id, "created": True})
+        return results
+
+    monkeypatch.setattr(document_service, "_insert_batch", insert_batch)
+    monkeypatch.setattr(
+        document_service.answer_cache,
+        "invalidate_documents",
+        state["invalidated"].extend,
+    )
+    return state
+
+
+def _doc(title, key=None):
+    record = {"title": title, "content": f"conteúdo {title}"}
+    if key is not None:
+        record["idempotency_key"] = key
+    return record
+
+
+def test_repeated_key_in_one_request_maps_to_first_record(database):
+    results = bulk_insert_documents(
+        [_doc("a", "k1"), _doc("b"), _doc("c", "k1"), _doc("d", "k1")]
+    )
+
+    assert results == [
+        {"id": 1, "created": True},
+        {"id": 2, "created": True},
+        {"id": 1, "created": False},
+        {"id": 1, "created": False},
+    ]
+    # As repetições nem chegam ao banco.
+    assert database["batches"] == [[0, 1]]
+    assert database["invalidated"] == [1, 2]
+
+
+def test_repeated_key_across_batches_maps_to_first_record(database):
+    results = bulk_insert_documents(
+        [_doc("a", "k1"), _doc("b", "k2"), _doc("c", "k1")], batch_size=2
+    )
+
+    assert results == [
+        {"id": 1, "created": True},
+        {"id": 2, "created": True},
+        {"id": 1, "created": False},
+    ]
+    assert database["batches"] == [[0, 1]]
+
+
+def test_retry_returns_existing_ids_without_invalidating(database):
+    first = bulk_insert_documents([_doc("a", "k1"), _doc("b", "k2")])
+    database["invalidated"].clear()
+
+    retry = bulk_insert_documents([_doc("a", "k1"), _doc("b", "k2")])
+
+    assert [r["id"] for r in retry] == [r["id"] for r in first]
+    assert not any(r["created"] for r in retry)
+    assert database["invalidated"] == []
+
+
+def test_invalid_record_keeps_committed_batches(database):
+    records = [_doc("a", "k1"), _doc("b"), {"title": "sem conteúdo"}]
+
+    with pytest.raises(BulkIngestError) as excinfo:
+        bulk_insert_documents(records, batch_size=2)
+
+    assert "Registro 3" in str(excinfo.value)
+    assert excinfo.value.results == [
+        {"id": 1, "created": True},
+        {"id": 2, "created": True},
+    ]
@@ -0,0 +1,113 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from api.config import Config
+from api.resources.rag import _overloaded
+from api.services import llm_scheduler
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "_queue", [])
+    monkeypatch.setattr(llm_scheduler, "_sequence", itertools.count())
+    monkeypatch.setattr(llm_scheduler, "_active", 0)
+    monkeypatch.setattr(
+        llm_scheduler, "_depth", {name: 0 for name in llm_scheduler.PRIORITIES}
+    )
+    monkeypatch.setattr(
+        llm_scheduler, "_stats", {"admitted": 0, "rejected": 0, "timeouts": 0}
+    )
+    monkeypatch.setattr(llm_scheduler, "_avg_seconds", 10.0)
+    monkeypatch.setattr(Config, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(Config, "LLM_QUEUE_MAX", 4)
+    monkeypatch.setattr(Config, "LLM_QUEUE_MAX_BATCH", 2)
+    monkeypatch.setattr(Config, "LLM_QUEUE_TIMEOUT", 5.0)
+    return llm_scheduler
+
+
+def _wait_queued(count):
+    deadline = time.monotonic() + 5
+    while sum(llm_scheduler._depth.values()) < count:
+        assert time.monotonic() < deadline, "fila não atingiu o tamanho esperado"
+        time.sleep(0.005)
+
+
+def _enqueue(priority, order):
+    def run():
+        with llm_scheduler.acquire(priority):
+            order.append(priority)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_interactive_jumps_ahead_of_queued_batch():
+    order = []
+    slot = llm_scheduler.acquire("interactive")
+    threads = [_enqueue("batch", order)]
+    _wait_queued(1)
+    threads.append(_enqueue("batch", order))
+    _wait_queued(2)
+    threads.append(_enqueue("interactive", order))
+    _wait_queued(3)
+
+    slot.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["interactive", "batch", "batch"]
+    assert llm_scheduler.stats()["active"] == 0
+
+
+def test_full_queue_is_rejected_with_retry_after(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_QUEUE_MAX", 1)
+    order = []
+    slot = llm_scheduler.acquire("interactive")
+    thread = _enqueue("interactive", order)
+    _wait_queued(1)
+
+    with pytest.raises(llm_scheduler.Overloaded) as excinfo:
+        llm_scheduler.acquire("interactive")
+    # Uma geração na fila + a em andamento, a ~10s cada.
+    assert excinfo.value.retry_after == 20
+
+    body, status, headers = _overloaded(excinfo.value)
+    assert status == 429
+    assert headers == {"Retry-After": "20"}
+    assert body["retry_after"] == 20
+
+    slot.release()
+    thread.join(5)
+    assert order == ["interactive"]
+    assert llm_scheduler.stats()["rejected"] == 1
+
+
+def test_batch_is_capped_below_interactive_queue():
+    slot = llm_scheduler.acquire("interactive")
+    threads = [_enqueue("batch", []), _enqueue("batch", [])]
+    _wait_queued(2)
+
+    with pytest.raises(llm_scheduler.Overloaded):
+        llm_scheduler.check("batch")
+    llm_scheduler.check("interactive")
+
+    slot.release()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_queue_timeout_raises_overloaded(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_QUEUE_TIMEOUT", 0.05)
+    slot = llm_scheduler.acquire("interactive")
+
+    with pytest.raises(llm_scheduler.Overloaded):
+        llm_scheduler.acquire("interactive")
+
+    assert llm_scheduler._depth["interactive"] == 0
+    assert llm_scheduler.stats()["timeouts"] == 1
+    slot.release()
+    assert llm_scheduler.stats()["active"] == 0
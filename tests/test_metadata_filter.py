@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from api.services.metadata_filter import MetadataFilterError, build, parse
+
+
+def test_parse_accepts_json_string_and_empty_values():
+    assert parse('{"source": "wikipedia"}') == {"source": "wikipedia"}
+    assert parse(None) is None
+    assert parse("") is None
+    assert parse({}) is None
+
+
+@pytest.mark.parametrize(
+    "raw", ["{not json", "[1, 2]", '{"bad key": 1}', '{"1x": "a"}']
+)
+def test_parse_rejects_invalid_filters(raw):
+    with pytest.raises(MetadataFilterError):
+        parse(raw)
+
+
+def test_build_without_filters_is_true():
+    assert build(None) == ("TRUE", {})
+
+
+def test_build_equality_uses_single_containment():
+    sql, params = build({"source": "wikipedia", "lang": "pt", "year": 2024})
+
+    assert sql == "doc.metadata @> %(mf_eq)s::jsonb"
+    assert json.loads(params["mf_eq"]) == {
+        "source": "wikipedia",
+        "lang": "pt",
+        "year": 2024,
+    }
+
+
+def test_build_in_list_is_or_of_containments():
+    sql, params = build({"project": ["a", "b"]}, alias="d")
+
+    assert sql == (
+        "(d.metadata @> %(mf_0_in_0)s::jsonb OR d.metadata @> %(mf_0_in_1)s::jsonb)"
+    )
+    assert json.loads(params["mf_0_in_0"]) == {"project": "a"}
+    assert json.loads(params["mf_0_in_1"]) == {"project": "b"}
+
+
+def test_build_range_compares_text_of_key():
+    sql, params = build({"date": {"gte": "2024-01-01", "lt": "2024-02-01"}})
+
+    assert sql == (
+        "doc.metadata ->> %(mf_0_key)s >= %(mf_0_gte)s"
+        " AND doc.metadata ->> %(mf_0_key)s < %(mf_0_lt)s"
+    )
+    assert params == {
+        "mf_0_key": "date",
+        "mf_0_gte": "2024-01-01",
+        "mf_0_lt": "2024-02-01",
+    }
+
+
+def test_build_combines_equality_before_other_clauses():
+    sql, params = build({"date": {"gt": "2024-01-01"}, "source": {"eq": "wiki"}})
+
+    assert sql.startswith("doc.metadata @> %(mf_eq)s::jsonb AND ")
+    assert json.loads(params["mf_eq"]) == {"source": "wiki"}
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024-01-05", "2024-01-05"),
+        ("2024-01-05T10:00", "2024-01-05T10:00:00"),
+        ("2024-01-05T10:00:00+00:00", "2024-01-05T10:00:00+00:00"),
+        ("2024-01-05T10:00:00Z", "2024-01-05T10:00:00Z"),
+        ("2024-01-05T10:00:00-03:00", "2024-01-05T10:00:00-03:00"),
+    ],
+)
+def test_build_normalizes_iso_dates(value, expected):
+    _, params = build({"date": {"gte": value}})
+
+    assert params["mf_0_gte"] == expected
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"date": {"gte": "yesterday"}},
+        {"date": {"gte": 20240101}},
+        {"date": {"between": ["a", "b"]}},
+        {"date": {}},
+        {"tags": {"in": []}},
+        {"source": None},
+        {"source": {"eq": {"nested": 1}}},
+    ],
+)
+def test_build_rejects_invalid_specs(spec):
+    with pytest.raises(MetadataFilterError):
+        build(spec)
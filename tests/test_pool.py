@@ -0,0 +1,160 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from api import pool as pool_module
+from api.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.queries.append(sql)
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(dsn, connect_timeout):
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    monkeypatch.setattr(pool_module.psycopg2, "connect", connect)
+    return opened
+
+
+def _pool(**kwargs):
+    options = {"min_size": 1, "max_size": 2, "timeout": 0.05}
+    options.update(kwargs)
+    pool = ConnectionPool("dbname=test", **options)
+    pool.open()
+    return pool
+
+
+def _age(pool, **seconds):
+    # Envelhece as conexões ociosas sem depender do relógio real.
+    for slot in pool._idle:
+        for attr, delta in seconds.items():
+            setattr(slot, attr, getattr(slot, attr) - delta)
+
+
+def test_getconn_times_out_when_exhausted(connections):
+    pool = _pool()
+    held = [pool.getconn(), pool.getconn()]
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 2
+    assert len(connections) == 2
+    for conn in held:
+        pool.putconn(conn)
+
+
+def test_waiter_gets_connection_returned_by_another_thread(connections):
+    pool = _pool(max_size=1, timeout=5)
+    conn = pool.getconn()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    pool.putconn(conn)
+    waiter.join(5)
+
+    assert got == [conn]
+    assert len(connections) == 1
+
+
+def test_recently_used_connection_skips_health_check(connections):
+    pool = _pool(health_check_after=30)
+
+    conn = pool.getconn()
+
+    assert conn is connections[0]
+    assert conn.queries == []
+
+
+def test_idle_connection_is_checked_and_replaced_when_broken(connections):
+    pool = _pool(health_check_after=30)
+    connections[0].broken = True
+    _age(pool, last_used=60)
+
+    conn = pool.getconn()
+
+    assert connections[0].queries == ["SELECT 1"]
+    assert connections[0].closed
+    assert conn is connections[1]
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_expired_connection_is_recycled_on_getconn(connections):
+    pool = _pool(max_lifetime=3600)
+    _age(pool, created_at=3601)
+
+    conn = pool.getconn()
+
+    assert connections[0].closed
+    assert conn is connections[1]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_expired_connection_is_recycled_on_putconn(connections):
+    pool = _pool(max_lifetime=3600)
+    conn = pool.getconn()
+    pool._in_use[id(conn)].created_at -= 3601
+
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["recycled"] == 1
+
+
+def test_putconn_discards_connection_in_unknown_state(connections):
+    pool = _pool()
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.stats()["discarded"] == 1
+    with pytest.raises(ValueError):
+        pool.putconn(conn)
@@ -0,0 +1,92 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from api.config import Config
+from api.services import rag_jobs
+from api.services.rag_jobs import _PinnedAdapter, _post_webhook, check_webhook_url
+
+
+def _resolver(*addresses):
+    def getaddrinfo(host, port):
+        return [(None, None, None, "", (address, port or 0)) for address in addresses]
+
+    return getaddrinfo
+
+
+@pytest.fixture(autouse=True)
+def no_allowlist(monkeypatch):
+    monkeypatch.setattr(Config, "RAG_JOB_WEBHOOK_ALLOWED_HOSTS", "")
+
+
+def test_check_returns_validated_address(monkeypatch):
+    monkeypatch.setattr(
+        rag_jobs.socket, "getaddrinfo", _resolver("93.184.216.34", "93.184.216.34")
+    )
+
+    assert check_webhook_url("https://hooks.example.com/x") == "93.184.216.34"
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.0.0.5", "169.254.169.254"])
+def test_check_rejects_any_internal_address(monkeypatch, address):
+    monkeypatch.setattr(
+        rag_jobs.socket, "getaddrinfo", _resolver("93.184.216.34", address)
+    )
+
+    with pytest.raises(ValueError):
+        check_webhook_url("https://hooks.example.com/x")
+
+
+def test_allowlisted_host_is_not_pinned(monkeypatch):
+    monkeypatch.setattr(Config, "RAG_JOB_WEBHOOK_ALLOWED_HOSTS", "hooks.internal")
+
+    assert check_webhook_url("http://hooks.internal/x") is None
+    with pytest.raises(ValueError):
+        check_webhook_url("http://other.internal/x")
+
+
+def test_pinned_adapter_keeps_original_name_for_tls():
+    manager = _PinnedAdapter("hooks.example.com").poolmanager
+
+    assert manager.connection_pool_kw["server_hostname"] == "hooks.example.com"
+    assert manager.connection_pool_kw["assert_hostname"] == "hooks.example.com"
+
+
+def test_post_connects_to_pinned_address_without_resolving(monkeypatch):
+    received = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.update(host=self.headers["Host"], body=json.loads(body))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.timeout = 5
+    thread = threading.Thread(target=server.handle_request, daemon=True)
+    thread.start()
+    getaddrinfo = socket.getaddrinfo
+
+    def no_rebinding(host, *args, **kwargs):
+        assert host != "hooks.example.com", "o nome não deveria ser resolvido"
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", no_rebinding)
+    port = server.server_address[1]
+    try:
+        response = _post_webhook(
+            f"http://hooks.example.com:{port}/done", "127.0.0.1", {"id": "1"}
+        )
+    finally:
+        thread.join(5)
+        server.server_close()
+
+    assert response.status_code == 204
+    assert received == {"host": f"hooks.example.com:{port}", "body": {"id": "1"}}
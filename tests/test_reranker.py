@@ -0,0 +1,71 @@
+import numpy as np
+
+from api.services.reranker import _unit, decode_vectors, mmr, relevance, rerank
+
+
+def _wire(values):
+    vector = np.asarray(values, dtype=">f4")
+    return len(values).to_bytes(2, "big") + b"\x00\x00" + vector.tobytes()
+
+
+# Dois quase-duplicados do tópico A, um do tópico B e um pouco relevante.
+CANDIDATES = np.array(
+    [
+        [1.0, 0.0, 0.0],
+        [0.99, 0.05, 0.0],
+        [0.6, 0.8, 0.0],
+        [0.0, 0.0, 1.0],
+    ],
+    dtype=np.float32,
+)
+QUERY = np.array([1.0, 0.2, 0.0], dtype=np.float32)
+
+
+def test_decode_vectors_reads_pgvector_binary_format():
+    matrix = decode_vectors([_wire([1.0, -2.5]), memoryview(_wire([0.0, 3.0]))])
+
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, [[1.0, -2.5], [0.0, 3.0]])
+    assert decode_vectors([]).shape == (0, 0)
+
+
+def test_mmr_with_lambda_one_is_pure_relevance_order():
+    unit = _unit(CANDIDATES)
+    scores = relevance(QUERY, unit)
+    expected = [int(i) for i in np.argsort(-scores)]
+
+    assert mmr(unit, scores, k=4, diversity_lambda=1.0) == expected
+    assert rerank(QUERY, CANDIDATES, k=4, diversity_lambda=1.0) == expected
+
+
+def test_mmr_skips_near_duplicates():
+    unit = _unit(CANDIDATES)
+    scores = relevance(QUERY, unit)
+    by_relevance = [int(i) for i in np.argsort(-scores)]
+    assert by_relevance[:2] == [1, 0]
+
+    selected = mmr(unit, scores, k=2, diversity_lambda=0.5)
+
+    assert selected[0] == 1
+    assert 0 not in selected
+    assert selected == rerank(QUERY, CANDIDATES, k=2, diversity_lambda=0.5)
+
+
+def test_mmr_returns_each_candidate_once_and_caps_k():
+    unit = _unit(CANDIDATES)
+    scores = relevance(QUERY, unit)
+
+    selected = mmr(unit, scores, k=10, diversity_lambda=0.3)
+
+    assert sorted(selected) == [0, 1, 2, 3]
+
+
+def test_relevance_mixes_normalized_lexical_score():
+    unit = _unit(CANDIDATES)
+    lexical = np.array([0.0, 0.0, 0.0, 0.4], dtype=np.float32)
+
+    scores = relevance(QUERY, unit, lexical, lexical_weight=0.5)
+
+    # O maior ts_rank vira 1: metade do score do candidato 3 vem do léxico.
+    np.testing.assert_allclose(scores[3], 0.5, atol=1e-6)
+    assert rerank(QUERY, CANDIDATES, 1, 1.0, lexical, 0.9) == [3]
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from api.config import Config
+from api.services import profiling
+from api.services.single_flight import Group, WaitTimeout
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(Config, "SINGLE_FLIGHT_ENABLED", True)
+
+
+def _wait_followers(group, count):
+    deadline = time.monotonic() + 5
+    while group.stats()["followers"] < count:
+        assert time.monotonic() < deadline, "seguidoras não chegaram"
+        time.sleep(0.005)
+
+
+def _follow(group, key, fn, outcomes):
+    def run():
+        try:
+            outcomes.append(("ok", group.do(key, fn)))
+        except BaseException as e:
+            outcomes.append(("error", e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _leader(group, key, fn, release):
+    started = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    outcomes = []
+    thread = _follow(group, key, blocked, outcomes)
+    assert started.wait(5)
+    return thread, outcomes
+
+
+def test_followers_share_leader_result():
+    group = Group("test", lambda: 5)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        return "resposta"
+
+    leader, leader_out = _leader(group, "k", work, release)
+    outcomes = []
+    followers = [_follow(group, "k", work, outcomes) for _ in range(3)]
+    _wait_followers(group, 3)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert leader_out == [("ok", "resposta")]
+    assert outcomes == [("ok", "resposta")] * 3
+    assert group.stats() == {
+        "leaders": 1,
+        "followers": 3,
+        "errors": 0,
+        "timeouts": 0,
+        "in_flight": 0,
+    }
+
+
+def test_leader_exception_reaches_every_follower():
+    group = Group("test", lambda: 5)
+    release = threading.Event()
+    error = RuntimeError("ollama fora do ar")
+
+    def fail():
+        raise error
+
+    leader, leader_out = _leader(group, "k", fail, release)
+    outcomes = []
+    followers = [_follow(group, "k", fail, outcomes) for _ in range(2)]
+    _wait_followers(group, 2)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert leader_out == [("error", error)]
+    assert outcomes == [("error", error)] * 2
+    assert group.stats()["errors"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_follower_gives_up_after_wait_timeout():
+    group = Group("test", lambda: 0.05)
+    release = threading.Event()
+
+    leader, leader_out = _leader(group, "k", lambda: "lento", release)
+    with pytest.raises(WaitTimeout):
+        group.do("k", lambda: "nunca")
+    release.set()
+    leader.join(5)
+
+    assert leader_out == [("ok", "lento")]
+    assert group.stats()["timeouts"] == 1
+
+
+def test_finished_call_is_not_reused():
+    group = Group("test", lambda: 5)
+    results = iter(["primeira", "segunda"])
+
+    assert group.do("k", lambda: next(results)) == "primeira"
+    assert group.do("k", lambda: next(results)) == "segunda"
+    assert group.stats()["leaders"] == 2
+
+
+def test_profiled_requests_bypass_coalescing():
+    group = Group("test", lambda: 5)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        return len(calls)
+
+    leader, _ = _leader(group, "k", work, release)
+    token = profiling._current.set({})
+    try:
+        assert group.do("k", work) == 1
+    finally:
+        profiling._current.reset(token)
+    release.set()
+    leader.join(5)
+
+    assert len(calls) == 2
+    assert group.stats()["followers"] == 0